@@ -0,0 +1,11 @@
+"""
+Benchmarks for the logopy interpreter and its turtle back ends.
+
+Run the suite with either of:
+
+    $ PYTHONPATH=. python -m benchmarks -o results.json
+    $ PYTHONPATH=. ./bin/logopycli.py bench -o results.json
+
+Pass `--baseline` with the JSON results of an earlier run to compare the
+wall times of the two runs.
+"""
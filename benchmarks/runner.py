@@ -0,0 +1,278 @@
+"""
+Run the benchmark workloads and record the results as JSON.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+from benchmarks.workloads import WORKLOADS
+from logopy import svgturtle
+
+LOGOPYCLI = os.path.join(os.path.dirname(__file__), os.pardir, "bin", "logopycli.py")
+
+# Results format version.  Incremented when the JSON layout changes.
+FORMAT_VERSION = 1
+
+
+def load_interpreter_class():
+    """
+    Load `LogoInterpreter` from `bin/logopycli.py`.
+    """
+    spec = importlib.util.spec_from_file_location("logopycli", LOGOPYCLI)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.LogoInterpreter
+
+
+def add_arguments(parser):
+    """
+    Add the benchmark options to an `argparse` parser.
+    """
+    parser.add_argument(
+        "-o",
+        "--json",
+        metavar="FILE",
+        dest="json_file",
+        action="store",
+        help="Save the results as JSON to FILE.",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        type=int,
+        default=3,
+        help="Time each workload REPEAT times and keep the best time.",
+    )
+    parser.add_argument(
+        "-k",
+        "--select",
+        metavar="TEXT",
+        action="append",
+        help="Only run workloads whose names contain TEXT.",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        action="store",
+        help="Compare wall times with the JSON results in FILE.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Report a regression if a workload is this fraction slower than the baseline.",
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the workloads and exit."
+    )
+
+
+def run_from_args(interpreter_class, args):
+    """
+    Run the benchmarks selected by parsed `args`.
+    Return a process exit status.
+    """
+    workloads = select_workloads(args.select)
+    if args.list:
+        for workload in workloads:
+            print(workload.name)
+        return 0
+    results = run_benchmarks(
+        interpreter_class, workloads, backend=args.backend, repeat=args.repeat
+    )
+    for result in results["results"]:
+        print(format_result(result))
+    if args.json_file is not None:
+        with open(args.json_file, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if not compare_results(baseline, results, args.tolerance):
+            return 1
+    return 0
+
+
+def select_workloads(patterns):
+    """
+    Return the workloads whose names contain any of `patterns`.
+    """
+    if not patterns:
+        return list(WORKLOADS)
+    return [w for w in WORKLOADS if any(p in w.name for p in patterns)]
+
+
+def run_benchmarks(interpreter_class, workloads, backend="tree", repeat=3):
+    """
+    Run `workloads` and return the results as a JSON serializable dict.
+    """
+    results = []
+    for workload in workloads:
+        results.append(run_workload(interpreter_class, workload, backend, repeat))
+    return dict(
+        version=FORMAT_VERSION,
+        created=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        backend=backend,
+        repeat=repeat,
+        results=results,
+    )
+
+
+def run_workload(interpreter_class, workload, backend, repeat):
+    """
+    Time a single workload.
+    """
+    times = []
+    for n in range(max(repeat, 1)):
+        times.append(_time_workload(interpreter_class, workload, backend))
+    tracemalloc.start()
+    try:
+        _time_workload(interpreter_class, workload, backend)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    wall_time = min(times)
+    result = dict(
+        name=workload.name,
+        group=workload.group,
+        kind=workload.kind,
+        wall_time=wall_time,
+        wall_time_mean=sum(times) / len(times),
+        times=times,
+        peak_memory=peak,
+    )
+    if workload.kind == "tokenize":
+        logo = interpreter_class.create_interpreter()
+        count = _count_tokens(logo.tokenize(workload.script))
+        result["tokens"] = count
+        result["tokens_per_second"] = count / wall_time
+    else:
+        count = _count_commands(interpreter_class, workload)
+        result["commands"] = count
+        result["commands_per_second"] = count / wall_time
+    return result
+
+
+def _create_interpreter(interpreter_class, workload, backend, output_file):
+    logo = interpreter_class.create_interpreter()
+    logo.backend = backend
+    if workload.turtle:
+        logo.turtle_backend = svgturtle.SVGTurtleEnv.create_turtle_env()
+        logo.turtle_backend_args = dict(output_file=output_file)
+    return logo
+
+
+def _run(logo, workload, tokens):
+    logo.process_token_list(tokens)
+    if logo.is_turtle_active():
+        logo.turtle_backend.wait_complete()
+
+
+def _time_workload(interpreter_class, workload, backend):
+    """
+    Run a workload once in a new interpreter and return the wall time.
+    """
+    with open(os.devnull, "w") as output_file:
+        logo = _create_interpreter(interpreter_class, workload, backend, output_file)
+        if workload.kind == "tokenize":
+            start = time.perf_counter()
+            logo.tokenize(workload.script)
+            return time.perf_counter() - start
+        tokens = logo.tokenize(workload.script)
+        start = time.perf_counter()
+        _run(logo, workload, tokens)
+        return time.perf_counter() - start
+
+
+def _count_tokens(tokens):
+    """
+    Count tokens, including the tokens inside lists and special forms.
+    """
+    count = 0
+    for token in tokens:
+        if isinstance(token, (list, tuple)):
+            count += _count_tokens(token)
+        else:
+            count += 1
+    return count
+
+
+def _count_commands(interpreter_class, workload):
+    """
+    Count the primitives and procedures a workload calls.
+    The tree walker is used, as if tracing, because then it calls every
+    primitive through `execute_procedure()`.
+    """
+    counter = [0]
+
+    class CountingInterpreter(interpreter_class):
+        def execute_procedure(self, proc, args):
+            counter[0] += 1
+            return super().execute_procedure(proc, args)
+
+        def is_tracing(self):
+            return True
+
+    with open(os.devnull, "w") as output_file:
+        logo = _create_interpreter(CountingInterpreter, workload, "tree", output_file)
+        _run(logo, workload, logo.tokenize(workload.script))
+    return counter[0]
+
+
+def format_result(result):
+    """
+    Format a result for display.
+    """
+    if "tokens_per_second" in result:
+        rate = "{:>12,.0f} tokens/s".format(result["tokens_per_second"])
+    else:
+        rate = "{:>12,.0f} commands/s".format(result["commands_per_second"])
+    return "{:<28} {:>9.3f}s {:>9.1f} MiB {}".format(
+        result["name"], result["wall_time"], result["peak_memory"] / 2**20, rate
+    )
+
+
+def compare_results(baseline, results, tolerance):
+    """
+    Print the change in wall time of each workload since `baseline`.
+    Return False if any workload is slower than `tolerance` allows.
+    """
+    ok = True
+    old_times = {r["name"]: r["wall_time"] for r in baseline["results"]}
+    print("")
+    print("Compared with baseline from {}:".format(baseline.get("created")))
+    for result in results["results"]:
+        name = result["name"]
+        old = old_times.get(name)
+        if old is None:
+            print("{:<28} new".format(name))
+            continue
+        change = result["wall_time"] / old - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            ok = False
+        print("{:<28} {:>+8.1%}{}".format(name, change, flag))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="logopy benchmarks")
+    parser.add_argument(
+        "--backend",
+        action="store",
+        choices=["tree", "closure", "stack"],
+        default="tree",
+        help="How compiled procedures run.",
+    )
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return run_from_args(load_interpreter_class(), args)
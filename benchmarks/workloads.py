@@ -0,0 +1,115 @@
+"""
+Benchmark workloads.
+"""
+
+import attr
+
+
+@attr.s
+class Workload:
+    """
+    A Logo script to benchmark.
+
+    `kind` is `tokenize` to time only tokenizing the script, or `run` to time
+    running it.  If `turtle` is True, the script runs with the SVG turtle
+    back end and the SVG document is written out.
+    """
+
+    name = attr.ib()
+    group = attr.ib()
+    script = attr.ib()
+    kind = attr.ib(default="run")
+    turtle = attr.ib(default=False)
+
+
+def _parse_heavy_script(copies=1000):
+    """
+    Return a long script with procedure definitions, nested lists, special
+    forms and infix expressions.
+    """
+    template = """
+to shape{n} :size :depth [:angle 90] [:colors [[255 0 0] [0 255 0] [0 0 255]]]
+    ; A comment that the tokenizer has to skip.
+    if :depth < 1 [stop]
+    localmake "step (:size * 0.5) + (:depth - 1) / 3
+    repeat 4 [setpc item 1 + remainder repcount 3 :colors fd :step rt :angle]
+    (print "shape{n} :size -:depth [nested [list [of words] 1.5e3] "quoted])
+    output (sum :size :depth {n})
+end
+"""
+    return "".join(template.format(n=n) for n in range(copies))
+
+
+FIB = """
+to fib :n
+    if :n < 2 [output :n]
+    output (fib :n - 1) + (fib :n - 2)
+end
+make "result fib 18
+"""
+
+ACKERMANN = """
+to ack :m :n
+    if :m = 0 [output :n + 1]
+    if :n = 0 [output ack :m - 1 1]
+    output ack :m - 1 ack :m :n - 1
+end
+make "result ack 2 60
+"""
+
+TREE_FRACTAL = """
+to tree :size :depth
+    if :depth = 0 [stop]
+    fd :size
+    lt 30
+    tree :size * 0.7 :depth - 1
+    rt 60
+    tree :size * 0.7 :depth - 1
+    lt 30
+    bk :size
+end
+tree 100 12
+"""
+
+NESTED_REPEAT = """
+make "total 0
+repeat 200 [repeat 100 [make "total :total + repcount]]
+"""
+
+FOR_LOOP = """
+make "total 0
+for [i 1 20000] [make "total :total + :i]
+"""
+
+MAP_FILTER_REDUCE = """
+repeat 20 [make "result reduce [?1 + ?2] filter [0 = remainder ? 2] map [? * ?] iseq 1 1000]
+"""
+
+FPUT_BUTFIRST = """
+to build :n :lst
+    if :n = 0 [output :lst]
+    output build :n - 1 fput :n :lst
+end
+to drain :lst :total
+    if emptyp :lst [output :total]
+    output drain butfirst :lst :total + first :lst
+end
+make "result drain build 10000 [] 0
+"""
+
+SVG_SEGMENTS = """
+pu setpos [-300 -300] pd
+repeat 100000 [fd 1 rt 1.37]
+"""
+
+WORKLOADS = [
+    Workload("parse.procedures", "parse", _parse_heavy_script(), kind="tokenize"),
+    Workload("repeat.nested", "repeat", NESTED_REPEAT),
+    Workload("repeat.for", "repeat", FOR_LOOP),
+    Workload("recursion.fib", "recursion", FIB),
+    Workload("recursion.ackermann", "recursion", ACKERMANN),
+    Workload("recursion.tree", "recursion", TREE_FRACTAL, turtle=True),
+    Workload("lists.map_filter_reduce", "lists", MAP_FILTER_REDUCE),
+    Workload("lists.fput_butfirst", "lists", FPUT_BUTFIRST),
+    Workload("svg.segments", "svg", SVG_SEGMENTS, turtle=True),
+]
@@ -2,6 +2,7 @@
 
 import argparse
 import collections
+import functools
 import itertools
 import numbers
 import os
@@ -10,7 +11,20 @@ import sys
 import attr
 import parsley
 
-from logopy import errors, procedure, svgturtle
+from logopy import (
+    compiler,
+    datatypes,
+    errors,
+    machine,
+    procedure,
+    profiler,
+    scriptcache,
+    svgturtle,
+    tokenizer,
+)
+
+# Marks a variable that had no binding before a scope bound it.
+UNBOUND = object()
 
 
 @attr.s
@@ -117,10 +131,13 @@ class LogoInterpreter:
 
     primitives = attr.ib(default=attr.Factory(dict))
     procedures = attr.ib(default=attr.Factory(dict))
-    scope_stack = attr.ib(default=attr.Factory(list))
+    variables = attr.ib(default=attr.Factory(dict))
+    property_lists = attr.ib(default=attr.Factory(dict), repr=False)
+    binding_stack = attr.ib(default=attr.Factory(list))
     repcount_stack = attr.ib(default=attr.Factory(list))
     placeholder_stack = attr.ib(default=attr.Factory(list))
-    grammar = attr.ib(default=None)
+    tokenize = attr.ib(default=tokenizer.tokenize)
+    tokenizer_name = attr.ib(default="fast")
     script_folders = attr.ib(default=attr.Factory(list))
     turtle_backend = attr.ib(
         default=attr.Factory(DeferredTKTurtleEnv.create_turtle_env)
@@ -131,11 +148,31 @@ class LogoInterpreter:
     debug_procs = attr.ib(default=False)
     debug_primitives = attr.ib(default=False)
     debug_tokens = attr.ib(default=False)
+    instructionlist_cache = attr.ib(default=attr.Factory(collections.OrderedDict))
+    instructionlist_cache_size = attr.ib(default=1024)
+    compiled_instructionlist_cache = attr.ib(
+        default=attr.Factory(collections.OrderedDict), repr=False
+    )
+    member_index_cache = attr.ib(
+        default=attr.Factory(collections.OrderedDict), repr=False
+    )
+    member_index_cache_size = attr.ib(default=64)
+    procedure_generation = attr.ib(default=0)
+    dispatch_cache = attr.ib(default=attr.Factory(dict), repr=False)
+    dispatch_generation = attr.ib(default=-1)
+    script_cache = attr.ib(default=False)
+    profiler = attr.ib(default=None, repr=False)
+    backend = attr.ib(default="tree")
+    parallel_workers = attr.ib(default=None)
+    tail_call = attr.ib(default=None, repr=False)
+    return_value = attr.ib(default=None, repr=False)
+    # Lowercased tags of the running CATCH commands, innermost last.
+    catch_tags = attr.ib(default=attr.Factory(list), repr=False)
+    caught_error = attr.ib(default=None, repr=False)
 
     @classmethod
     def create_interpreter(cls):
         interpreter = cls()
-        interpreter.scope_stack.append({})
         interpreter.primitives.update(procedure.create_primitives_map())
         return interpreter
 
@@ -201,11 +238,25 @@ class LogoInterpreter:
         for folder in script_folders:
             pth = os.path.join(folder, filename)
             if os.path.exists(pth):
-                with open(pth, "r") as f:
-                    data = f.read()
-                return self.process_instructionlist(data)
+                stream = TokenStream.make_stream(self.tokenize_file(pth))
+                if self.debug_tokens:
+                    print("PARSED TOKENS:", stream)
+                result = None
+                while len(stream) > 0:
+                    result = self.evaluate(stream)
+                return result
         raise errors.LogoError("Could not locate script `{}`.".format(filename))
 
+    def tokenize_file(self, pth):
+        """
+        Return the tokens for the script file at `pth`.
+        If `script_cache` is set, tokens are cached on disk.
+        """
+        if self.script_cache:
+            return scriptcache.load_tokens(pth, self.tokenize, self.tokenizer_name)
+        with open(pth, "r") as f:
+            return self.tokenize(f.read())
+
     def evaluate_token_list(self, lst):
         """
         Wrap token list in TokenStream and `evaluate()`.
@@ -213,11 +264,18 @@ class LogoInterpreter:
         stream = TokenStream.make_stream(lst)
         return self.evaluate(stream)
 
+    def process_token_list(self, lst):
+        """
+        Wrap token list in TokenStream and `process_commands()`.
+        """
+        stream = TokenStream.make_stream(lst)
+        return self.process_commands(stream)
+
     def evaluate_readlist(self, data):
         """
         Evaluate input as READLIST.
         """
-        stream = TokenStream.make_stream(self.grammar(data).itemlist())
+        stream = TokenStream.make_stream(self.tokenize(data))
         return self.evaluate(stream)
 
     def process_instructionlist(self, script):
@@ -225,13 +283,79 @@ class LogoInterpreter:
         Process a script, which should represent a list of instructions
         when tokenized.
         """
-        stream = parse_tokens(self.grammar, script, debug=self.debug_tokens)
+        stream = parse_tokens(self.tokenize, script, debug=self.debug_tokens)
         result = None
         while len(stream) > 0:
             result = self.evaluate(stream)
         return result
 
+    def run_instructionlist(self, instructionlist):
+        """
+        Process a Logo list as a list of instructions.
+        The list is compiled the first time it runs.  The compiled body is
+        cached by the structure of the list, so the instructions of a loop
+        are only parsed and compiled once.
+        """
+        cache = self.compiled_instructionlist_cache
+        key = datatypes.freeze(instructionlist, tag_numbers=True)
+        body = cache.get(key)
+        if (
+            body is None
+            or body.generation != self.procedure_generation
+            or body.closures != self.use_closures()
+        ):
+            body = cache[key] = self.compile_instructionlist(instructionlist)
+            if len(cache) > self.instructionlist_cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return body.run(self)
+
+    def run_token_list(self, lst):
+        """
+        Wrap token list in TokenStream and `evaluate()` each instruction.
+        Return the value of the last one.
+        """
+        stream = TokenStream.make_stream(lst)
+        result = None
+        while len(stream) > 0:
+            result = self.evaluate(stream)
+        return result
+
+    def compile_instructionlist(self, instructionlist):
+        """
+        Compile a Logo list of instructions to run as RUN would.
+        The compiled body must be compiled again if `procedure_generation`
+        changes.
+        """
+        tokens = self.get_instructionlist_tokens(instructionlist)
+        return compiler.compile_tokens(
+            self, tokens, closures=self.use_closures(), expressions=True
+        )
+
+    def get_instructionlist_tokens(self, instructionlist):
+        """
+        Return the parsed tokens for a Logo instruction list.
+        Tokens are cached by the structure of the list, so running the
+        same instructions repeatedly only parses them once.
+        """
+        cache = self.instructionlist_cache
+        key = datatypes.freeze(instructionlist, tag_numbers=True)
+        token_lst = cache.get(key)
+        if token_lst is not None:
+            cache.move_to_end(key)
+            return token_lst
+        script = procedure._list_contents_repr(instructionlist, include_braces=False)
+        token_lst = self.tokenize(script)
+        if self.debug_tokens:
+            print("PARSED TOKENS:", token_lst)
+        cache[key] = token_lst
+        if len(cache) > self.instructionlist_cache_size:
+            cache.popitem(last=False)
+        return token_lst
+
     def process_commands(self, tokens):
+        result = None
         while len(tokens) > 0:
             result = self.process_command(tokens)
             self.process_events()
@@ -243,65 +367,145 @@ class LogoInterpreter:
         """
         if self.halt:
             raise errors.HaltSignal("Received HALT")
-        primitives = self.primitives
-        procedures = self.procedures
         while len(tokens) > 0:
             token = tokens.popleft()
-            token = transform_qmark(token)
-            is_cmd = is_command(token)
-            is_spcl_frm = is_special_form(token)
-            if not is_cmd and not is_spcl_frm:
-                raise errors.LogoError(
-                    "Expected a command.  Instead, got `{}`.".format(token)
-                )
-            if is_spcl_frm:
-                stream = TokenStream.make_stream(token)
-                return self.process_special_form_or_expression(stream)
-            else:
-                command = token.lower()
-                if command == "to":
-                    procedure.process_to(self, tokens)
-                elif command in primitives:
-                    proc = primitives[command]
-                    args = self.evaluate_args_for_command(proc.default_arity, tokens)
-                    for n, arg in enumerate(args):
-                        if arg is None:
-                            raise errors.LogoError(
-                                "Primitive `{}` received a null value for argument {}.".format(
-                                    command.upper(), n + 1
-                                )
-                            )
-                    if self.debug_primitives:
-                        print("PRIMITIVE:", command, "ARGS:", args)
-                    return self.execute_procedure(proc, args)
-                elif command in procedures:
-                    proc = procedures[command]
-                    args = self.evaluate_args_for_command(proc.default_arity, tokens)
-                    for n, arg in enumerate(args):
-                        if arg is None:
-                            raise errors.LogoError(
-                                "Procedure `{}` received a null value for argument {}.".format(
-                                    command.upper(), n + 1
-                                )
-                            )
-                    if self.debug_procs:
-                        print("PROCEDURE:", command, "ARGS:", args)
-                    return self.execute_procedure(proc, args)
-                else:
-                    raise errors.LogoError("I don't know how to `{}`.".format(token))
+            entry = self.resolve_command(token)
+            if entry is None:
+                token = tokenizer.transform_qmark(token)
+                if tokenizer.is_special_form(token):
+                    stream = TokenStream.make_stream(token)
+                    return self.process_special_form_or_expression(stream)
+                if not tokenizer.is_command(token):
+                    raise errors.LogoError(
+                        "Expected a command.  Instead, got `{}`.".format(token)
+                    )
+                raise errors.LogoError("I don't know how to `{}`.".format(token))
+            command, proc, is_primitive = entry
+            if proc is None:
+                procedure.process_to(self, tokens)
+                continue
+            args = self.evaluate_args_for_command(proc.default_arity, tokens)
+            for n, arg in enumerate(args):
+                if arg is None:
+                    raise errors.LogoError(
+                        "{} `{}` received a null value for argument {}.".format(
+                            "Primitive" if is_primitive else "Procedure",
+                            command.upper(),
+                            n + 1,
+                        )
+                    )
+            if is_primitive:
+                if self.debug_primitives:
+                    print("PRIMITIVE:", command, "ARGS:", args)
+            elif self.debug_procs:
+                print("PROCEDURE:", command, "ARGS:", args)
+            return self.execute_procedure(proc, args)
+
+    def resolve_command(self, token):
+        """
+        Resolve a command token.
+        Return a tuple of `(command, procedure, is_primitive)`, or None if the
+        token isn't a known command.  The procedure is None for TO.
+        Results are cached until a procedure is (re)defined.
+        """
+        cache = self.dispatch_cache
+        if self.dispatch_generation != self.procedure_generation:
+            cache.clear()
+            self.dispatch_generation = self.procedure_generation
+        try:
+            return cache[token]
+        except KeyError:
+            pass
+        except TypeError:
+            # Lists and forms that contain lists can't be hashed.
+            return None
+        if not tokenizer.is_command(tokenizer.transform_qmark(token)):
+            return None
+        command = token.lower()
+        if command == "to":
+            entry = (command, None, None)
+        elif command in self.primitives:
+            entry = (command, self.primitives[command], True)
+        elif command in self.procedures:
+            entry = (command, self.procedures[command], False)
+        else:
+            return None
+        cache[token] = entry
+        return entry
 
     def get_variable_value(self, varname):
         """
         Get the value of the named variable from the dynamic scope.
         """
-        scopes = self.scope_stack
-        for scope in reversed(scopes):
-            if varname in scope:
-                value = scope[varname]
-                if value is None:
-                    raise errors.LogoError("`{}` has no value.".format(varname))
-                return value
-        raise errors.LogoError("No scope has a variable named `{}`.".format(varname))
+        try:
+            value = self.variables[varname]
+        except KeyError:
+            raise errors.LogoError(
+                "No scope has a variable named `{}`.".format(varname)
+            )
+        if value is None:
+            raise errors.LogoError("`{}` has no value.".format(varname))
+        return value
+
+    def set_variable(self, varname, value):
+        """
+        Set the innermost binding of a variable, or create a global
+        variable if it has no binding.
+        """
+        self.variables[varname] = value
+
+    def bind_variable(self, varname, value):
+        """
+        Bind a variable in the current scope.
+        """
+        binding_stack = self.binding_stack
+        variables = self.variables
+        if len(binding_stack) > 0:
+            saved = binding_stack[-1]
+            if varname not in saved:
+                saved[varname] = variables.get(varname, UNBOUND)
+        variables[varname] = value
+
+    def create_scope(self, bindings=()):
+        """
+        Create a new variable scope and bind the `(name, value)` pairs in
+        `bindings` in it.
+
+        Variables use shallow binding.  `variables` always maps a name to
+        its current value, and each scope on `binding_stack` saves the
+        values it shadows so they can be restored when it is destroyed.
+        """
+        saved = {}
+        self.binding_stack.append(saved)
+        variables = self.variables
+        for varname, value in bindings:
+            if varname not in saved:
+                saved[varname] = variables.get(varname, UNBOUND)
+            variables[varname] = value
+
+    def destroy_scope(self):
+        """
+        Destroy the current variable scope, restoring the values it shadowed.
+        """
+        variables = self.variables
+        for varname, value in self.binding_stack.pop().items():
+            if value is UNBOUND:
+                del variables[varname]
+            else:
+                variables[varname] = value
+
+    def global_variables(self):
+        """
+        Return a dict of the global variables.
+        """
+        result = dict(self.variables)
+        for saved in reversed(self.binding_stack):
+            for varname, value in saved.items():
+                if value is UNBOUND:
+                    result.pop(varname, None)
+                else:
+                    result[varname] = value
+        return result
 
     def get_repcount(self):
         """
@@ -353,62 +557,52 @@ class LogoInterpreter:
         """
         Evaluate and check for infix.
         """
+        value = self.evaluate_arithmetic(tokens)
+        peek = tokens.peek()
+        if isinstance(peek, str) and peek in compiler.COMPARISON_PRIMITIVES:
+            if peek not in ("=", "<>") and not isinstance(value, numbers.Number):
+                compiler._raise_not_a_number(peek, value)
+            tokens.popleft()
+            p = self.primitives[compiler.COMPARISON_PRIMITIVES[peek]].primitive_func
+            return p(self, value, self.evaluate_arithmetic(tokens))
+        return value
+
+    def evaluate_arithmetic(self, tokens):
+        """
+        Evaluate the next value and any infix arithmetic that follows it.
+        """
         value = self.evaluate_value(tokens)
-        if isinstance(value, numbers.Number):
-            terms = [value]
-            while True:
-                peek = tokens.peek()
-                if peek == "-":
-                    tokens.popleft()
-                    terms.append(-self.evaluate_value(tokens))
-                elif peek == "+":
-                    tokens.popleft()
-                    terms.append(self.evaluate_value(tokens))
-                elif peek == "*":
-                    tokens.popleft()
-                    terms[-1] *= self.evaluate_value(tokens)
-                elif peek == "/":
-                    tokens.popleft()
-                    terms[-1] /= self.evaluate_value(tokens)
-                elif peek == "<":
-                    tokens.popleft()
-                    p = self.primitives["lessp"].primitive_func
-                    return p(self, sum(terms), self.evaluate_value(tokens))
-                elif peek == "<=":
-                    tokens.popleft()
-                    p = self.primitives["lessequalp"].primitive_func
-                    return p(self, sum(terms), self.evaluate_value(tokens))
-                elif peek == ">":
-                    tokens.popleft()
-                    p = self.primitives["greaterp"].primitive_func
-                    return p(self, sum(terms), self.evaluate_value(tokens))
-                elif peek == ">=":
-                    tokens.popleft()
-                    p = self.primitives["greaterequalp"].primitive_func
-                    return p(self, sum(terms), self.evaluate_value(tokens))
-                elif peek == "=":
-                    tokens.popleft()
-                    p = self.primitives["equalp"].primitive_func
-                    return p(self, sum(terms), self.evaluate_value(tokens))
-                elif peek == "<>":
-                    tokens.popleft()
-                    p = self.primitives["notequalp"].primitive_func
-                    return p(self, sum(terms), self.evaluate_value(tokens))
-                else:
-                    break
-            return sum(terms)
-        else:
+        if not isinstance(value, numbers.Number):
+            peek = tokens.peek()
+            if isinstance(peek, str) and peek in compiler.ARITHMETIC_FUNCS:
+                compiler._raise_not_a_number(peek, value)
+            return value
+        terms = [value]
+        while True:
             peek = tokens.peek()
-            if peek == "=":
+            if peek == "-":
+                tokens.popleft()
+                terms.append(-self.evaluate_infix_operand("-", tokens))
+            elif peek == "+":
+                tokens.popleft()
+                terms.append(self.evaluate_infix_operand("+", tokens))
+            elif peek == "*":
                 tokens.popleft()
-                p = self.primitives["equalp"].primitive_func
-                return p(self, value, self.evaluate_value(tokens))
-            elif peek == "<>":
+                terms[-1] *= self.evaluate_infix_operand("*", tokens)
+            elif peek == "/":
                 tokens.popleft()
-                p = self.primitives["notequalp"].primitive_func
-                return p(self, value, self.evaluate_value(tokens))
+                terms[-1] /= self.evaluate_infix_operand("/", tokens)
             else:
-                return value
+                return sum(terms)
+
+    def evaluate_infix_operand(self, op, tokens):
+        """
+        Evaluate the right operand of the infix arithmetic operator, `op`.
+        """
+        value = self.evaluate_value(tokens)
+        if not isinstance(value, numbers.Number):
+            compiler._raise_not_a_number(op, value)
+        return value
 
     def evaluate_value(self, tokens, quoted=False):
         """
@@ -417,13 +611,13 @@ class LogoInterpreter:
         token = tokens.peek()
         if token is None:
             raise errors.LogoError("Expected a value but instead got EOF.")
-        if is_list(token):
+        if tokenizer.is_list(token):
             lst_tokens = TokenStream.make_stream(tokens.popleft())
             return self.evaluate_list(lst_tokens)
-        if is_special_form(token):
+        if tokenizer.is_special_form(token):
             spcl_frm_tokens = TokenStream.make_stream(tokens.popleft())
             return self.process_special_form_or_expression(spcl_frm_tokens)
-        if is_paren_expr(token):
+        if tokenizer.is_paren_expr(token):
             expr_tokens = TokenStream.make_stream(tokens.popleft())
             return self.evaluate(expr_tokens)
         if isinstance(token, numbers.Number):
@@ -438,7 +632,7 @@ class LogoInterpreter:
                 temp_token = tokens.popleft()
                 temp_token = temp_token[1:]
                 tokens.appendleft(temp_token)
-                return -1 * self.evaluate(tokens)
+                return -1 * self.evaluate_value(tokens)
             return self.process_command(tokens)
         else:
             return tokens.popleft()
@@ -466,15 +660,97 @@ class LogoInterpreter:
         """
         Execute a procedure with args, `args`.
         """
+        active_profiler = self.profiler
         if proc.primitive_func:
-            return proc.primitive_func(self, *args)
-        tokens = TokenStream.make_stream(proc.tokens)
-        scope = {}
-        scope_stack = self.scope_stack
-        scope_stack.append(scope)
+            if active_profiler is None:
+                return proc.primitive_func(self, *args)
+            active_profiler.enter(proc)
+            try:
+                return proc.primitive_func(self, *args)
+            finally:
+                active_profiler.exit()
+        memo = proc.memo
+        if memo is not None:
+            key = datatypes.freeze(args)
+            result = memo.lookup(key)
+            if result is procedure.MISSING:
+                result = self.run_procedure(proc, args)
+                memo.store(key, result)
+            return result
+        return self.run_procedure(proc, args)
+
+    def run_procedure(self, proc, args):
+        """
+        Run the user defined procedure, `proc`, with args, `args`.
+        """
+        active_profiler = self.profiler
+        if self.backend == "stack" and not self.is_tracing():
+            return machine.execute(self, proc, args)
+        saved = {}
+        self.binding_stack.append(saved)
+        if active_profiler is not None:
+            active_profiler.enter(proc)
+        # How the result of a chain of tail calls is used.  See
+        # `compiler.TailCallNode`.
+        result_kind = "value"
+        output_node = None
+        try:
+            while True:
+                body = self.get_compiled_body(proc)
+                self.bind_inputs(proc, args, saved)
+                try:
+                    result = body.execute(self)
+                except errors.StopSignal:
+                    result = None
+                except errors.OutputSignal as output:
+                    result = output.value
+                else:
+                    if result is compiler.RETURN:
+                        # STOP or OUTPUT.  See `compiler.ReturnNode`.
+                        result = self.return_value
+                        self.return_value = None
+                    elif result is compiler.TAIL_CALL:
+                        # Run the callee in this frame.  Its inputs are bound
+                        # in the caller's scope, so the callee still sees the
+                        # caller's variables, and self recursion rebinds the
+                        # same names instead of growing the scope.
+                        node, args = self.tail_call
+                        self.tail_call = None
+                        proc = node.call.proc
+                        kind = node.kind
+                        if self.debug_procs:
+                            print("PROCEDURE:", node.call.command, "ARGS:", args)
+                        if active_profiler is not None:
+                            active_profiler.tail_call(proc)
+                        if result_kind == "value":
+                            result_kind = kind
+                            output_node = node
+                        elif result_kind == "output" and kind == "discard":
+                            result_kind = "error"
+                        continue
+                    else:
+                        result = None
+                break
+            if result_kind == "discard":
+                return None
+            if result_kind == "error" or (result_kind == "output" and result is None):
+                output_node.raise_null_output()
+            return result
+        finally:
+            if active_profiler is not None:
+                active_profiler.exit()
+            self.destroy_scope()
+
+    def bind_inputs(self, proc, args, saved):
+        """
+        Bind the inputs of the user defined procedure, `proc`, to `args`.
+        `saved` is the scope the inputs are bound in.
+        """
+        variables = self.variables
         formal_params = list(
             itertools.chain(
-                [(name, None) for name in proc.required_inputs], proc.optional_inputs
+                [(name, None) for name in proc.required_inputs],
+                proc.optional_inputs,
             )
         )
         rest_args = []
@@ -491,10 +767,7 @@ class LogoInterpreter:
                         and default_value.startswith(":")
                     ):
                         name = default_value[1:]
-                        for a_scope in reversed(scope_stack):
-                            if name in a_scope:
-                                value = a_scope[name]
-                                break
+                        value = variables.get(name)
                         if value is None:
                             raise errors.LogoError(
                                 "Default parameter "
@@ -509,28 +782,52 @@ class LogoInterpreter:
                         "Must have a value for formal parameter "
                         "`{}` in procedure `{}`.".format(varname, proc.name)
                     )
-                scope[varname] = value
+                if varname not in saved:
+                    saved[varname] = variables.get(varname, UNBOUND)
+                variables[varname] = value
         if rest_input:
-            scope[rest_input] = rest_args
-        result = None
-        try:
-            self.process_commands(tokens)
-        except errors.StopSignal:
-            result = None
-        except errors.OutputSignal as output:
-            result = output.value
-        scope_stack.pop()
-        return result
+            if rest_input not in saved:
+                saved[rest_input] = variables.get(rest_input, UNBOUND)
+            variables[rest_input] = rest_args
+
+    def get_compiled_body(self, proc):
+        """
+        Return the compiled body of a user defined procedure.
+        The body is compiled on first use and again after any procedure
+        has been (re)defined or the backend has changed.
+        """
+        closures = self.use_closures()
+        body = proc.compiled_body
+        if (
+            body is None
+            or body.generation != self.procedure_generation
+            or body.closures != closures
+        ):
+            body = compiler.compile_procedure(self, proc, closures=closures)
+            proc.compiled_body = body
+        return body
+
+    def use_closures(self):
+        """
+        Return True if procedure bodies should be compiled to closures.
+        """
+        return self.backend == "closure" and not self.is_tracing()
+
+    def is_tracing(self):
+        """
+        Return True if every call must go through `execute_procedure()`.
+        The closure and stack backends call primitives directly, so they
+        can't print debug output or be profiled.  The tree walker is used
+        instead.
+        """
+        return self.debug_procs or self.debug_primitives or self.profiler is not None
 
     def process_special_form_or_expression(self, tokens):
         """
         Process command special form OR a parenthesized expression.
         Command token and all args will be in the token stream.
         """
-        primitives = self.primitives
-        procedures = self.procedures
         command_token = tokens.popleft()
-        command = command_token.lower()
         second_token = None
         if len(tokens) > 0:
             second_token = tokens.peek()
@@ -546,13 +843,11 @@ class LogoInterpreter:
         ):
             tokens.appendleft(command_token)
             return self.evaluate(tokens)
-        if command in primitives:
-            proc = primitives[command]
-        elif command in procedures:
-            proc = procedures[command]
-        else:
+        entry = self.resolve_command(command_token)
+        if entry is None or entry[1] is None:
             tokens.appendleft(command_token)
             return self.evaluate(tokens)
+        command, proc, is_primitive = entry
         args = []
         while len(tokens) > 0:
             args.append(self.evaluate(tokens))
@@ -565,9 +860,10 @@ class LogoInterpreter:
             raise errors.LogoError(
                 "Not enough arguments for `{}`.".format(command_token)
             )
-        if self.debug_primitives and command in primitives:
-            print("PRIMITIVE:", command, "ARGS:", args)
-        if self.debug_procs and command in procedures:
+        if is_primitive:
+            if self.debug_primitives:
+                print("PRIMITIVE:", command, "ARGS:", args)
+        elif self.debug_procs:
             print("PROCEDURE:", command, "ARGS:", args)
         return self.execute_procedure(proc, args)
 
@@ -576,8 +872,7 @@ class LogoInterpreter:
         Handles input received from GUI.
         """
         try:
-            grammar = self.grammar
-            tokens = parse_tokens(grammar, data, debug=self.debug_tokens)
+            tokens = parse_tokens(self.tokenize, data, debug=self.debug_tokens)
             result = self.process_commands(tokens)
             if result is not None:
                 raise errors.LogoError(
@@ -668,12 +963,9 @@ def calculate(start, pairs):
     return result
 
 
-def make_token_grammar():
-    """
-    Make the token grammar.
-    """
-    grammar = parsley.makeGrammar(
-        r"""
+# The parsley token grammar.  `calculate` folds infix arithmetic and
+# rewrites it into prefix form.
+TOKEN_GRAMMAR = r"""
     punctuation = :x ?(x in "+-*/!'#$%&\,.:<=>?@^_`;" '"') -> x
     float = <'-'{0, 1} digit* '.' digit+>:ds -> float(ds)
     integer = <'-'{0, 1} digit+>:ds -> int(ds)
@@ -718,8 +1010,15 @@ def make_token_grammar():
     muldiv = ws (mul | div)
     expr = expr2:left addonly*:right -> calculate(left, right)
     expr2 = factor:left muldiv*:right -> calculate(left, right)
-    """,
-        {"calculate": calculate, "Comment": Comment},
+    """
+
+
+def make_token_grammar():
+    """
+    Make the token grammar.
+    """
+    grammar = parsley.makeGrammar(
+        TOKEN_GRAMMAR, {"calculate": calculate, "Comment": Comment}
     )
     return grammar
 
@@ -736,7 +1035,7 @@ def transform_tokens(tokens):
             tmp.extend(transform_tokens([item.right]))
         elif isinstance(item, Comment):
             continue
-        elif is_list(item):
+        elif tokenizer.is_list(item):
             tmp.append(transform_tokens(item))
         elif isinstance(item, tuple):
             tmp.append(tuple(transform_tokens(item)))
@@ -745,81 +1044,49 @@ def transform_tokens(tokens):
     return tmp
 
 
-def parse_tokens(grammar, script, debug=False):
+def parsley_tokenize(grammar, script):
     """
-    Parse a Logo script.
+    Tokenize a Logo script using the parsley token grammar.
+    This is the reference implementation for `tokenizer.tokenize()`.
     Return a list of tokens.
     """
     token_lst = grammar(script).itemlist()
-    token_lst = transform_tokens(token_lst)
-    tokens = TokenStream.make_stream(token_lst)
-    if debug:
-        print("PARSED TOKENS:", tokens)
-    return tokens
+    return transform_tokens(token_lst)
 
 
-def transform_qmark(command):
+def parse_tokens(tokenize, script, debug=False):
     """
-    If command is a `?` followed by a number, transform it to the
-    special form `(?, NUMBER)`.  Otherwise, return command unaltered.
+    Parse a Logo script.
+    Return a list of tokens.
     """
-    if not hasattr(command, "startswith"):
-        return command
-    if not command.startswith("?"):
-        return command
-    try:
-        pos = int(command[1:])
-    except ValueError:
-        return command
-    return ("?", pos)
-
-
-def is_special_form(token):
-    if not isinstance(token, tuple):
-        return False
-    first = token[0]
-    if is_command(first):
-        return True
-    return False
-
-
-def is_paren_expr(token):
-    if not isinstance(token, tuple):
-        return False
-    first = token[0]
-    if is_command(first):
-        return False
-    return True
-
-
-def is_command(token):
-    if not isinstance(token, str):
-        return False
-    if token.startswith(":"):
-        return False
-    if token.startswith('"'):
-        return False
-    return True
-
-
-def is_list(token):
-    return isinstance(token, list)
+    token_lst = tokenize(script)
+    tokens = TokenStream.make_stream(token_lst)
+    if debug:
+        print("PARSED TOKENS:", tokens)
+    return tokens
 
 
 def main(args):
     """
     Parse Logo
     """
-    grammar = make_token_grammar()
+    if args.benchmark:
+        from benchmarks import runner
+
+        return runner.run_from_args(LogoInterpreter, args)
     interpreter = LogoInterpreter.create_interpreter()
+    if args.tokenizer == "parsley":
+        interpreter.tokenize = functools.partial(parsley_tokenize, make_token_grammar())
+        interpreter.tokenizer_name = "parsley"
     interpreter.turtle_backend_args = dict(input_handler=interpreter.receive_input)
     if args.turtle == "tk":
         interpreter.turtle_backend_args["maximize"] = args.maximize
         interpreter.init_turtle_graphics()
     interpreter.debug_tokens = args.debug_tokens
-    interpreter.grammar = grammar
     interpreter.debug_primitives = args.debug_primitives
     interpreter.debug_procs = args.debug_procs
+    interpreter.backend = args.backend
+    interpreter.parallel_workers = args.workers
     script_folders = args.script_folder
     if script_folders is None:
         script_folders = []
@@ -852,9 +1119,17 @@ def main(args):
             html_args["animation_start"] = animation_start
         svg_args["html_args"] = html_args
         interpreter.turtle_backend_args = svg_args
+    interpreter.script_cache = args.script_cache
+    if args.profile or args.profile_output:
+        interpreter.profiler = profiler.Profiler()
     if args.file is not None:
-        script = args.file.read()
-        tokens = parse_tokens(grammar, script, debug=args.debug_tokens)
+        if args.script_cache and os.path.isfile(args.file.name):
+            tokens = TokenStream.make_stream(interpreter.tokenize_file(args.file.name))
+            if args.debug_tokens:
+                print("PARSED TOKENS:", tokens)
+        else:
+            script = args.file.read()
+            tokens = parse_tokens(interpreter.tokenize, script, debug=args.debug_tokens)
         if args.tokenize_only:
             return
         try:
@@ -862,6 +1137,12 @@ def main(args):
         except Exception as ex:
             print("Processed tokens: {}".format(tokens.processed), file=sys.stderr)
             raise ex
+        finally:
+            if interpreter.profiler is not None:
+                if args.profile:
+                    interpreter.profiler.print_report(sort=args.profile_sort)
+                if args.profile_output:
+                    interpreter.profiler.dump_stats(args.profile_output)
         if result is not None:
             raise errors.LogoError("You don't say what to do with `{}`.".format(result))
     if interpreter.is_turtle_active():
@@ -906,7 +1187,53 @@ if __name__ == "__main__":
         action="store_true",
         help="Only tokenize input.  Don't interpret.",
     )
-    parser.set_defaults(turtle=None)
+    parser.add_argument(
+        "--tokenizer",
+        action="store",
+        choices=["fast", "parsley"],
+        default="fast",
+        help="Tokenizer implementation.  `parsley` is the reference grammar.",
+    )
+    parser.add_argument(
+        "--backend",
+        action="store",
+        choices=["tree", "closure", "stack"],
+        default="tree",
+        help=(
+            "How compiled procedures run.  `closure` is faster for batch "
+            "rendering.  `stack` allows deep non-tail recursion."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        action="store",
+        help="Worker processes for EXT.PMAP and EXT.PFILTER.  Defaults to the CPU count.",
+    )
+    parser.add_argument(
+        "--script-cache",
+        action="store_true",
+        help="Cache tokenized scripts in `__logocache__` folders next to them.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time spent in each primitive and procedure.",
+    )
+    parser.add_argument(
+        "--profile-sort",
+        action="store",
+        choices=["self", "cumulative", "calls"],
+        default="self",
+        help="Sort order for the `--profile` report.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        action="store",
+        help="Save profile stats to FILE in the format `pstats` loads.",
+    )
+    parser.set_defaults(turtle=None, benchmark=False)
     subparsers = parser.add_subparsers(help="Turtle back ends.")
     parser_tk = subparsers.add_parser("gui", help="GUI mode")
     parser_tk.set_defaults(turtle="tk")
@@ -965,5 +1292,16 @@ if __name__ == "__main__":
         default="automatic",
         help="Set animation type for web resources.",
     )
+    try:
+        from benchmarks import runner
+    except ImportError:
+        # The benchmarks are only available in a source checkout.
+        runner = None
+    if runner is not None:
+        parser_bench = subparsers.add_parser(
+            "bench", help="Run the benchmark suite in `benchmarks/`."
+        )
+        parser_bench.set_defaults(benchmark=True)
+        runner.add_arguments(parser_bench)
     args = parser.parse_args()
-    main(args)
+    sys.exit(main(args))
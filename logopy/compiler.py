@@ -0,0 +1,1037 @@
+"""
+Compile Logo procedure bodies into trees of nodes.
+
+The token interpreter works out arity, special forms, `:var` references and
+infix operators one token at a time, every time a procedure body runs.
+`compile_procedure()` does that work once and returns a `CompiledBody` made
+of call, literal, variable and infix nodes.  These nodes are evaluated
+directly.
+
+Infix arithmetic is compiled by precedence climbing into a tree of
+`ArithmeticNode`s, so evaluating it is a single walk of the tree.
+Operations whose operands are all numbers, such as the `10 - 4` in
+`:size * (10 - 4)`, are done once, when the expression is compiled.
+
+A body is compiled the first time its procedure runs, not when TO runs, so
+it can call procedures that are defined later in the script.  Each compiled
+body records the interpreter's `procedure_generation` and is recompiled
+after any procedure is defined or redefined.
+
+The compiler stops at anything it cannot resolve ahead of time, such as a
+call to an unknown procedure or a nested TO.  The rest of the body is
+handed to the token interpreter, so errors are still reported when, and if,
+they are reached.
+
+A call to a user defined procedure that is the last instruction of a body,
+or the input to OUTPUT, is compiled as a `TailCallNode`.  Instead of calling
+the procedure it returns `TAIL_CALL`, and `execute_procedure()` runs the
+callee in a loop rather than nesting Python frames.
+
+STOP and OUTPUT instructions are compiled as `ReturnNode`s.  Rather than
+raise `StopSignal` or `OutputSignal`, they leave the output in
+`logo.return_value` and return `RETURN`.  IF and IFELSE with literal
+instruction lists are compiled as `IfNode`s, which pass `RETURN` up from
+their lists, so `if :n < 2 [output :n]` returns without an exception.
+Code that runs a compiled body and doesn't expect `RETURN` calls
+`CompiledBody.run()`, which raises the signal instead.  While debug output
+or the profiler is on, these nodes are not used, so every call still goes
+through `execute_procedure()`.
+
+There are two ways to run a compiled body.  By default each node's
+`evaluate()` method walks the tree.  With `closures=True` the tree is turned
+into nested Python closures once, and primitives are called directly with
+their arguments bound positionally.  `machine.execute()` runs bodies
+without nesting Python frames for calls between procedures.
+"""
+
+import numbers
+import operator
+
+from logopy import errors, procedure, tokenizer
+
+ARITHMETIC_FUNCS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+# `*` and `/` bind more tightly than `+` and `-`.  Operators of equal
+# precedence group to the left.
+ARITHMETIC_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+COMPARISON_PRIMITIVES = {
+    "<": "lessp",
+    "<=": "lessequalp",
+    ">": "greaterp",
+    ">=": "greaterequalp",
+    "=": "equalp",
+    "<>": "notequalp",
+}
+
+SPECIAL_FORM_INFIX_OPERATORS = ("-", "+", "*", "/", "=", "<>", ">=", "<=")
+
+# Returned by a `TailCallNode`.  The call itself is left in `logo.tail_call`.
+TAIL_CALL = object()
+
+# Returned by a `ReturnNode`.  The output is left in `logo.return_value`.
+RETURN = object()
+
+
+class Uncompilable(Exception):
+    """
+    Raised when tokens can't be compiled ahead of time.
+    """
+
+
+class CompiledBody:
+    """
+    A compiled list of instructions.
+    """
+
+    __slots__ = (
+        "tokens",
+        "nodes",
+        "statements",
+        "offsets",
+        "generation",
+        "closures",
+        "expressions",
+        "code",
+    )
+
+    def __init__(
+        self, tokens, nodes, offsets, generation, closures=False, expressions=False
+    ):
+        self.tokens = tokens
+        self.nodes = nodes
+        self.offsets = offsets
+        self.generation = generation
+        self.closures = closures
+        self.expressions = expressions
+        # Instructions for the stack machine.  See `machine.get_code()`.
+        self.code = None
+        if closures:
+            self.statements = [node.make_closure() for node in nodes]
+        else:
+            self.statements = [node.evaluate for node in nodes]
+
+    def execute(self, logo):
+        """
+        Run the instructions.
+        Return the value of the last instruction.
+        """
+        result = None
+        generation = self.generation
+        for offset, statement in zip(self.offsets, self.statements):
+            if logo.procedure_generation != generation:
+                # A procedure was (re)defined while this body was running.
+                # The rest of the body may refer to it, so interpret the
+                # remaining tokens instead.
+                if self.expressions:
+                    return logo.run_token_list(self.tokens[offset:])
+                return logo.process_token_list(self.tokens[offset:])
+            if logo.halt:
+                raise errors.HaltSignal("Received HALT")
+            result = statement(logo)
+            if result is TAIL_CALL or result is RETURN:
+                return result
+            logo.process_events()
+        return result
+
+    def run(self, logo):
+        """
+        Run the instructions for a caller that doesn't handle `RETURN`.
+        A STOP or OUTPUT raises its signal instead.
+        """
+        result = self.execute(logo)
+        if result is RETURN:
+            raise_return(logo)
+        return result
+
+
+class LiteralNode:
+    """
+    A number or a quoted word.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, logo):
+        return self.value
+
+    def make_closure(self):
+        value = self.value
+        return lambda logo: value
+
+
+class ListNode:
+    """
+    A literal list.
+    The same list is returned each time.  Primitives don't change their
+    inputs; PUSH, QUEUE and friends put a new `DequeList` in their
+    variable instead.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, logo):
+        return self.value
+
+    def make_closure(self):
+        value = self.value
+        return lambda logo: value
+
+
+class VariableNode:
+    """
+    A `:var` reference.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def evaluate(self, logo):
+        value = logo.variables.get(self.name)
+        if value is None:
+            return logo.get_variable_value(self.name)
+        return value
+
+    def make_closure(self):
+        name = self.name
+
+        def variable(logo):
+            value = logo.variables.get(name)
+            if value is None:
+                return logo.get_variable_value(name)
+            return value
+
+        return variable
+
+
+class NegateNode:
+    """
+    A word prefixed with `-`, e.g. `-:x`.
+    """
+
+    __slots__ = ("operand",)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def evaluate(self, logo):
+        return -1 * self.operand.evaluate(logo)
+
+    def make_closure(self):
+        operand = self.operand.make_closure()
+        return lambda logo: -1 * operand(logo)
+
+
+class ArithmeticNode:
+    """
+    An infix arithmetic operation, `left op right`.
+
+    `check_left` and `check_right` are set when an operand may not be a
+    number, as `LogoInterpreter.evaluate()` checks each value that infix
+    arithmetic is applied to.  `check_left` is the operator to name in the
+    error, which is the operator before `left` if there is one.  `is_root`
+    is set on the operation that produces the value of the whole
+    expression.  `0` is added to that value, so it is identical to the
+    `sum()` of terms that the token interpreter computes.
+    """
+
+    __slots__ = ("op", "left", "right", "func", "check_left", "check_right", "is_root")
+
+    def __init__(self, op, left, right, check_left=None, check_right=False):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.func = ARITHMETIC_FUNCS[op]
+        self.check_left = check_left
+        self.check_right = check_right
+        self.is_root = False
+
+    def evaluate(self, logo):
+        left = self.left.evaluate(logo)
+        if self.check_left and not isinstance(left, numbers.Number):
+            _raise_not_a_number(self.check_left, left)
+        right = self.right.evaluate(logo)
+        if self.check_right and not isinstance(right, numbers.Number):
+            _raise_not_a_number(self.op, right)
+        value = self.func(left, right)
+        if self.is_root:
+            return 0 + value
+        return value
+
+    def make_closure(self):
+        op = self.op
+        func = self.func
+        left = self.left.make_closure()
+        right = self.right.make_closure()
+        is_root = self.is_root
+        if not self.check_left and not self.check_right:
+            if is_root:
+                return lambda logo: 0 + func(left(logo), right(logo))
+            return lambda logo: func(left(logo), right(logo))
+        check_left = self.check_left
+        check_right = self.check_right
+
+        def arithmetic(logo):
+            a = left(logo)
+            if check_left and not isinstance(a, numbers.Number):
+                _raise_not_a_number(check_left, a)
+            b = right(logo)
+            if check_right and not isinstance(b, numbers.Number):
+                _raise_not_a_number(op, b)
+            if is_root:
+                return 0 + func(a, b)
+            return func(a, b)
+
+        return arithmetic
+
+
+class CompareNode:
+    """
+    An infix comparison, e.g. `:n < 2`.  The right operand is a single
+    value, as in `LogoInterpreter.evaluate()`.
+    """
+
+    __slots__ = ("op", "left", "right", "func", "check_left")
+
+    def __init__(self, op, left, right, func, check_left=False):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.func = func
+        self.check_left = check_left
+
+    def evaluate(self, logo):
+        value = self.left.evaluate(logo)
+        if self.check_left and not isinstance(value, numbers.Number):
+            _raise_not_a_number(self.op, value)
+        return self.func(logo, value, self.right.evaluate(logo))
+
+    def make_closure(self):
+        op = self.op
+        func = self.func
+        left = self.left.make_closure()
+        right = self.right.make_closure()
+        if not self.check_left:
+            return lambda logo: func(logo, left(logo), right(logo))
+
+        def compare(logo):
+            value = left(logo)
+            if not isinstance(value, numbers.Number):
+                _raise_not_a_number(op, value)
+            return func(logo, value, right(logo))
+
+        return compare
+
+
+def _raise_not_a_number(op, value):
+    raise errors.LogoError(
+        "Infix `{}` expects a number but received `{}` instead.".format(op, value)
+    )
+
+
+class CallNode:
+    """
+    A call to a primitive or procedure whose arguments have been resolved.
+    """
+
+    __slots__ = ("proc", "command", "args", "is_primitive", "check_args")
+
+    def __init__(self, proc, command, args, is_primitive, check_args=True):
+        self.proc = proc
+        self.command = command
+        self.args = args
+        self.is_primitive = is_primitive
+        self.check_args = check_args
+
+    def evaluate(self, logo):
+        args = [arg.evaluate(logo) for arg in self.args]
+        if self.check_args and None in args:
+            self.raise_null_argument(args)
+        if self.is_primitive:
+            if logo.debug_primitives:
+                print("PRIMITIVE:", self.command, "ARGS:", args)
+        elif logo.debug_procs:
+            print("PROCEDURE:", self.command, "ARGS:", args)
+        return logo.execute_procedure(self.proc, args)
+
+    def make_closure(self):
+        """
+        Primitives are called directly.  Debug output is not supported, so
+        bodies are only compiled to closures when debugging is off.
+        """
+        proc = self.proc
+        arg_funcs = [arg.make_closure() for arg in self.args]
+        check_args = self.check_args
+        raise_null_argument = self.raise_null_argument
+        if not self.is_primitive:
+
+            def call_procedure(logo):
+                args = [f(logo) for f in arg_funcs]
+                if check_args and None in args:
+                    raise_null_argument(args)
+                return logo.execute_procedure(proc, args)
+
+            return call_procedure
+        func = proc.primitive_func
+        arity = len(arg_funcs)
+        if arity == 0:
+            return func
+        if arity == 1 and check_args:
+            (f1,) = arg_funcs
+
+            def call_primitive1(logo):
+                a1 = f1(logo)
+                if a1 is None:
+                    raise_null_argument([a1])
+                return func(logo, a1)
+
+            return call_primitive1
+        if arity == 2 and check_args:
+            f1, f2 = arg_funcs
+
+            def call_primitive2(logo):
+                a1 = f1(logo)
+                a2 = f2(logo)
+                if a1 is None or a2 is None:
+                    raise_null_argument([a1, a2])
+                return func(logo, a1, a2)
+
+            return call_primitive2
+
+        def call_primitive(logo):
+            args = [f(logo) for f in arg_funcs]
+            if check_args and None in args:
+                raise_null_argument(args)
+            return func(logo, *args)
+
+        return call_primitive
+
+    def raise_null_argument(self, args):
+        kind = "Primitive" if self.is_primitive else "Procedure"
+        raise errors.LogoError(
+            "{} `{}` received a null value for argument {}.".format(
+                kind,
+                self.command.upper(),
+                [arg is None for arg in args].index(True) + 1,
+            )
+        )
+
+
+class TailCallNode:
+    """
+    A call to a user defined procedure in tail position.
+
+    The arguments are evaluated, then the call is stored in
+    `logo.tail_call` as a tuple of `(node, args)` and `TAIL_CALL` is
+    returned.  `kind` says what the caller does with the result:
+
+    * `value` - The result is passed through, e.g. `(output proc)`.
+    * `output` - The result is passed through, but it must not be null.
+    * `discard` - The result is ignored, e.g. `proc` as the last instruction.
+    """
+
+    __slots__ = ("call", "kind", "output_command")
+
+    def __init__(self, call, kind, output_command=None):
+        self.call = call
+        self.kind = kind
+        self.output_command = output_command
+
+    def evaluate(self, logo):
+        call = self.call
+        args = [arg.evaluate(logo) for arg in call.args]
+        if call.check_args and None in args:
+            call.raise_null_argument(args)
+        logo.tail_call = (self, args)
+        return TAIL_CALL
+
+    def make_closure(self):
+        node = self
+        call = self.call
+        arg_funcs = [arg.make_closure() for arg in call.args]
+        check_args = call.check_args
+        raise_null_argument = call.raise_null_argument
+
+        def tail_call(logo):
+            args = [f(logo) for f in arg_funcs]
+            if check_args and None in args:
+                raise_null_argument(args)
+            logo.tail_call = (node, args)
+            return TAIL_CALL
+
+        return tail_call
+
+    def raise_null_output(self):
+        raise errors.LogoError(
+            "Primitive `{}` received a null value for argument 1.".format(
+                self.output_command.upper()
+            )
+        )
+
+
+class ReturnNode:
+    """
+    A STOP or OUTPUT instruction.  The output, or None for STOP, is left in
+    `logo.return_value` and `RETURN` is returned.
+    """
+
+    __slots__ = ("call",)
+
+    def __init__(self, call):
+        self.call = call
+
+    def evaluate(self, logo):
+        call = self.call
+        value = None
+        if call.args:
+            value = call.args[0].evaluate(logo)
+            if call.check_args and value is None:
+                call.raise_null_argument([value])
+        logo.return_value = value
+        return RETURN
+
+    def make_closure(self):
+        call = self.call
+        if not call.args:
+
+            def stop(logo):
+                logo.return_value = None
+                return RETURN
+
+            return stop
+        f1 = call.args[0].make_closure()
+        check_args = call.check_args
+        raise_null_argument = call.raise_null_argument
+
+        def output(logo):
+            value = f1(logo)
+            if check_args and value is None:
+                raise_null_argument([value])
+            logo.return_value = value
+            return RETURN
+
+        return output
+
+
+def raise_return(logo):
+    """
+    Raise the signal for a `RETURN` that reached code that doesn't handle
+    it.
+    """
+    value = logo.return_value
+    logo.return_value = None
+    if value is None:
+        raise errors.StopSignal()
+    raise errors.OutputSignal(value)
+
+
+class IfNode:
+    """
+    A call to IF or IFELSE whose instruction lists are literal lists.
+
+    The lists are compiled the first time they run.  If the node is an
+    instruction of its own, `is_statement` is set and a STOP or OUTPUT in
+    the chosen list returns `RETURN` through it.  Otherwise the signal is
+    raised, as it would be by `process_if()`.
+    """
+
+    __slots__ = ("call", "bodies", "is_statement")
+
+    def __init__(self, call):
+        self.call = call
+        # Compiled instruction lists by input position.
+        self.bodies = {}
+        self.is_statement = False
+
+    def evaluate(self, logo):
+        return self.choose(logo, self.call.args[0].evaluate(logo))
+
+    def make_closure(self):
+        tf_func = self.call.args[0].make_closure()
+        choose = self.choose
+        return lambda logo: choose(logo, tf_func(logo))
+
+    def choose(self, logo, tf):
+        """
+        Run the instruction list that `tf` chooses.  Return its result.
+        """
+        call = self.call
+        if call.check_args and tf is None:
+            call.raise_null_argument([tf])
+        if procedure.if_condition(call.command.upper(), logo, tf):
+            n = 1
+        elif len(call.args) == 3:
+            n = 2
+        else:
+            return None
+        body = self.bodies.get(n)
+        if body is None or body.generation != logo.procedure_generation:
+            body = self.bodies[n] = logo.compile_instructionlist(call.args[n].value)
+        if self.is_statement:
+            return body.execute(logo)
+        return body.run(logo)
+
+
+class ShortCircuitNode:
+    """
+    A call to AND or OR with at least one input that is a literal
+    instruction list.
+
+    Other inputs are evaluated first, as for any call.  The instruction
+    lists are compiled the first time they run and are only run until an
+    input decides the result, so a guard such as `and :x > 0 [expensive :x]`
+    skips `expensive` when `:x` isn't positive.
+    """
+
+    __slots__ = ("call", "stop_value", "bodies")
+
+    def __init__(self, call):
+        self.call = call
+        # AND stops at the first FALSE, OR at the first TRUE.
+        self.stop_value = call.proc.primitive_func is procedure.process_or
+        # Compiled instruction lists by input position.
+        self.bodies = {}
+
+    def eager_args(self):
+        """
+        Return the argument nodes that are evaluated before the call.
+        """
+        return [arg for arg in self.call.args if not isinstance(arg, ListNode)]
+
+    def evaluate(self, logo):
+        return self.combine(logo, [arg.evaluate(logo) for arg in self.eager_args()])
+
+    def make_closure(self):
+        arg_funcs = [arg.make_closure() for arg in self.eager_args()]
+        combine = self.combine
+
+        def short_circuit(logo):
+            return combine(logo, [f(logo) for f in arg_funcs])
+
+        return short_circuit
+
+    def combine(self, logo, values):
+        """
+        Output the result, given the values of the eager arguments.
+        """
+        call = self.call
+        if call.check_args and None in values:
+            call.raise_null_argument(values)
+        cmd = call.command.upper()
+        stop_value = self.stop_value
+        values = iter(values)
+        for n, arg in enumerate(call.args):
+            if isinstance(arg, ListNode):
+                tf = procedure.truth_value(cmd, self.run_list(logo, n))
+            else:
+                tf = procedure.logical_input(cmd, logo, next(values))
+            if tf is stop_value:
+                break
+        else:
+            tf = not stop_value
+        return "true" if tf else "false"
+
+    def run_list(self, logo, n):
+        body = self.bodies.get(n)
+        if body is None or body.generation != logo.procedure_generation:
+            body = self.bodies[n] = logo.compile_instructionlist(
+                self.call.args[n].value
+            )
+        return body.run(logo)
+
+
+class DynamicValueNode:
+    """
+    A single token that is evaluated by the token interpreter.
+    """
+
+    __slots__ = ("token",)
+
+    def __init__(self, token):
+        self.token = token
+
+    def evaluate(self, logo):
+        return logo.evaluate_token_list([self.token])
+
+    def make_closure(self):
+        return self.evaluate
+
+
+class DynamicNode:
+    """
+    Instructions that are run by the token interpreter.
+    """
+
+    __slots__ = ("tokens", "expressions")
+
+    def __init__(self, tokens, expressions=False):
+        self.tokens = tokens
+        self.expressions = expressions
+
+    def evaluate(self, logo):
+        if self.expressions:
+            return logo.run_token_list(self.tokens)
+        return logo.process_token_list(self.tokens)
+
+    def make_closure(self):
+        return self.evaluate
+
+
+class _Cursor:
+    """
+    A position in a list of tokens.
+    """
+
+    __slots__ = ("tokens", "pos")
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.pos = 0
+
+    def __len__(self):
+        return len(self.tokens) - self.pos
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def popleft(self):
+        if self.pos >= len(self.tokens):
+            raise Uncompilable("Expected a value but instead got EOF.")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def appendleft(self, token):
+        self.pos -= 1
+        self.tokens[self.pos] = token
+
+
+def compile_procedure(logo, proc, closures=False):
+    """
+    Compile the body of the user defined procedure, `proc`.
+    """
+    return compile_tokens(logo, proc.tokens, closures=closures, tail_calls=True)
+
+
+def compile_tokens(logo, tokens, closures=False, tail_calls=False, expressions=False):
+    """
+    Compile a sequence of instruction tokens into a `CompiledBody`.
+    If `closures` is True, the body runs as nested closures instead of
+    walking the tree.
+    If `tail_calls` is True, calls in tail position are compiled as
+    `TailCallNode`s.  Only a procedure body may contain them.
+    If `expressions` is True, each instruction may be an expression, as
+    in a list run by RUN.  Mirrors `LogoInterpreter.run_token_list()`.
+    """
+    tokens = list(tokens)
+    cursor = _Cursor(tokens)
+    statements = []
+    offsets = []
+    compile_statement = _compile_expression if expressions else _compile_command
+    while len(cursor) > 0:
+        offset = cursor.pos
+        try:
+            statement = compile_statement(logo, cursor)
+        except Uncompilable:
+            statement = DynamicNode(tokens[offset:], expressions=expressions)
+            cursor.pos = len(tokens)
+        statements.append(statement)
+        offsets.append(offset)
+    if tail_calls:
+        last = len(statements) - 1
+        statements = [
+            _mark_tail_call(statement, n == last)
+            for n, statement in enumerate(statements)
+        ]
+    if not logo.is_tracing():
+        statements = [_mark_return(statement) for statement in statements]
+    return CompiledBody(
+        tokens,
+        statements,
+        offsets,
+        logo.procedure_generation,
+        closures=closures,
+        expressions=expressions,
+    )
+
+
+def _mark_tail_call(statement, is_last):
+    """
+    Return a `TailCallNode` if `statement` is a call in tail position.
+    Otherwise return `statement`.
+    """
+    if not isinstance(statement, CallNode):
+        return statement
+    if not statement.is_primitive:
+        # A memoized procedure has to return to `execute_procedure()`,
+        # which stores its result.
+        if is_last and statement.proc.memo is None:
+            return TailCallNode(statement, "discard")
+        return statement
+    if statement.proc.primitive_func is not procedure.process_output:
+        return statement
+    if len(statement.args) != 1:
+        return statement
+    call = statement.args[0]
+    if not isinstance(call, CallNode) or call.is_primitive:
+        return statement
+    if call.proc.memo is not None:
+        return statement
+    if statement.check_args:
+        return TailCallNode(call, "output", output_command=statement.command)
+    return TailCallNode(call, "value")
+
+
+def _mark_return(statement):
+    """
+    Compile a STOP or OUTPUT instruction as a `ReturnNode`, and let an IF
+    or IFELSE instruction return `RETURN`.
+    """
+    if isinstance(statement, IfNode):
+        statement.is_statement = True
+        return statement
+    if not isinstance(statement, CallNode) or not statement.is_primitive:
+        return statement
+    func = statement.proc.primitive_func
+    nargs = len(statement.args)
+    if (func is procedure.process_output and nargs == 1) or (
+        func is procedure.process_stop and nargs == 0
+    ):
+        return ReturnNode(statement)
+    return statement
+
+
+def _compile_command(logo, cursor):
+    """
+    Compile a command.  Mirrors `LogoInterpreter.process_command()`.
+    """
+    token = tokenizer.transform_qmark(cursor.popleft())
+    if tokenizer.is_special_form(token):
+        return _compile_special_form_or_expression(logo, token)
+    if not tokenizer.is_command(token):
+        raise Uncompilable("Expected a command.")
+    command = token.lower()
+    if command == "to":
+        raise Uncompilable("TO can't be compiled.")
+    proc, is_primitive = _lookup(logo, command)
+    args = [_compile_expression(logo, cursor) for n in range(proc.default_arity)]
+    return _make_call(logo, CallNode(proc, command, args, is_primitive))
+
+
+def _compile_special_form_or_expression(logo, form):
+    """
+    Compile a parenthesized command special form or expression.
+    Mirrors `LogoInterpreter.process_special_form_or_expression()`.
+    """
+    cursor = _Cursor(form)
+    command_token = cursor.popleft()
+    command = command_token.lower()
+    second_token = cursor.peek()
+    if isinstance(second_token, str) and second_token in SPECIAL_FORM_INFIX_OPERATORS:
+        return _compile_expression(logo, _Cursor(form))
+    try:
+        proc, is_primitive = _lookup(logo, command)
+    except Uncompilable:
+        return _compile_expression(logo, _Cursor(form))
+    args = []
+    while len(cursor) > 0:
+        args.append(_compile_expression(logo, cursor))
+    max_arity = proc.max_arity
+    if max_arity != -1 and len(args) > max_arity:
+        raise Uncompilable("Too many arguments.")
+    if len(args) < proc.min_arity:
+        raise Uncompilable("Not enough arguments.")
+    return _make_call(
+        logo, CallNode(proc, command, args, is_primitive, check_args=False)
+    )
+
+
+def _make_call(logo, call):
+    """
+    Return the node for a call.  AND and OR with literal instruction list
+    inputs short-circuit, and IF and IFELSE with literal instruction lists
+    run them directly.
+    """
+    if not call.is_primitive or logo.is_tracing():
+        return call
+    func = call.proc.primitive_func
+    args = call.args
+    if func in (procedure.process_and, procedure.process_or):
+        if any(isinstance(arg, ListNode) for arg in args):
+            return ShortCircuitNode(call)
+    elif func in (procedure.process_if, procedure.process_ifelse):
+        if len(args) in (2, 3) and all(isinstance(arg, ListNode) for arg in args[1:]):
+            return IfNode(call)
+    return call
+
+
+def _compile_expression(logo, cursor):
+    """
+    Compile a value and any infix operators that follow it.
+    Mirrors `LogoInterpreter.evaluate()`.
+    """
+    node = _compile_arithmetic_expression(logo, cursor)
+    peek = cursor.peek()
+    if isinstance(peek, str) and peek in COMPARISON_PRIMITIVES:
+        cursor.popleft()
+        func = logo.primitives[COMPARISON_PRIMITIVES[peek]].primitive_func
+        check_left = not _is_number_node(node) and peek not in ("=", "<>")
+        right = _compile_arithmetic_expression(logo, cursor)
+        node = CompareNode(peek, node, right, func, check_left)
+    return node
+
+
+def _compile_arithmetic_expression(logo, cursor):
+    """
+    Compile a value and any infix arithmetic that follows it.
+    Mirrors `LogoInterpreter.evaluate_arithmetic()`.
+    """
+    first = _compile_value(logo, cursor)
+    node = _compile_arithmetic(logo, cursor, first, 1)
+    if isinstance(node, ArithmeticNode):
+        node.is_root = True
+    elif node is not first:
+        node = LiteralNode(0 + node.value)
+    return node
+
+
+def _compile_arithmetic(logo, cursor, left, min_precedence, left_op=None):
+    """
+    Compile the arithmetic operators that follow `left` by precedence
+    climbing.  Operators that bind less tightly than `min_precedence` are
+    left for the caller.  `left_op` is the operator that `left` is the
+    right operand of, if any.  The token interpreter names it when `left`
+    is not a number.
+    """
+    while True:
+        op = cursor.peek()
+        precedence = _precedence(op)
+        if precedence < min_precedence:
+            return left
+        cursor.popleft()
+        right = _compile_value(logo, cursor)
+        while _precedence(cursor.peek()) > precedence:
+            right = _compile_arithmetic(logo, cursor, right, precedence + 1, op)
+        left = _make_arithmetic(op, left, right, left_op or op)
+
+
+def _precedence(token):
+    """
+    Return the precedence of an arithmetic operator, or 0 for any other
+    token.
+    """
+    if isinstance(token, str):
+        return ARITHMETIC_PRECEDENCE.get(token, 0)
+    return 0
+
+
+def _make_arithmetic(op, left, right, left_op):
+    """
+    Return an `ArithmeticNode`, or a `LiteralNode` with the result if both
+    operands are numbers.  `left_op` is the operator to name if `left` is
+    not a number.
+    """
+    if _is_number_literal(left) and _is_number_literal(right):
+        try:
+            return LiteralNode(ARITHMETIC_FUNCS[op](left.value, right.value))
+        except ArithmeticError:
+            # e.g. division by zero, which is reported if it is reached.
+            pass
+    return ArithmeticNode(
+        op,
+        left,
+        right,
+        check_left=None if _is_number_node(left) else left_op,
+        check_right=not _is_number_node(right),
+    )
+
+
+def _is_number_literal(node):
+    return isinstance(node, LiteralNode) and isinstance(node.value, numbers.Number)
+
+
+def _is_number_node(node):
+    """
+    Return True if `node` always produces a number.
+    """
+    return _is_number_literal(node) or isinstance(node, ArithmeticNode)
+
+
+def _compile_value(logo, cursor):
+    """
+    Compile the next value.
+    Mirrors `LogoInterpreter.evaluate_value()`.
+    """
+    token = cursor.peek()
+    if token is None:
+        raise Uncompilable("Expected a value but instead got EOF.")
+    if tokenizer.is_list(token):
+        cursor.popleft()
+        if _contains_form(token):
+            return DynamicValueNode(token)
+        return ListNode(token)
+    if tokenizer.is_special_form(token):
+        cursor.popleft()
+        return _compile_special_form_or_expression(logo, token)
+    if tokenizer.is_paren_expr(token):
+        cursor.popleft()
+        return _compile_expression(logo, _Cursor(token))
+    if isinstance(token, numbers.Number):
+        cursor.popleft()
+        return LiteralNode(token)
+    if token.startswith('"'):
+        cursor.popleft()
+        return LiteralNode(token[1:])
+    if token.startswith(":"):
+        cursor.popleft()
+        return VariableNode(token[1:])
+    if token.startswith("-") and token != "-":
+        cursor.popleft()
+        cursor.appendleft(token[1:])
+        operand = _compile_value(logo, cursor)
+        if _is_number_literal(operand):
+            return LiteralNode(-1 * operand.value)
+        return NegateNode(operand)
+    return _compile_command(logo, cursor)
+
+
+def _lookup(logo, command):
+    """
+    Resolve a command name.
+    Return a tuple of (procedure, is_primitive).
+    """
+    proc = logo.primitives.get(command)
+    if proc is not None:
+        return proc, True
+    proc = logo.procedures.get(command)
+    if proc is not None:
+        return proc, False
+    raise Uncompilable("I don't know how to `{}`.".format(command))
+
+
+def _contains_form(lst):
+    """
+    Return True if the list contains a parenthesized form at any depth.
+    Such forms are evaluated when the list is.
+    """
+    for item in lst:
+        if isinstance(item, tuple):
+            return True
+        if isinstance(item, list) and _contains_form(item):
+            return True
+    return False
@@ -0,0 +1,511 @@
+"""
+Python representations of Logo data types other than plain words and lists.
+"""
+
+import array
+import collections
+import itertools
+
+
+class ListProxy(list):
+    """
+    Base class for Logo lists that keep their members somewhere other than
+    the underlying list storage.
+
+    A proxy is still a `list`, so every primitive reads it like any other
+    Logo list.  The list storage is left empty, so every `list` method is
+    overridden in terms of `__iter__()`, `__len__()` and `_item()`.  Python
+    gives the overrides of a `list` subclass priority over the methods of a
+    plain list, e.g. `[1] + p` calls `p.__radd__()` and `[1] == p` calls
+    `p.__eq__()`.
+
+    Proxies are immutable unless a subclass says otherwise.
+    """
+
+    __slots__ = ()
+
+    def _item(self, index):
+        """
+        Return the member at non-negative `index`, which is less than the
+        length.  This walks the members, so subclasses that can index
+        their storage override it.
+        """
+        return next(itertools.islice(self, index, None))
+
+    def _slice(self, key):
+        """
+        Return the members selected by the slice, `key`.
+        """
+        return list(self)[key]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._slice(key)
+        size = len(self)
+        if key < 0:
+            key += size
+        if key < 0 or key >= size:
+            raise IndexError("list index out of range")
+        return self._item(key)
+
+    def __contains__(self, item):
+        for member in self:
+            if member is item or member == item:
+                return True
+        return False
+
+    def __reversed__(self):
+        return reversed(list(self))
+
+    def __eq__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return not self == other
+
+    def __lt__(self, other):
+        return list(self) < list(other)
+
+    def __le__(self, other):
+        return list(self) <= list(other)
+
+    def __gt__(self, other):
+        return list(self) > list(other)
+
+    def __ge__(self, other):
+        return list(self) >= list(other)
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __mul__(self, n):
+        return list(self) * n
+
+    __rmul__ = __mul__
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def copy(self):
+        return list(self)
+
+    def count(self, item):
+        return list(self).count(item)
+
+    def index(self, item, *args):
+        return list(self).index(item, *args)
+
+    def _immutable(self, *args, **kwds):
+        raise TypeError("`{}` can't be changed in place.".format(type(self).__name__))
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = reverse = sort = _immutable
+
+
+class DequeList(ListProxy):
+    """
+    A Logo list backed by a `collections.deque`, so adding or removing a
+    member at either end takes constant time.
+
+    PUSH, POP, QUEUE and DEQUEUE turn the list in their variable into a
+    `DequeList`.  Like other proxies it is never changed in place, because
+    other variables may share it.  Instead, `push_left()`, `pop_left()`
+    and `pop_right()` hand the deque over to a new `DequeList` and keep a
+    note of how to undo the change.  If the old list is read again, it
+    copies the deque from the newest list and undoes the changes.
+    """
+
+    __slots__ = ("_deque", "_newer", "_undo")
+
+    def __init__(self, iterable=()):
+        super().__init__()
+        self._deque = collections.deque(iterable)
+        self._newer = None
+        self._undo = None
+
+    @property
+    def _items(self):
+        if self._newer is not None:
+            self._restore()
+        return self._deque
+
+    def _restore(self):
+        """
+        Rebuild the deque of a list that handed it over.
+        """
+        undos = []
+        lst = self
+        while lst._newer is not None:
+            undos.append(lst._undo)
+            lst = lst._newer
+        items = collections.deque(lst._deque)
+        for undo, args in reversed(undos):
+            undo(items, *args)
+        self._deque = items
+        self._newer = None
+        self._undo = None
+
+    def _hand_over(self, items, undo, *args):
+        newer = DequeList.__new__(DequeList)
+        newer._deque = items
+        newer._newer = None
+        newer._undo = None
+        self._deque = None
+        self._newer = newer
+        self._undo = (undo, args)
+        return newer
+
+    def push_left(self, item):
+        """
+        Return a new list with `item` added at the front.
+        """
+        items = self._items
+        items.appendleft(item)
+        return self._hand_over(items, collections.deque.popleft)
+
+    def pop_left(self):
+        """
+        Return the first member and a new list without it.
+        """
+        items = self._items
+        item = items.popleft()
+        return item, self._hand_over(items, collections.deque.appendleft, item)
+
+    def pop_right(self):
+        """
+        Return the last member and a new list without it.
+        """
+        items = self._items
+        item = items.pop()
+        return item, self._hand_over(items, collections.deque.append, item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def _item(self, index):
+        return self._items[index]
+
+    def count(self, item):
+        return self._items.count(item)
+
+
+class ListView(ListProxy):
+    """
+    An immutable view of the members of `base` at the positions in the
+    `range`, `indices`.  Slicing a view returns another view of the same
+    base, so BUTFIRST, BUTLAST and REVERSE take constant time and share
+    their members with their input.
+    """
+
+    __slots__ = ("_base", "_indices")
+
+    def __init__(self, base, indices=None):
+        super().__init__()
+        if indices is None:
+            indices = range(len(base))
+        self._base = base
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __iter__(self):
+        return map(self._base.__getitem__, self._indices)
+
+    def __reversed__(self):
+        return map(self._base.__getitem__, reversed(self._indices))
+
+    def _item(self, index):
+        return self._base[self._indices[index]]
+
+    def _slice(self, key):
+        return ListView(self._base, self._indices[key])
+
+
+class ConsList(ListProxy):
+    """
+    An immutable list made of a first member and the rest of the list.
+    FPUT takes constant time and shares the rest of the list with its
+    input, and BUTFIRST of a `ConsList` is its rest.
+    """
+
+    __slots__ = ("_first", "_rest", "_length")
+
+    def __init__(self, first, rest):
+        super().__init__()
+        self._first = first
+        self._rest = rest
+        self._length = 1 + len(rest)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        node = self
+        while isinstance(node, ConsList):
+            yield node._first
+            node = node._rest
+        yield from node
+
+    def _item(self, index):
+        node = self._drop(index)
+        if isinstance(node, ConsList):
+            return node._first
+        return node[0]
+
+    def _slice(self, key):
+        start, stop, step = key.indices(self._length)
+        if step == 1 and stop == self._length:
+            return self._drop(start)
+        return list(self)[key]
+
+    def _drop(self, count):
+        """
+        Return the list without its first `count` members.
+        """
+        node = self
+        while count > 0 and isinstance(node, ConsList):
+            node = node._rest
+            count -= 1
+        if count > 0:
+            return node[count:]
+        return node
+
+
+class Stream:
+    """
+    A Logo stream: a first member and a promise of the rest of the stream.
+
+    The promise is a function that outputs the rest, which is another
+    stream or a list.  It is called the first time the rest is needed, and
+    its result is kept, so it runs at most once.
+    """
+
+    __slots__ = ("first", "_promise", "_rest")
+
+    def __init__(self, first, promise):
+        self.first = first
+        self._promise = promise
+        self._rest = None
+
+    def rest(self):
+        """
+        Return the rest of the stream, running the promise if needed.
+        """
+        promise = self._promise
+        if promise is not None:
+            self._rest = promise()
+            self._promise = None
+        return self._rest
+
+    def is_forced(self):
+        """
+        Return True if the promise of the rest has already run.
+        """
+        return self._promise is None
+
+    def __iter__(self):
+        node = self
+        while isinstance(node, Stream):
+            yield node.first
+            node = node.rest()
+        yield from node
+
+
+def freeze(value, tag_numbers=False):
+    """
+    Return a hashable key for the Logo value, `value`.  Lists are frozen
+    into tagged tuples, so the keys of two values are equal when the
+    values are equal, and members of nested lists can be put in sets and
+    used as dict keys.
+
+    If `tag_numbers` is set, values other than words are also tagged with
+    their type, so `1` and `1.0` get different keys.  They are equal
+    values but not the same instruction.
+    """
+    if isinstance(value, list):
+        return (list, tuple([freeze(member, tag_numbers) for member in value]))
+    if isinstance(value, tuple):
+        return (tuple, tuple([freeze(member, tag_numbers) for member in value]))
+    if tag_numbers and not isinstance(value, str):
+        return (type(value), value)
+    return value
+
+
+def persistent(lst):
+    """
+    Return a list with the members of `lst` that is safe to share.
+    Plain lists are wrapped in a `ListView`.
+    """
+    if isinstance(lst, ListProxy):
+        return lst
+    return ListView(lst)
+
+
+class RangeList(ListProxy):
+    """
+    An immutable list of numbers that are computed when they are read.
+    Member `i` is `indices[i]`, or `func(indices[i])` if `func` is given.
+    ISEQ and RSEQ output a `RangeList`, so they take constant time and
+    memory, and counting, indexing and slicing take constant time.
+    """
+
+    __slots__ = ("_indices", "_func")
+
+    def __init__(self, indices, func=None):
+        super().__init__()
+        self._indices = indices
+        self._func = func
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __iter__(self):
+        if self._func is None:
+            return iter(self._indices)
+        return map(self._func, self._indices)
+
+    def __reversed__(self):
+        if self._func is None:
+            return reversed(self._indices)
+        return map(self._func, reversed(self._indices))
+
+    def __contains__(self, item):
+        return self._find(item) != -1
+
+    def _item(self, index):
+        value = self._indices[index]
+        if self._func is None:
+            return value
+        return self._func(value)
+
+    def _slice(self, key):
+        return RangeList(self._indices[key], self._func)
+
+    def _find(self, item):
+        """
+        Return the position of `item`, or -1.  Searching a range of
+        integers for a number takes constant time.
+        """
+        if self._func is None and isinstance(item, (int, float)):
+            if isinstance(item, float):
+                # Infinities and NaN aren't integers either.
+                if not item.is_integer():
+                    return -1
+                item = int(item)
+            if item not in self._indices:
+                return -1
+            return self._indices.index(item)
+        for position, member in enumerate(self):
+            if member == item:
+                return position
+        return -1
+
+    def index(self, item, *args):
+        if args:
+            return list(self).index(item, *args)
+        position = self._find(item)
+        if position == -1:
+            raise ValueError("{!r} is not in list".format(item))
+        return position
+
+
+class LogoArray:
+    """
+    A Logo array: a fixed number of members that can be read or replaced in
+    constant time.  Indexes start at `origin`.
+
+    Members that are all integers or all floats are kept in an `array.array`,
+    anything else in a plain list.  Storing a member that the typed storage
+    can't hold switches the array to a list.
+
+    Arrays aren't lists, so they are only equal to themselves.
+    """
+
+    __slots__ = ("_items", "origin")
+
+    def __init__(self, items=(), origin=1):
+        self._items = _compact(list(items))
+        self.origin = origin
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __repr__(self):
+        return "LogoArray({!r}, origin={!r})".format(list(self._items), self.origin)
+
+    def _offset(self, index):
+        offset = index - self.origin
+        if offset < 0 or offset >= len(self._items):
+            raise IndexError("array index out of range")
+        return offset
+
+    def get(self, index):
+        """
+        Return the member at Logo `index`.
+        """
+        return self._items[self._offset(index)]
+
+    def set(self, index, value):
+        """
+        Replace the member at Logo `index` with `value`.
+        """
+        offset = self._offset(index)
+        items = self._items
+        if isinstance(items, array.array):
+            if type(value) is _TYPECODE_TYPES[items.typecode]:
+                try:
+                    items[offset] = value
+                    return
+                except OverflowError:
+                    pass
+            items = self._items = list(items)
+        items[offset] = value
+
+    def to_list(self):
+        """
+        Return the members as a new plain list.
+        """
+        return list(self._items)
+
+
+_TYPECODE_TYPES = {"q": int, "d": float}
+
+
+def _compact(items):
+    """
+    Return the storage for the list of members, `items`.
+    """
+    for typecode, kind in _TYPECODE_TYPES.items():
+        if items and all(type(item) is kind for item in items):
+            try:
+                return array.array(typecode, items)
+            except OverflowError:
+                break
+    return items
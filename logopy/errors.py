@@ -9,6 +9,12 @@ class ExpectedEndError(LogoError):
     pass
 
 
+class ThrownError(LogoError):
+    """
+    An error signalled by THROW "ERROR.
+    """
+
+
 class StopSignal(Exception):
     pass
 
@@ -20,3 +26,14 @@ class OutputSignal(Exception):
 
 class HaltSignal(Exception):
     pass
+
+
+@attr.s
+class ThrowSignal(Exception):
+    """
+    Raised by THROW.  Caught by the innermost running CATCH with the same
+    tag.
+    """
+
+    tag = attr.ib()
+    value = attr.ib(default=None)
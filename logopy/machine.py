@@ -0,0 +1,445 @@
+"""
+Non-recursive evaluator for compiled procedure bodies.
+
+The tree walker and the closure backend use several Python frames for each
+Logo call, so deep non-tail recursion such as tree fractals or Hilbert
+curves runs into Python's recursion limit.  This evaluator flattens a
+`compiler.CompiledBody` into a list of instructions and runs it with an
+explicit stack of frames.  A call from one compiled procedure to another
+doesn't use the Python stack at all, so recursion depth is limited only by
+memory.
+
+The literal instruction lists of IF and IFELSE are assembled into the
+procedure's own instructions, with conditional jumps around them, so
+`ifelse :n = 0 [output 0] [output 1 + f :n - 1]` recurses without nesting
+Python frames, and a STOP or OUTPUT in them returns from the frame
+directly.  Primitives are still called as Python functions.  Instruction
+lists run by REPEAT and friends are walked as trees, and any tokens the
+compiler couldn't handle are run by the token interpreter.  They nest
+Python frames when they call back into a procedure.
+
+Calls to procedures memoized by EXT.MEMOIZE look up the cache before
+entering a frame, and the frame stores its result when it returns.
+"""
+
+import numbers
+
+from logopy import compiler, datatypes, errors, procedure
+
+# Opcodes.
+VARIABLE = 0
+CONSTANT = 1
+CALL_PRIMITIVE = 2
+STATEMENT = 3
+END_STATEMENT = 4
+CHECK_INFIX = 5
+ARITHMETIC = 6
+CALL = 7
+TAIL_CALL = 8
+OUTPUT = 9
+RETURN = 10
+LIST = 11
+NEGATE = 12
+DYNAMIC_VALUE = 13
+DYNAMIC = 14
+SHORT_CIRCUIT = 15
+COMPARE = 16
+CHOOSE = 17
+IF = 18
+JUMP = 19
+LIST_STATEMENT = 20
+
+
+class _Frame:
+    """
+    A running procedure.
+    """
+
+    __slots__ = ("body", "code", "pc", "stack", "result_kind", "output_node", "memo")
+
+    def __init__(self, body, code):
+        self.body = body
+        self.code = code
+        self.pc = 0
+        self.stack = []
+        # How the result of a chain of tail calls is used.  See
+        # `compiler.TailCallNode`.
+        self.result_kind = "value"
+        self.output_node = None
+        # `(memo, key)` if the result is to be stored in a memo cache.
+        self.memo = None
+
+    def result(self, value):
+        """
+        Return the value the caller of this frame receives.
+        """
+        result_kind = self.result_kind
+        if result_kind == "value":
+            return value
+        if result_kind == "discard":
+            return None
+        if result_kind == "error" or value is None:
+            self.output_node.raise_null_output()
+        return value
+
+
+def execute(logo, proc, args):
+    """
+    Run the user defined procedure, `proc`, with `args`.
+    Return its output.
+    """
+    binding_stack = logo.binding_stack
+    depth = len(binding_stack)
+    variables = logo.variables
+    frames = []
+    frame = _enter(logo, proc, args)
+    code = frame.code
+    stack = frame.stack
+    pc = 0
+    try:
+        while True:
+            op, arg = code[pc]
+            pc += 1
+            try:
+                if op == VARIABLE:
+                    value = variables.get(arg)
+                    if value is None:
+                        value = logo.get_variable_value(arg)
+                    stack.append(value)
+                    continue
+                if op == CONSTANT:
+                    stack.append(arg)
+                    continue
+                if op == CALL_PRIMITIVE:
+                    n = len(arg.args)
+                    if n > 0:
+                        args = stack[-n:]
+                        del stack[-n:]
+                        if arg.check_args and None in args:
+                            arg.raise_null_argument(args)
+                    else:
+                        args = ()
+                    stack.append(arg.proc.primitive_func(logo, *args))
+                    continue
+                if op == STATEMENT:
+                    body = frame.body
+                    if logo.procedure_generation == body.generation:
+                        if logo.halt:
+                            raise errors.HaltSignal("Received HALT")
+                        continue
+                    # A procedure was (re)defined while this body was
+                    # running.  Interpret the remaining tokens instead.
+                    logo.process_token_list(body.tokens[arg:])
+                    value = None
+                elif op == END_STATEMENT:
+                    stack.pop()
+                    logo.process_events()
+                    continue
+                elif op == CHECK_INFIX:
+                    value = stack[-1]
+                    if not isinstance(value, numbers.Number):
+                        compiler._raise_not_a_number(arg, value)
+                    continue
+                elif op == ARITHMETIC:
+                    right = stack.pop()
+                    value = arg.func(stack[-1], right)
+                    if arg.is_root:
+                        value = 0 + value
+                    stack[-1] = value
+                    continue
+                elif op == COMPARE:
+                    right = stack.pop()
+                    stack[-1] = arg.func(logo, stack[-1], right)
+                    continue
+                elif op == CALL:
+                    n = len(arg.args)
+                    args = stack[-n:] if n > 0 else []
+                    if n > 0:
+                        del stack[-n:]
+                    if arg.check_args and None in args:
+                        arg.raise_null_argument(args)
+                    memo = arg.proc.memo
+                    if memo is not None:
+                        key = datatypes.freeze(args)
+                        value = memo.lookup(key)
+                        if value is not procedure.MISSING:
+                            stack.append(value)
+                            continue
+                    frame.pc = pc
+                    frames.append(frame)
+                    frame = _enter(logo, arg.proc, args)
+                    if memo is not None:
+                        frame.memo = (memo, key)
+                    code = frame.code
+                    stack = frame.stack
+                    pc = 0
+                    continue
+                elif op == TAIL_CALL:
+                    call = arg.call
+                    n = len(call.args)
+                    args = stack[-n:] if n > 0 else []
+                    if call.check_args and None in args:
+                        call.raise_null_argument(args)
+                    # Run the callee in this frame, binding its inputs in the
+                    # caller's scope.  See `LogoInterpreter.execute_procedure()`.
+                    callee = call.proc
+                    body = logo.get_compiled_body(callee)
+                    logo.bind_inputs(callee, args, binding_stack[-1])
+                    if frame.result_kind == "value":
+                        frame.result_kind = arg.kind
+                        frame.output_node = arg
+                    elif frame.result_kind == "output" and arg.kind == "discard":
+                        frame.result_kind = "error"
+                    frame.body = body
+                    code = frame.code = get_code(logo, body)
+                    stack.clear()
+                    pc = 0
+                    continue
+                elif op == OUTPUT:
+                    value = stack.pop()
+                    if arg.check_args and value is None:
+                        arg.raise_null_argument([value])
+                elif op == RETURN:
+                    value = None
+                elif op == IF:
+                    node, else_pc = arg
+                    tf = stack.pop()
+                    call = node.call
+                    if call.check_args and tf is None:
+                        call.raise_null_argument([tf])
+                    if not procedure.if_condition(call.command.upper(), logo, tf):
+                        pc = else_pc
+                    continue
+                elif op == JUMP:
+                    pc = arg
+                    continue
+                elif op == LIST_STATEMENT:
+                    body, offset, end_pc = arg
+                    if logo.procedure_generation == body.generation:
+                        if logo.halt:
+                            raise errors.HaltSignal("Received HALT")
+                        continue
+                    # As for STATEMENT, but the rest of the instruction list
+                    # gives the value of the whole IF.
+                    stack.append(logo.run_token_list(body.tokens[offset:]))
+                    pc = end_pc
+                    continue
+                elif op == CHOOSE:
+                    value = arg.choose(logo, stack.pop())
+                    if value is not compiler.RETURN:
+                        stack.append(value)
+                        continue
+                    # STOP or OUTPUT in the chosen instruction list.
+                    value = logo.return_value
+                    logo.return_value = None
+                elif op == LIST:
+                    stack.append(arg)
+                    continue
+                elif op == NEGATE:
+                    stack.append(-1 * stack.pop())
+                    continue
+                elif op == SHORT_CIRCUIT:
+                    n = len(arg.eager_args())
+                    values = stack[-n:] if n > 0 else []
+                    if n > 0:
+                        del stack[-n:]
+                    stack.append(arg.combine(logo, values))
+                    continue
+                elif op == DYNAMIC_VALUE:
+                    stack.append(logo.evaluate_token_list([arg]))
+                    continue
+                else:
+                    stack.append(arg.evaluate(logo))
+                    continue
+            except errors.StopSignal:
+                value = None
+            except errors.OutputSignal as output:
+                value = output.value
+            # Return from the current frame.
+            value = frame.result(value)
+            if frame.memo is not None:
+                memo, key = frame.memo
+                memo.store(key, value)
+            logo.destroy_scope()
+            if len(frames) == 0:
+                return value
+            frame = frames.pop()
+            code = frame.code
+            stack = frame.stack
+            pc = frame.pc
+            stack.append(value)
+    except BaseException:
+        # Restore the scopes of the frames that are still running.
+        while len(binding_stack) > depth:
+            logo.destroy_scope()
+        raise
+
+
+def _enter(logo, proc, args):
+    """
+    Create a frame for a call to `proc` and bind its inputs in a new scope.
+    """
+    body = logo.get_compiled_body(proc)
+    saved = {}
+    logo.binding_stack.append(saved)
+    logo.bind_inputs(proc, args, saved)
+    return _Frame(body, get_code(logo, body))
+
+
+def get_code(logo, body):
+    """
+    Return the instructions for a compiled body, assembling them on first use.
+    """
+    code = body.code
+    if code is None:
+        code = body.code = assemble(logo, body)
+    return code
+
+
+def assemble(logo, body):
+    """
+    Flatten a compiled body into a list of `(opcode, argument)` instructions.
+    """
+    code = []
+    for offset, node in zip(body.offsets, body.nodes):
+        code.append((STATEMENT, offset))
+        if isinstance(node, compiler.TailCallNode):
+            for arg in node.call.args:
+                _emit(logo, arg, code)
+            code.append((TAIL_CALL, node))
+            continue
+        if isinstance(node, compiler.ReturnNode):
+            _emit_return(logo, node, code)
+            continue
+        _emit(logo, node, code)
+        code.append((END_STATEMENT, None))
+    code.append((RETURN, None))
+    return code
+
+
+def _emit_return(logo, node, code):
+    """
+    Append the instructions for a STOP or OUTPUT instruction.
+    """
+    if node.call.args:
+        _emit(logo, node.call.args[0], code)
+        code.append((OUTPUT, node.call))
+    else:
+        code.append((RETURN, None))
+
+
+def _emit_if(logo, node, code):
+    """
+    Append the instructions for an IF or IFELSE with literal instruction
+    lists.  The chosen list leaves its value on the stack, or None if
+    there is no list to run.
+    """
+    bodies = []
+    for n in range(1, len(node.call.args)):
+        try:
+            bodies.append(_list_body(logo, node, n))
+        except errors.LogoError:
+            # The list can't be tokenized.  The error is reported if the
+            # list is chosen.
+            _emit(logo, node.call.args[0], code)
+            code.append((CHOOSE, node))
+            return
+    _emit(logo, node.call.args[0], code)
+    branch = len(code)
+    code.append(None)
+    statements = _emit_list(logo, bodies[0], code)
+    jump = len(code)
+    code.append(None)
+    else_pc = len(code)
+    if len(bodies) == 2:
+        statements.extend(_emit_list(logo, bodies[1], code))
+    else:
+        code.append((CONSTANT, None))
+    end_pc = len(code)
+    code[branch] = (IF, (node, else_pc))
+    code[jump] = (JUMP, end_pc)
+    for pc, body, offset in statements:
+        code[pc] = (LIST_STATEMENT, (body, offset, end_pc))
+
+
+def _list_body(logo, node, n):
+    """
+    Return the compiled instruction list of the IF or IFELSE `node` at input
+    position `n`.
+    """
+    body = node.bodies.get(n)
+    if body is None or body.generation != logo.procedure_generation:
+        body = node.bodies[n] = logo.compile_instructionlist(node.call.args[n].value)
+    return body
+
+
+def _emit_list(logo, body, code):
+    """
+    Append the instructions for the compiled instruction list, `body`.  The
+    value of its last instruction is left on the stack.  Return the
+    `(pc, body, offset)` of each LIST_STATEMENT, whose jump target is
+    filled in by the caller.
+    """
+    if len(body.nodes) == 0:
+        code.append((CONSTANT, None))
+        return []
+    statements = []
+    last = len(body.nodes) - 1
+    for n, (offset, node) in enumerate(zip(body.offsets, body.nodes)):
+        statements.append((len(code), body, offset))
+        code.append(None)
+        if isinstance(node, compiler.ReturnNode):
+            _emit_return(logo, node, code)
+            continue
+        _emit(logo, node, code)
+        if n != last:
+            code.append((END_STATEMENT, None))
+    return statements
+
+
+def _emit(logo, node, code):
+    """
+    Append the instructions that push the value of `node`.
+    """
+    if isinstance(node, compiler.VariableNode):
+        code.append((VARIABLE, node.name))
+    elif isinstance(node, compiler.LiteralNode):
+        code.append((CONSTANT, node.value))
+    elif isinstance(node, compiler.CallNode):
+        for arg in node.args:
+            _emit(logo, arg, code)
+        if node.is_primitive:
+            code.append((CALL_PRIMITIVE, node))
+        else:
+            code.append((CALL, node))
+    elif isinstance(node, compiler.ArithmeticNode):
+        _emit(logo, node.left, code)
+        if node.check_left:
+            code.append((CHECK_INFIX, node.check_left))
+        _emit(logo, node.right, code)
+        if node.check_right:
+            code.append((CHECK_INFIX, node.op))
+        code.append((ARITHMETIC, node))
+    elif isinstance(node, compiler.CompareNode):
+        _emit(logo, node.left, code)
+        if node.check_left:
+            code.append((CHECK_INFIX, node.op))
+        _emit(logo, node.right, code)
+        code.append((COMPARE, node))
+    elif isinstance(node, compiler.ListNode):
+        code.append((LIST, node.value))
+    elif isinstance(node, compiler.NegateNode):
+        _emit(logo, node.operand, code)
+        code.append((NEGATE, None))
+    elif isinstance(node, compiler.ShortCircuitNode):
+        for arg in node.eager_args():
+            _emit(logo, arg, code)
+        code.append((SHORT_CIRCUIT, node))
+    elif isinstance(node, compiler.IfNode):
+        _emit_if(logo, node, code)
+    elif isinstance(node, compiler.DynamicValueNode):
+        code.append((DYNAMIC_VALUE, node.token))
+    elif isinstance(node, compiler.DynamicNode):
+        code.append((DYNAMIC, node))
+    else:
+        raise TypeError("Can't assemble `{}`.".format(node))
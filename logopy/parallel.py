@@ -0,0 +1,151 @@
+"""
+Run MAP and FILTER templates in a pool of worker processes.
+
+EXT.PMAP and EXT.PFILTER split their data into chunks and send each chunk
+to a `ProcessPoolExecutor`.  Every worker runs its own interpreter, which
+is set up with copies of the caller's procedures, variables and property
+lists when the pool starts.  Procedures are sent as their tokens, so a
+worker runs exactly what the caller would run.  The results come back in
+the order of the data.
+
+Templates should not depend on side effects.  Changes a worker makes to
+variables and property lists are not seen by the caller, and turtle
+graphics are not available in workers.
+"""
+
+import concurrent.futures
+import os
+import pickle
+
+from logopy import errors, procedure
+
+# Each worker gets about this many chunks, so a slow chunk doesn't hold up
+# the other workers for long.
+CHUNKS_PER_WORKER = 4
+
+# The interpreter of a worker process.  Set by `_init_worker()`.
+_worker_logo = None
+
+
+class NoTurtleEnv:
+    """
+    Turtle back end for worker interpreters.  Any turtle command raises an
+    error.
+    """
+
+    initialized = False
+
+    def initialize(self, **kwds):
+        raise errors.LogoError(
+            "Turtle graphics can't be used in EXT.PMAP or EXT.PFILTER templates."
+        )
+
+
+def parallel_apply(logo, cmd, template, data_lists):
+    """
+    Apply `template` to the members of `data_lists` in worker processes.
+    Return the results in order.
+    """
+    rows = list(zip(*data_lists))
+    if len(rows) == 0:
+        return []
+    workers = logo.parallel_workers or os.cpu_count() or 1
+    chunk_size = -(-len(rows) // (workers * CHUNKS_PER_WORKER))
+    chunks = [rows[n : n + chunk_size] for n in range(0, len(rows), chunk_size)]
+    initargs = (
+        type(logo),
+        _procedure_specs(logo),
+        _shareable_variables(logo),
+        _shareable_property_lists(logo),
+    )
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            initializer=_init_worker,
+            initargs=initargs,
+        ) as pool:
+            futures = [
+                pool.submit(_run_chunk, cmd, template, chunk, start)
+                for chunk, start in zip(chunks, range(1, len(rows) + 1, chunk_size))
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+    except concurrent.futures.process.BrokenProcessPool as ex:
+        raise errors.LogoError("{} worker process failed: {}".format(cmd, ex))
+    return results
+
+
+def _procedure_specs(logo):
+    """
+    Return the arguments of `LogoProcedure.make_procedure()` for each user
+    defined procedure.
+    """
+    return [
+        (
+            proc.name,
+            proc.required_inputs,
+            proc.optional_inputs,
+            proc.rest_input,
+            proc.default_arity,
+            proc.tokens,
+        )
+        for proc in logo.procedures.values()
+    ]
+
+
+def _shareable_variables(logo):
+    """
+    Return the visible variables whose values can be sent to a worker.
+    Values that can't be pickled, such as streams, are left out.
+    """
+    return _shareable_items(logo.variables)
+
+
+def _shareable_property_lists(logo):
+    """
+    Return the property lists, leaving out the properties whose values
+    can't be sent to a worker.
+    """
+    return {
+        plistname: _shareable_items(plist)
+        for plistname, plist in logo.property_lists.items()
+    }
+
+
+def _shareable_items(mapping):
+    items = {}
+    for key, value in mapping.items():
+        try:
+            pickle.dumps(value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            continue
+        items[key] = value
+    return items
+
+
+def _init_worker(interpreter_class, procedure_specs, variables, property_lists):
+    global _worker_logo
+    logo = interpreter_class.create_interpreter()
+    logo.turtle_backend = NoTurtleEnv()
+    for spec in procedure_specs:
+        proc = procedure.LogoProcedure.make_procedure(*spec)
+        logo.procedures[proc.name.lower()] = proc
+    logo.procedure_generation += 1
+    logo.variables.update(variables)
+    logo.property_lists.update(property_lists)
+    _worker_logo = logo
+
+
+def _run_chunk(cmd, template, rows, start):
+    """
+    Run the template for each row of inputs in `rows`.  `start` is the
+    REPCOUNT of the first row.
+    """
+    logo = _worker_logo
+    data_lists = [list(column) for column in zip(*rows)]
+    template_type, template = procedure._create_template(
+        cmd, logo, data_lists, template
+    )
+    with procedure.TemplateRunner(cmd, logo, template_type, template) as run:
+        return [run(n, row) for n, row in enumerate(rows, start)]
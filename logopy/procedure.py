@@ -11,7 +11,12 @@ import traceback
 
 import attr
 
-from logopy import errors
+from logopy import datatypes, errors, parallel
+
+# Lists shorter than this are searched without building an index.
+MEMBER_INDEX_MIN_LENGTH = 32
+
+TRUTH_VALUES = {"true": True, "false": False}
 
 COLOR_MAP = {
     0: "black",
@@ -47,6 +52,8 @@ class LogoProcedure:
     tokens = attr.ib(default=None)
     primitive_func = attr.ib(default=None)
     _max_arity = attr.ib(default=None)
+    compiled_body = attr.ib(default=None, repr=False)
+    memo = attr.ib(default=None, repr=False)
 
     @classmethod
     def make_procedure(
@@ -124,6 +131,67 @@ class LogoProcedure:
         return len(self.required_inputs)
 
 
+@attr.s
+class ProcedureMemo:
+    """
+    LRU cache of the results of a procedure memoized by EXT.MEMOIZE.
+    Keys are the frozen inputs.  See `datatypes.freeze()`.
+    A `maxsize` of 0 means the cache is unbounded.
+    """
+
+    maxsize = attr.ib(default=1024)
+    cache = attr.ib(default=attr.Factory(collections.OrderedDict), repr=False)
+    hits = attr.ib(default=0)
+    misses = attr.ib(default=0)
+
+    def lookup(self, key):
+        """
+        Return the cached result for `key`, or `MISSING`.
+        """
+        cache = self.cache
+        result = cache.get(key, MISSING)
+        if result is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            cache.move_to_end(key)
+            if isinstance(result, datatypes.LogoArray):
+                result = _memo_copy(result)
+        return result
+
+    def store(self, key, result):
+        result = _memo_copy(result)
+        cache = self.cache
+        cache[key] = result
+        if self.maxsize and len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _memo_copy(value):
+    """
+    Return a copy of `value` that is safe to keep in a memo cache.  Plain
+    lists are copied into an immutable `ListView`, and other lists are
+    already immutable.  Arrays are copied, because SETITEM changes them,
+    but arrays inside lists are shared.
+    """
+    if isinstance(value, datatypes.ListProxy):
+        return value
+    if isinstance(value, list):
+        return datatypes.ListView(list(value))
+    if isinstance(value, datatypes.LogoArray):
+        return datatypes.LogoArray([_memo_copy(x) for x in value], value.origin)
+    return value
+
+
+# Returned by `ProcedureMemo.lookup()` when there is no cached result.
+MISSING = object()
+
+
 def create_primitives_map():
     """
     Create a mapping of primitives names to procedure information.
@@ -137,6 +205,14 @@ def create_primitives_map():
     m["arctan"] = make_primitive(
         "arctan", ["x"], [], "y", 1, process_arctan, max_arity=2
     )
+    m["array"] = make_primitive(
+        "array", ["size"], [], "origin", 1, process_array, max_arity=2
+    )
+    m["arrayp"] = make_primitive("arrayp", ["thing"], [], None, 1, process_arrayp)
+    m["array?"] = m["arrayp"]
+    m["arraytolist"] = make_primitive(
+        "arraytolist", ["array"], [], None, 1, process_arraytolist
+    )
     m["back"] = make_primitive("back", ["dist"], [], None, 1, process_back)
     m["bk"] = m["back"]
     m["background"] = make_primitive(
@@ -164,6 +240,9 @@ def create_primitives_map():
         "cacade", ["endtest", "template", "startvalue"], [], "args", 3, process_cascade
     )
     m["case"] = make_primitive("case", ["value", "clauses"], [], None, 2, process_case)
+    m["catch"] = make_primitive(
+        "catch", ["tag", "instructionlist"], [], None, 2, process_catch
+    )
     m["char"] = make_primitive("char", ["int"], [], None, 1, process_char)
     m["clean"] = make_primitive("clean", [], [], None, 0, process_clean)
     m["clearscreen"] = make_primitive(
@@ -174,6 +253,9 @@ def create_primitives_map():
         "combine", ["thing1", "thing2"], [], None, 2, process_combine
     )
     m["cond"] = make_primitive("cond", ["clauses"], [], None, 1, process_cond)
+    m["cons-stream"] = make_primitive(
+        "cons-stream", ["thing", "instructionlist"], [], None, 2, process_cons_stream
+    )
     m["count"] = make_primitive("count", ["thing"], [], None, 1, process_count)
     m["cos"] = make_primitive("cos", ["degrees"], [], None, 1, process_cos)
     m["dec.str"] = make_primitive("dec.str", ["num"], [], None, 1, process_dec_str)
@@ -195,6 +277,7 @@ def create_primitives_map():
         "equalp", ["thing1", "thing2"], [], None, 2, process_equalp
     )
     m["equal?"] = m["equalp"]
+    m["error"] = make_primitive("error", [], [], None, 0, process_error)
     m["exp"] = make_primitive("exp", ["num"], [], None, 1, process_exp)
     m["ext.ellipse"] = make_primitive(
         "ext.ellipse",
@@ -204,9 +287,24 @@ def create_primitives_map():
         2,
         process_ext_ellipse,
     )
+    m["ext.memoize"] = make_primitive(
+        "ext.memoize", ["procname"], [], "maxsize", 1, process_ext_memoize, max_arity=2
+    )
+    m["ext.memostats"] = make_primitive(
+        "ext.memostats", ["procname"], [], None, 1, process_ext_memostats
+    )
+    m["ext.pfilter"] = make_primitive(
+        "ext.pfilter", ["tftemplate", "data"], [], None, 2, process_ext_pfilter
+    )
+    m["ext.pmap"] = make_primitive(
+        "ext.pmap", ["template", "data"], [], "args", 2, process_ext_pmap
+    )
     m["ext.unfilled"] = make_primitive(
         "ext.unfilled", ["instructions"], [], "args", 1, process_ext_unfilled
     )
+    m["ext.unmemoize"] = make_primitive(
+        "ext.unmemoize", ["procname"], [], None, 1, process_ext_unmemoize
+    )
     m["filter"] = make_primitive(
         "filter", ["tftemplate", "data"], [], "args", 2, process_filter
     )
@@ -228,6 +326,9 @@ def create_primitives_map():
     m["forward"] = make_primitive("forward", ["dist"], [], None, 1, process_forward)
     m["fd"] = m["forward"]
     m["fput"] = make_primitive("fput", ["thing", "list"], [], None, 2, process_fput)
+    m["gprop"] = make_primitive(
+        "gprop", ["plistname", "propname"], [], None, 2, process_gprop
+    )
     m["greaterequalp"] = make_primitive(
         "greaterequalp", ["num1", "num2"], [], None, 2, process_greaterequalp
     )
@@ -278,6 +379,9 @@ def create_primitives_map():
     )
     m["listp"] = make_primitive("listp", ["thing"], [], None, 1, process_listp)
     m["list?"] = m["listp"]
+    m["listtoarray"] = make_primitive(
+        "listtoarray", ["list"], [], "origin", 1, process_listtoarray, max_arity=2
+    )
     m["load"] = make_primitive("local", ["filename"], [], None, 1, process_load)
     m["local"] = make_primitive("local", ["varname"], [], "varnames", 1, process_local)
     m["localmake"] = make_primitive(
@@ -294,6 +398,15 @@ def create_primitives_map():
     m["map.se"] = make_primitive(
         "map.se", ["template", "data"], [], "args", 2, process_map_se
     )
+    m["mdarray"] = make_primitive(
+        "mdarray", ["sizelist"], [], "origin", 1, process_mdarray, max_arity=2
+    )
+    m["mditem"] = make_primitive(
+        "mditem", ["indexlist", "array"], [], None, 2, process_mditem
+    )
+    m["mdsetitem"] = make_primitive(
+        "mdsetitem", ["indexlist", "array", "value"], [], None, 3, process_mdsetitem
+    )
     m["member"] = make_primitive(
         "member", ["thing1", "thing2"], [], None, 2, process_member
     )
@@ -330,6 +443,9 @@ def create_primitives_map():
     m["pots"] = make_primitive("pots", [], [], None, 0, process_pots)
     m["pu"] = m["penup"]
     m["pick"] = make_primitive("pick", ["list"], [], None, 1, process_pick)
+    m["plist"] = make_primitive("plist", ["plistname"], [], None, 1, process_plist)
+    m["plistp"] = make_primitive("plistp", ["plistname"], [], None, 1, process_plistp)
+    m["plist?"] = m["plistp"]
     m["polygon"] = make_primitive(
         "polygon",
         ["n", "radius"],
@@ -341,6 +457,9 @@ def create_primitives_map():
     m["pop"] = make_primitive("pop", ["stackname"], [], None, 1, process_pop)
     m["pos"] = make_primitive("pos", [], [], None, 0, process_pos)
     m["power"] = make_primitive("power", ["num1", "num2"], [], None, 2, process_power)
+    m["pprop"] = make_primitive(
+        "pprop", ["plistname", "propname", "value"], [], None, 3, process_pprop
+    )
     m["print"] = make_primitive("print", ["thing"], [], "others", 1, process_print)
     m["pr"] = m["print"]
     m["product"] = make_primitive(
@@ -376,6 +495,9 @@ def create_primitives_map():
         "remove", ["thing", "list"], [], None, 2, process_remove
     )
     m["remdup"] = make_primitive("remdup", ["list"], [], None, 1, process_remdup)
+    m["remprop"] = make_primitive(
+        "remprop", ["plistname", "propname"], [], None, 2, process_remprop
+    )
     m["repcount"] = make_primitive("repcount", [], [], None, 0, process_repcount)
     m["#"] = m["repcount"]
     m["repeat"] = make_primitive(
@@ -405,6 +527,9 @@ def create_primitives_map():
         "setheading", ["angle"], [], None, 1, process_setheading
     )
     m["seth"] = m["setheading"]
+    m["setitem"] = make_primitive(
+        "setitem", ["index", "array", "value"], [], None, 3, process_setitem
+    )
     m["setpencolor"] = make_primitive(
         "setpencolor", ["color"], [], None, 1, process_setpencolor
     )
@@ -425,12 +550,24 @@ def create_primitives_map():
     m["sin"] = make_primitive("sin", ["degrees"], [], None, 1, process_sin)
     m["sqrt"] = make_primitive("sqrt", ["num"], [], None, 1, process_sqrt)
     m["stop"] = make_primitive("stop", [], [], None, 0, process_stop)
+    m["stream-butfirst"] = make_primitive(
+        "stream-butfirst", ["stream"], [], None, 1, process_stream_butfirst
+    )
+    m["stream-bf"] = m["stream-butfirst"]
+    m["stream-first"] = make_primitive(
+        "stream-first", ["stream"], [], None, 1, process_stream_first
+    )
+    m["streamp"] = make_primitive("streamp", ["thing"], [], None, 1, process_streamp)
+    m["stream?"] = m["streamp"]
     m["substringp"] = make_primitive(
         "substringp", ["thing1", "thing2"], [], None, 2, process_substringp
     )
     m["substring?"] = m["substringp"]
     m["sum"] = make_primitive("sum", ["num1", "num2"], [], "nums", 2, process_sum)
     m["thing"] = make_primitive("thing", ["thing"], [], None, 1, process_thing)
+    m["throw"] = make_primitive(
+        "throw", ["tag"], [], "value", 1, process_throw, max_arity=2
+    )
     m["towards"] = make_primitive("towards", ["pos"], [], None, 1, process_towards)
     m["turtle.heading"] = make_primitive(
         "turtle.heading", ["cartesian.heading"], [], None, 1, process_turtle_heading
@@ -493,14 +630,11 @@ def process_dot_eq(logo, thing1, thing2):
 def process_and(logo, *args):
     """
     The AND command.
+    Inputs that are instruction lists are run in order, only until one of
+    them outputs FALSE.
     """
-    truth_map = {"true": True, "false": False}
     for arg in args:
-        if not arg.lower() in truth_map:
-            raise errors.LogoError(
-                "AND expects true/false values but received `{}` instead.".format(arg)
-            )
-        if not truth_map[arg.lower()]:
+        if not logical_input("AND", logo, arg):
             return "false"
     return "true"
 
@@ -527,6 +661,40 @@ def process_arc(logo, angle, radius):
         t0.pendown()
 
 
+def process_array(logo, size, origin=1):
+    """
+    The ARRAY command.
+    Every member starts out as the empty list.
+    """
+    size = _integer_input("ARRAY", size)
+    if size < 0:
+        raise errors.LogoError(
+            "ARRAY doesn't like `{}` as input.".format(_input_repr(size))
+        )
+    origin = _integer_input("ARRAY", origin)
+    return datatypes.LogoArray([[]] * size, origin)
+
+
+def process_arrayp(logo, thing):
+    """
+    The ARRAYP command.
+    """
+    if _is_array(thing):
+        return "true"
+    return "false"
+
+
+def process_arraytolist(logo, array):
+    """
+    The ARRAYTOLIST command.
+    """
+    if not _is_array(array):
+        raise errors.LogoError(
+            "ARRAYTOLIST doesn't like `{}` as input.".format(_input_repr(array))
+        )
+    return array.to_list()
+
+
 def process_arctan(logo, *args):
     """
     The ARCTAN command.
@@ -596,9 +764,16 @@ def process_beforep(logo, word1, word2):
 def process_butfirst(logo, wordlist):
     """
     The BUTFIRST command.
+    The BUTFIRST of a stream is its rest, as with STREAM-BUTFIRST.
     """
-    if len(wordlist) == 0:
-        raise errors.LogoError("BUTFIRST doesn't like `{}` as input.".format(wordlist))
+    if _is_stream(wordlist):
+        return wordlist.rest()
+    if _is_array(wordlist) or len(wordlist) == 0:
+        raise errors.LogoError(
+            "BUTFIRST doesn't like `{}` as input.".format(_input_repr(wordlist))
+        )
+    if isinstance(wordlist, list):
+        return datatypes.persistent(wordlist)[1:]
     return wordlist[1:]
 
 
@@ -606,20 +781,21 @@ def process_butfirsts(logo, lst):
     """
     The BUTFIRSTS command.
     """
-    lst = []
-    for item in lst:
-        if len(item) == 0:
-            raise errors.LogoError("BUTFIRST doesn't like `{}` as input.".format(item))
-        lst.append(item[1:])
-    return lst
+    return [process_butfirst(logo, item) for item in lst]
 
 
 def process_butlast(logo, wordlist):
     """
     The BUTLAST command.
     """
-    if len(wordlist) == 0:
-        raise errors.LogoError("BUTLAST doesn't like `{}` as input.".format(wordlist))
+    if _is_stream(wordlist):
+        raise errors.LogoError("BUTLAST doesn't like a stream as input.")
+    if _is_array(wordlist) or len(wordlist) == 0:
+        raise errors.LogoError(
+            "BUTLAST doesn't like `{}` as input.".format(_input_repr(wordlist))
+        )
+    if isinstance(wordlist, list):
+        return datatypes.persistent(wordlist)[:-1]
     return wordlist[:-1]
 
 
@@ -644,7 +820,7 @@ def process_cascade(logo, endtest, *args):
     dtype = _datatypename(endtest)
     repcount = 0
     test_end_func = None
-    endtest_script = None
+    endtest_instrlist = None
     if dtype == "word":
         try:
             repetitions = int(endtest)
@@ -654,14 +830,14 @@ def process_cascade(logo, endtest, *args):
                 "end test, but received `{}` instead.".format(endtest)
             )
 
-        def test_end_func(count, script):
+        def test_end_func(count, instrlist):
             return count > repetitions
 
     elif dtype == "list":
-        endtest_script = _list_contents_repr(endtest, include_braces=False)
+        endtest_instrlist = endtest
 
-        def test_end_func(count, script):
-            return _is_true(logo.process_instructionlist(script))
+        def test_end_func(count, instrlist):
+            return _is_true(logo.run_instructionlist(instrlist))
 
     else:
         raise errors.LogoError(
@@ -674,14 +850,13 @@ def process_cascade(logo, endtest, *args):
         while True:
             repcount += 1
             logo.set_repcount(repcount)
-            if test_end_func(repcount, endtest_script):
+            if test_end_func(repcount, endtest_instrlist):
                 break
             last_results = list(results)
             logo.push_placeholders(last_results)
             try:
                 for n, template in enumerate(templates):
-                    script = _list_contents_repr(template, include_braces=False)
-                    results[n] = logo.process_instructionlist(script)
+                    results[n] = logo.run_instructionlist(template)
             finally:
                 logo.pop_placeholders()
         if final_template is None:
@@ -689,8 +864,7 @@ def process_cascade(logo, endtest, *args):
         else:
             logo.push_placeholders(results)
             try:
-                script = _list_contents_repr(final_template, include_braces=False)
-                result = logo.process_instructionlist(script)
+                result = logo.run_instructionlist(final_template)
                 return result
             finally:
                 logo.pop_placeholders()
@@ -720,6 +894,35 @@ def process_case(logo, value, clauses):
             return clause[1]
 
 
+def process_catch(logo, tag, instructionlist):
+    """
+    The CATCH command.
+    Runs the instruction list.  A THROW with the same tag stops it, and the
+    value given to THROW, if any, is output.  `catch "error` also catches
+    errors, which ERROR then describes.
+    """
+    if not _is_word(tag):
+        raise errors.LogoError(
+            "CATCH doesn't like `{}` as input.".format(_input_repr(tag))
+        )
+    key = str(tag).lower()
+    catch_tags = logo.catch_tags
+    catch_tags.append(key)
+    try:
+        return _process_run_like("CATCH", logo, instructionlist)
+    except errors.ThrowSignal as signal:
+        if signal.tag != key:
+            raise
+        return signal.value
+    except (errors.LogoError, ArithmeticError) as ex:
+        if key != "error":
+            raise
+        number = 35 if isinstance(ex, errors.ThrownError) else 0
+        logo.caught_error = [number, str(ex), [], []]
+    finally:
+        catch_tags.pop()
+
+
 def process_char(logo, codepoint):
     """
     The CHAR command.
@@ -785,6 +988,46 @@ def process_cond(logo, clauses):
             return _process_run_like("COND", logo, instrlist)
 
 
+def process_cons_stream(logo, thing, instructionlist):
+    """
+    The CONS-STREAM command.
+    Outputs a stream whose first member is `thing`.  The instruction list
+    outputs the rest of the stream, a stream or a list, and is only run
+    when the rest is first needed.
+
+    The values of the variables the instruction list refers to are saved
+    now and bound again when it runs, so it still sees them after the
+    procedure that made the stream has returned.
+    """
+    if not _is_list(instructionlist):
+        raise errors.LogoError(
+            "CONS-STREAM expected an instruction list, but got `{}` instead.".format(
+                instructionlist
+            )
+        )
+    bindings = []
+    for varname in _referenced_varnames(instructionlist):
+        try:
+            bindings.append((varname, logo.get_variable_value(varname)))
+        except errors.LogoError:
+            pass
+
+    def promise():
+        logo.create_scope(bindings)
+        try:
+            rest = _process_run_like("CONS-STREAM", logo, instructionlist)
+        finally:
+            logo.destroy_scope()
+        if not (_is_stream(rest) or _is_list(rest)):
+            raise errors.LogoError(
+                "CONS-STREAM expected a stream or list for the rest, "
+                "but got `{}` instead.".format(rest)
+            )
+        return rest
+
+    return datatypes.Stream(thing, promise)
+
+
 def process_cos(logo, degrees):
     """
     The COS command.
@@ -801,10 +1044,16 @@ def process_count(logo, thing):
     """
     The COUNT command.
     """
-    try:
-        return len(thing)
-    except TypeError:
+    dtype = _datatypename(thing)
+    if dtype == "word":
         return len(str(thing))
+    if dtype in ("list", "array"):
+        return len(thing)
+    if dtype == "stream":
+        raise errors.LogoError("COUNT doesn't like a stream as input.")
+    raise errors.LogoError(
+        "COUNT doesn't like `{}` as input.".format(_input_repr(thing))
+    )
 
 
 def process_dec_str(logo, num):
@@ -825,9 +1074,9 @@ def process_dequeue(logo, queuename):
     """
     The DEQUEUE command.
     """
-    q = logo.get_variable_value(queuename)
+    q = _get_deque_list(logo, queuename)
     try:
-        return q.pop()
+        item, q = q.pop_right()
     except AttributeError:
         raise errors.LogoError(
             "Tried to DEQUEUE from `{}`, but is not a list.".format(queuename)
@@ -836,6 +1085,8 @@ def process_dequeue(logo, queuename):
         raise errors.LogoError(
             "Tried to DEQUEUE from an empty list, `{}`.".format(queuename)
         )
+    logo.set_variable(queuename, q)
+    return item
 
 
 def process_difference(logo, num1, num2):
@@ -874,7 +1125,7 @@ def process_emptyp(logo, thing):
     """
     The EMPTYP command.
     """
-    if len(thing) == 0:
+    if not _is_stream(thing) and len(thing) == 0:
         return "true"
     else:
         return "false"
@@ -890,6 +1141,19 @@ def process_equalp(logo, thing1, thing2):
         return "false"
 
 
+def process_error(logo):
+    """
+    The ERROR command.
+    Outputs `[number message procedure line]` for the last error caught by
+    `catch "error`, and forgets it.  Outputs the empty list if there is none.
+    """
+    error = logo.caught_error
+    logo.caught_error = None
+    if error is None:
+        return []
+    return error
+
+
 def process_exp(logo, num):
     """
     The EXP command.
@@ -930,6 +1194,87 @@ def process_ext_ellipse(logo, major, minor, angle=360, clockwise="true"):
     trtl.ellipse(major, minor, angle, _is_true(clockwise))
 
 
+def process_ext_memoize(logo, procname, maxsize=1024):
+    """
+    The EXT.MEMOIZE command.
+    Caches the results of the user defined procedure, `procname`, by its
+    inputs.  The procedure should output a value that only depends on its
+    inputs and have no side effects.
+    """
+    proc = _get_user_procedure("EXT.MEMOIZE", logo, procname)
+    if not (isinstance(maxsize, int) and maxsize >= 0):
+        raise errors.LogoError(
+            "EXT.MEMOIZE doesn't like `{}` as input.".format(_input_repr(maxsize))
+        )
+    if proc.memo is None:
+        proc.memo = ProcedureMemo(maxsize=maxsize)
+        # Calls to a memoized procedure are not compiled as tail calls.
+        logo.procedure_generation += 1
+    else:
+        proc.memo.maxsize = maxsize
+        proc.memo.clear()
+
+
+def process_ext_memostats(logo, procname):
+    """
+    The EXT.MEMOSTATS command.
+    Outputs the hits, misses, size and maximum size of the cache of a
+    memoized procedure as a list of names and values.
+    """
+    proc = _get_user_procedure("EXT.MEMOSTATS", logo, procname)
+    memo = proc.memo
+    if memo is None:
+        raise errors.LogoError("`{}` is not memoized.".format(procname))
+    return [
+        "hits",
+        memo.hits,
+        "misses",
+        memo.misses,
+        "size",
+        len(memo.cache),
+        "maxsize",
+        memo.maxsize,
+    ]
+
+
+def process_ext_pfilter(logo, tftemplate, data):
+    """
+    The EXT.PFILTER command.
+    Like FILTER, but the template runs in a pool of worker processes.
+    """
+    if _is_stream(data):
+        raise errors.LogoError("EXT.PFILTER doesn't like a stream as input.")
+    _create_template("EXT.PFILTER", logo, [data], tftemplate)
+    results = parallel.parallel_apply(logo, "EXT.PFILTER", tftemplate, [data])
+    selected = []
+    for item, result in zip(data, results):
+        if not isinstance(result, str):
+            raise errors.LogoError(
+                "EXT.PFILTER template must return either true or false."
+            )
+        if _is_true(result):
+            selected.append(item)
+        elif not _is_false(result):
+            raise errors.LogoError(
+                "EXT.PFILTER template must return either true or false."
+            )
+    return selected
+
+
+def process_ext_pmap(logo, template, *data_lists):
+    """
+    The EXT.PMAP command.
+    Like MAP, but the template runs in a pool of worker processes.
+    """
+    if not _same_lengths(data_lists) or any(_is_stream(x) for x in data_lists):
+        raise errors.LogoError("EXT.PMAP expects data lists of equal size.")
+    _create_template("EXT.PMAP", logo, data_lists, template)
+    results = parallel.parallel_apply(logo, "EXT.PMAP", template, data_lists)
+    if None in results:
+        raise errors.LogoError("EXT.PMAP template must return a value.")
+    return results
+
+
 def process_ext_unfilled(logo, instructions):
     """
     The EXT.UNFILLED command.
@@ -944,40 +1289,31 @@ def process_ext_unfilled(logo, instructions):
             trtl.end_unfilled()
 
 
+def process_ext_unmemoize(logo, procname):
+    """
+    The EXT.UNMEMOIZE command.
+    """
+    proc = _get_user_procedure("EXT.UNMEMOIZE", logo, procname)
+    if proc.memo is not None:
+        proc.memo = None
+        logo.procedure_generation += 1
+
+
 def process_filter(logo, tftemplate, data):
     """
     The FILTER command.
     """
     template_type, template = _create_template("FILTER", logo, [data], tftemplate)
-    scope_stack = logo.scope_stack
     results = []
-    for n, item in enumerate(data):
-        result = None
-        logo.push_placeholders((item,))
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, [item]))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like("FILTER", logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like("FILTER", logo, template)
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, [item])
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, [item])
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
-        if _is_true(result):
-            results.append(item)
-        elif not _is_false(result):
-            raise errors.LogoError("FILTER template must return either true or false.")
+    with TemplateRunner("FILTER", logo, template_type, template) as run:
+        for n, item in enumerate(data, 1):
+            result = run(n, (item,))
+            if _is_true(result):
+                results.append(item)
+            elif not _is_false(result):
+                raise errors.LogoError(
+                    "FILTER template must return either true or false."
+                )
     return results
 
 
@@ -1000,45 +1336,36 @@ def process_find(logo, tftemplate, data):
     The FIND command.
     """
     template_type, template = _create_template("FIND", logo, [data], tftemplate)
-    scope_stack = logo.scope_stack
-    for n, item in enumerate(data):
-        result = None
-        logo.push_placeholders((item,))
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, [item]))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like("FIND", logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like("FIND", logo, template)
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, [item])
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, [item])
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
-        if result is None:
-            raise errors.LogoError("FILTER template must return either true or false.")
-        if _is_true(result):
-            return item
-        elif not _is_false(result):
-            raise errors.LogoError("FILTER template must return either true or false.")
+    with TemplateRunner("FIND", logo, template_type, template) as run:
+        for n, item in enumerate(data, 1):
+            result = run(n, (item,))
+            if result is None:
+                raise errors.LogoError(
+                    "FIND template must return either true or false."
+                )
+            if _is_true(result):
+                return item
+            elif not _is_false(result):
+                raise errors.LogoError(
+                    "FIND template must return either true or false."
+                )
     return []
 
 
 def process_first(logo, thing):
     """
     The FIRST command.
+    The FIRST of an array is its origin, and the FIRST of a stream is its
+    first member, as with STREAM-FIRST.
     """
+    if _is_array(thing):
+        return thing.origin
+    if _is_stream(thing):
+        return thing.first
     if len(thing) == 0:
-        raise errors.LogoError("FIRST doesn't like `{}` as input.".format(thing))
+        raise errors.LogoError(
+            "FIRST doesn't like `{}` as input.".format(_input_repr(thing))
+        )
     else:
         return thing[0]
 
@@ -1050,7 +1377,9 @@ def process_firsts(logo, lst):
     lst = []
     for item in lst:
         if len(item) == 0:
-            raise errors.LogoError("FIRSTS doesn't like `{}` as input.".format(item))
+            raise errors.LogoError(
+                "FIRSTS doesn't like `{}` as input.".format(_input_repr(item))
+            )
         lst.append(item[0])
     return lst
 
@@ -1109,11 +1438,6 @@ def _extract_define_inputs_from_list(lst):
     return (required_inputs, optional_inputs, rest_input)
 
 
-def __extendlst(a, b):
-    a.extend(b)
-    return a
-
-
 def _create_template(cmd, logo, data_lists, template):
     """
     Returns a template usable by commands like FOREACH, MAP, etc.
@@ -1124,7 +1448,7 @@ def _create_template(cmd, logo, data_lists, template):
     * `named-procedure` - Template is a procedure object.
     * `procedure-text` - A Procedure object.
     """
-    if not len(set([len(x) for x in data_lists])) == 1:
+    if not _same_lengths(data_lists):
         raise errors.LogoError(
             "{} expects all data lists to be of equal size.".format(cmd)
         )
@@ -1142,7 +1466,9 @@ def _create_template(cmd, logo, data_lists, template):
                 optional_inputs,
                 rest_input,
             ) = _extract_define_inputs_from_list(first_item)
-            tokens = collections.deque(functools.reduce(__extendlst, template[1:]))
+            tokens = collections.deque(
+                token for instructionlist in template[1:] for token in instructionlist
+            )
             procedure = LogoProcedure.make_procedure(
                 name="lambda-procedure",
                 required_inputs=required_inputs,
@@ -1202,6 +1528,67 @@ def _create_template(cmd, logo, data_lists, template):
             )
 
 
+class TemplateRunner:
+    """
+    Runs a template from `_create_template()` once for each member of the
+    data lists of MAP, FILTER, FOREACH, etc.
+
+    Instruction list templates are compiled once per run, so each member
+    costs one call of the compiled body.  A single placeholder frame and
+    repcount scope are set up when the runner is entered and each call
+    updates them in place.  The lambda form gets a fresh variable scope
+    for every member, so LOCAL and LOCALMAKE inside the template don't
+    leak into later members.
+    """
+
+    __slots__ = ("cmd", "logo", "template_type", "template", "varnames", "body")
+
+    def __init__(self, cmd, logo, template_type, template):
+        self.cmd = cmd
+        self.logo = logo
+        self.template_type = template_type
+        self.template = template
+        self.varnames = ()
+        self.body = None
+        if template_type == "lambda-form":
+            self.varnames, self.template = template
+
+    def __enter__(self):
+        logo = self.logo
+        if self.template_type in ("lambda-form", "qmark-form"):
+            self.body = logo.compile_instructionlist(self.template)
+        logo.push_placeholders(())
+        logo.create_repcount_scope()
+        if self.template_type == "lambda-form":
+            logo.create_scope()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        logo = self.logo
+        if self.template_type == "lambda-form":
+            logo.destroy_scope()
+        logo.destroy_repcount_scope()
+        logo.pop_placeholders()
+
+    def __call__(self, n, inputs):
+        """
+        Run the template with the tuple `inputs` as the `n`th member.
+        Return its result.
+        """
+        logo = self.logo
+        logo.placeholder_stack[-1] = inputs
+        logo.set_repcount(n)
+        body = self.body
+        if body is None:
+            return logo.execute_procedure(self.template, list(inputs))
+        if self.template_type == "lambda-form":
+            logo.destroy_scope()
+            logo.create_scope(zip(self.varnames, inputs))
+        if body.generation != logo.procedure_generation:
+            body = self.body = logo.compile_instructionlist(self.template)
+        return body.run(logo)
+
+
 def process_foreach(logo, *args):
     """
     The FOREACH command.
@@ -1214,37 +1601,13 @@ def process_foreach(logo, *args):
         )
     template = args[-1]
     data_lists = args[:-1]
-    if not len(set([len(x) for x in data_lists])) == 1:
+    if not _same_lengths(data_lists):
         raise errors.LogoError("FOREACH expects all data lists to be of equal size.")
     template_type, template = _create_template("FOREACH", logo, data_lists, template)
-    scope_stack = logo.scope_stack
     result = None
-    for n, t in enumerate(zip(*data_lists)):
-        logo.push_placeholders(t)
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, t))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like("FOREACH", logo, template_instrlist)
-                    continue
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like("FOREACH", logo, template)
-                continue
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, *t)
-                continue
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, t)
-                continue
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
+    with TemplateRunner("FOREACH", logo, template_type, template) as run:
+        for n, t in enumerate(zip(*data_lists), 1):
+            result = run(n, t)
     return result
 
 
@@ -1276,19 +1639,21 @@ def process_for(logo, forcontrol, instrlist):
         else:
             step = -1
     sign = functools.partial(math.copysign, 1)
-    for_scope = {counter_name: start}
-    logo.scope_stack.append(for_scope)
+    variables = logo.variables
+    logo.create_scope([(counter_name, start)])
 
-    def _limit_not_reached(for_scope, counter_name, limit, step):
+    def _limit_not_reached(counter_name, limit, step):
         return (
-            sign(for_scope[counter_name] - limit) != sign(step)
-            or for_scope[counter_name] == limit
+            sign(variables[counter_name] - limit) != sign(step)
+            or variables[counter_name] == limit
         )
 
-    while _limit_not_reached(for_scope, counter_name, limit, step):
-        _process_run_like("FOR", logo, instrlist)
-        for_scope[counter_name] += step
-    logo.scope_stack.pop()
+    try:
+        while _limit_not_reached(counter_name, limit, step):
+            _process_run_like("FOR", logo, instrlist)
+            variables[counter_name] += step
+    finally:
+        logo.destroy_scope()
 
 
 def process_forward(logo, dist):
@@ -1302,9 +1667,24 @@ def process_fput(logo, thing, lst):
     """
     The FPUT command.
     """
-    lst = [thing]
-    lst.extend(lst)
-    return lst
+    if isinstance(lst, list):
+        return datatypes.ConsList(thing, datatypes.persistent(lst))
+    if _is_word(lst) and _is_word(thing):
+        return "{}{}".format(thing, lst)
+    raise errors.LogoError("FPUT doesn't like `{}` as input.".format(_input_repr(lst)))
+
+
+def process_gprop(logo, plistname, propname):
+    """
+    The GPROP command.
+    Returns the empty list if the property list has no such property.
+    """
+    plistname = _plist_key("GPROP", plistname)
+    propname = _plist_key("GPROP", propname)
+    plist = logo.property_lists.get(plistname)
+    if plist is None:
+        return []
+    return plist.get(propname, [])
 
 
 def process_greaterequalp(logo, num1, num2):
@@ -1362,19 +1742,7 @@ def process_if(logo, tf, instrlist, instrlist2=None):
     """
     The IF command.
     """
-    dtype = _datatypename(tf)
-    if dtype == "list":
-        tf = _process_run_like("IF", logo, tf)
-    try:
-        tf = tf.lower()
-    except AttributeError:
-        raise errors.LogoError(
-            "IF expects TRUE/FALSE but received `{}` instead.".format(tf)
-        )
-    if tf not in ("true", "false"):
-        raise errors.LogoError(
-            "IF expects TRUE/FALSE but received `{}` instead.".format(tf)
-        )
+    is_true = if_condition("IF", logo, tf)
     dtype = _datatypename(instrlist)
     if dtype != "list":
         raise errors.LogoError(
@@ -1387,31 +1755,37 @@ def process_if(logo, tf, instrlist, instrlist2=None):
                     instrlist2
                 )
             )
-    if tf == "true":
-        script = _list_contents_repr(instrlist, include_braces=False)
-        return logo.process_instructionlist(script)
+    if is_true:
+        return logo.run_instructionlist(instrlist)
     elif instrlist2 is not None:
-        script = _list_contents_repr(instrlist2, include_braces=False)
-        return logo.process_instructionlist(script)
+        return logo.run_instructionlist(instrlist2)
 
 
-def process_ifelse(logo, tf, instrlist1, instrlist2):
+def if_condition(cmd, logo, tf):
     """
-    The IFELSE command.
+    Return True or False for the condition input of IF or IFELSE.  If the
+    input is a list, it is run and its output is used instead.
     """
-    dtype = _datatypename(tf)
-    if dtype == "list":
-        tf = _process_run_like("IF", logo, tf)
+    if _datatypename(tf) == "list":
+        tf = _process_run_like(cmd, logo, tf)
     try:
         tf = tf.lower()
     except AttributeError:
         raise errors.LogoError(
-            "IFELSE expects TRUE/FALSE but received `{}` instead.".format(tf)
+            "{} expects TRUE/FALSE but received `{}` instead.".format(cmd, tf)
         )
     if tf not in ("true", "false"):
         raise errors.LogoError(
-            "IFELSE expects TRUE/FALSE but received `{}` instead.".format(tf)
+            "{} expects TRUE/FALSE but received `{}` instead.".format(cmd, tf)
         )
+    return tf == "true"
+
+
+def process_ifelse(logo, tf, instrlist1, instrlist2):
+    """
+    The IFELSE command.
+    """
+    is_true = if_condition("IFELSE", logo, tf)
     for instrlist in (instrlist1, instrlist2):
         dtype = _datatypename(instrlist)
         if dtype != "list":
@@ -1420,12 +1794,10 @@ def process_ifelse(logo, tf, instrlist1, instrlist2):
                     instrlist
                 )
             )
-    if _is_true(tf):
-        script = _list_contents_repr(instrlist1, include_braces=False)
-        return logo.process_instructionlist(script)
+    if is_true:
+        return logo.run_instructionlist(instrlist1)
     else:
-        script = _list_contents_repr(instrlist2, include_braces=False)
-        return logo.process_instructionlist(script)
+        return logo.run_instructionlist(instrlist2)
 
 
 def process_ignore(logo, value):
@@ -1458,7 +1830,7 @@ def process_iseq(logo, frm, to):
         stop = to - 1
         step = -1
     try:
-        return list(range(start, stop, step))
+        return datatypes.RangeList(range(start, stop, step))
     except TypeError:
         raise errors.LogoError(
             "ISEQ expects numbers, but received `{}`, `{}` instead.".format(frm, to)
@@ -1469,6 +1841,13 @@ def process_item(logo, index, thing):
     """
     The ITEM command.
     """
+    if _is_array(thing):
+        try:
+            return thing.get(index)
+        except (IndexError, TypeError):
+            raise errors.LogoError("ITEM index {} out of range.".format(index))
+    if _is_stream(thing):
+        raise errors.LogoError("ITEM doesn't like a stream as input.")
     py_index = index - 1
     if py_index < 0:
         raise errors.LogoError("ITEM index {} out of range.".format(index))
@@ -1529,13 +1908,19 @@ def process_last(logo, thing):
     """
     The LAST command.
     """
+    if _is_stream(thing):
+        raise errors.LogoError("LAST doesn't like a stream as input.")
     try:
         if len(thing) == 0:
-            raise errors.LogoError("LAST doesn't like `{}` as input.".format(thing))
+            raise errors.LogoError(
+                "LAST doesn't like `{}` as input.".format(_input_repr(thing))
+            )
         else:
             return thing[-1]
     except TypeError:
-        raise errors.LogoError("LAST doesn't like `{}` as input.".format(thing))
+        raise errors.LogoError(
+            "LAST doesn't like `{}` as input.".format(_input_repr(thing))
+        )
 
 
 def process_left(logo, angle):
@@ -1591,6 +1976,18 @@ def process_listp(logo, thing):
     return "false"
 
 
+def process_listtoarray(logo, lst, origin=1):
+    """
+    The LISTTOARRAY command.
+    """
+    if not _is_list(lst):
+        raise errors.LogoError(
+            "LISTTOARRAY doesn't like `{}` as input.".format(_input_repr(lst))
+        )
+    origin = _integer_input("LISTTOARRAY", origin)
+    return datatypes.LogoArray(lst, origin)
+
+
 def process_load(logo, filename):
     """
     The LOAD command.
@@ -1602,12 +1999,11 @@ def process_local(logo, *args):
     """
     The LOCAL command.
     """
-    scope = logo.scope_stack[-1]
     if len(args) == 1:
         arg = args[0]
         dtype = _datatypename(arg)
         if dtype == "word":
-            scope[arg] = None
+            logo.bind_variable(arg, None)
         elif dtype == "list":
             for varname in arg:
                 dtype2 = _datatypename(varname)
@@ -1617,7 +2013,7 @@ def process_local(logo, *args):
                             varname
                         )
                     )
-                scope[varname] = None
+                logo.bind_variable(varname, None)
         else:
             raise errors.LogoError(
                 "LOCAL expects a word or a list or words, but received `{}` instead.".format(
@@ -1633,15 +2029,14 @@ def process_local(logo, *args):
                         varname
                     )
                 )
-            scope[varname] = None
+            logo.bind_variable(varname, None)
 
 
 def process_localmake(logo, varname, value):
     """
     The LOCALMAKE command.
     """
-    scope = logo.scope_stack[-1]
-    scope[varname] = value
+    logo.bind_variable(varname, value)
 
 
 def process_log10(logo, num):
@@ -1695,13 +2090,7 @@ def process_make(logo, varname, value):
     """
     The MAKE command.
     """
-    scopes = logo.scope_stack
-    for scope in reversed(scopes):
-        if varname in scope:
-            scope[varname] = value
-            return
-    global_scope = logo.scope_stack[0]
-    global_scope[varname] = value
+    logo.set_variable(varname, value)
 
 
 def process_map(logo, template, *data_lists):
@@ -1721,42 +2110,73 @@ def process_map_se(logo, template, *data_lists):
 
 
 def _process_map(cmd, logo, template, *data_lists):
-    if not len(set([len(x) for x in data_lists])) == 1:
+    if not _same_lengths(data_lists):
         raise errors.LogoError(
             "{} expects all data lists to be of equal size.".format(cmd)
         )
     template_type, template = _create_template("MAP", logo, data_lists, template)
-    scope_stack = logo.scope_stack
     results = []
-    for n, t in enumerate(zip(*data_lists)):
-        result = None
-        logo.push_placeholders(t)
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, t))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like(cmd, logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like(cmd, logo, template)
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, *t)
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, t)
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
-        if result is None:
-            raise errors.LogoError("{} template must return a value.".format(cmd))
-        results.append(result)
+    with TemplateRunner(cmd, logo, template_type, template) as run:
+        for n, t in enumerate(zip(*data_lists), 1):
+            result = run(n, t)
+            if result is None:
+                raise errors.LogoError("{} template must return a value.".format(cmd))
+            results.append(result)
     return results
 
 
+def process_mdarray(logo, sizelist, origin=1):
+    """
+    The MDARRAY command.
+    Returns an array of arrays, one level for each size in `sizelist`.
+    """
+    if not _is_list(sizelist) or len(sizelist) == 0:
+        raise errors.LogoError(
+            "MDARRAY doesn't like `{}` as input.".format(_input_repr(sizelist))
+        )
+    sizes = [_integer_input("MDARRAY", size) for size in sizelist]
+    if any(size < 0 for size in sizes):
+        raise errors.LogoError(
+            "MDARRAY doesn't like `{}` as input.".format(_input_repr(sizelist))
+        )
+    origin = _integer_input("MDARRAY", origin)
+
+    def make_array(sizes):
+        size = sizes[0]
+        if len(sizes) == 1:
+            return datatypes.LogoArray([[]] * size, origin)
+        return datatypes.LogoArray([make_array(sizes[1:]) for n in range(size)], origin)
+
+    return make_array(sizes)
+
+
+def process_mditem(logo, indexlist, array):
+    """
+    The MDITEM command.
+    """
+    if not _is_list(indexlist) or len(indexlist) == 0:
+        raise errors.LogoError(
+            "MDITEM doesn't like `{}` as input.".format(_input_repr(indexlist))
+        )
+    thing = array
+    for index in indexlist:
+        thing = process_item(logo, index, thing)
+    return thing
+
+
+def process_mdsetitem(logo, indexlist, array, value):
+    """
+    The MDSETITEM command.
+    """
+    if not _is_list(indexlist) or len(indexlist) == 0:
+        raise errors.LogoError(
+            "MDSETITEM doesn't like `{}` as input.".format(_input_repr(indexlist))
+        )
+    indexlist = list(indexlist)
+    array = process_mditem(logo, indexlist[:-1], array) if len(indexlist) > 1 else array
+    process_setitem(logo, indexlist[-1], array, value)
+
+
 def process_member(logo, thing1, thing2):
     """
     The MEMBER command.
@@ -1774,11 +2194,10 @@ def process_member(logo, thing1, thing2):
     elif dtype2 == "word":
         return ""
     elif dtype2 == "list":
-        pos = thing2.index(thing1)
-        try:
-            return thing2[pos:]
-        except ValueError:
+        pos = _member_position(logo, thing1, thing2)
+        if pos == -1:
             return []
+        return datatypes.persistent(thing2)[pos:]
     else:
         raise errors.LogoError(
             "MEMBER expects a word or list for thing2 but got a {}.".format(dtype2)
@@ -1789,7 +2208,13 @@ def process_memberp(logo, thing1, thing2):
     """
     The MEMBERP command.
     """
-    if thing1 in thing2:
+    if _is_stream(thing2):
+        raise errors.LogoError("MEMBERP doesn't like a stream as input.")
+    if _is_list(thing2):
+        found = _member_position(logo, thing1, thing2) != -1
+    else:
+        found = thing1 in thing2
+    if found:
         return "true"
     else:
         return "false"
@@ -1848,14 +2273,11 @@ def process_numberp(logo, thing):
 def process_or(logo, *args):
     """
     The OR command.
+    Inputs that are instruction lists are run in order, only until one of
+    them outputs TRUE.
     """
-    truth_map = {"true": True, "false": False}
     for arg in args:
-        if not arg.lower() in truth_map:
-            raise errors.LogoError(
-                "OR expects true/false values but received `{}` instead.".format(arg)
-            )
-        if truth_map[arg.lower()]:
+        if logical_input("OR", logo, arg):
             return "true"
     return "false"
 
@@ -2027,19 +2449,45 @@ def process_polygon(logo, n, radius, clockwise="true", sides=None):
     turtle.circle(radius, degrees, sides)
 
 
+def process_plist(logo, plistname):
+    """
+    The PLIST command.
+    Returns a list of alternating property names and values.
+    """
+    plistname = _plist_key("PLIST", plistname)
+    plist = logo.property_lists.get(plistname, {})
+    result = []
+    for propname, value in plist.items():
+        result.append(propname)
+        result.append(value)
+    return result
+
+
+def process_plistp(logo, plistname):
+    """
+    The PLISTP command.
+    """
+    plistname = _plist_key("PLISTP", plistname)
+    if logo.property_lists.get(plistname):
+        return "true"
+    return "false"
+
+
 def process_pop(logo, stackname):
     """
     The POP command.
     """
-    stack = logo.get_variable_value(stackname)
+    stack = _get_deque_list(logo, stackname)
     try:
-        return stack.pop(0)
+        item, stack = stack.pop_left()
     except AttributeError:
         raise errors.LogoError(
             "Tried to POP from `{}`, but it is not a list.".format(stackname)
         )
     except IndexError:
         raise errors.LogoError("Tried to POP from empty stack, `{}`.".format(stackname))
+    logo.set_variable(stackname, stack)
+    return item
 
 
 def process_pos(logo):
@@ -2061,6 +2509,18 @@ def process_power(logo, num1, num2):
         )
 
 
+def process_pprop(logo, plistname, propname, value):
+    """
+    The PPROP command.
+    """
+    plistname = _plist_key("PPROP", plistname)
+    propname = _plist_key("PPROP", propname)
+    plist = logo.property_lists.get(plistname)
+    if plist is None:
+        plist = logo.property_lists[plistname] = {}
+    plist[propname] = value
+
+
 def process_print(logo, *args):
     """
     The PRINT command.
@@ -2073,6 +2533,8 @@ def process_print(logo, *args):
             )
         elif _datatypename(arg) == "word":
             reps.append(str(arg))
+        elif _datatypename(arg) in ("array", "stream"):
+            reps.append(_list_contents_repr(arg, escape_delimiters=False))
     print(" ".join(reps), file=logo.stdout)
 
 
@@ -2092,26 +2554,28 @@ def process_push(logo, stackname, thing):
     """
     The PUSH command.
     """
-    stack = logo.get_variable_value(stackname)
+    stack = _get_deque_list(logo, stackname)
     try:
-        stack.insert(0, thing)
+        stack = stack.push_left(thing)
     except AttributeError:
         raise errors.LogoError(
             "Tried to PUSH to `{}`, but is not a list.".format(stackname)
         )
+    logo.set_variable(stackname, stack)
 
 
 def process_queue(logo, queuename, thing):
     """
     The QUEUE command.
     """
-    q = logo.get_variable_value(queuename)
+    q = _get_deque_list(logo, queuename)
     try:
-        q.insert(0, thing)
+        q = q.push_left(thing)
     except AttributeError:
         raise errors.LogoError(
             "Tried to QUEUE to `{}`, but it is not a list.".format(queuename)
         )
+    logo.set_variable(queuename, q)
 
 
 def process_quoted(logo, thing):
@@ -2243,31 +2707,15 @@ def process_reduce(logo, template, data):
     """
     The REDUCE command.
     """
+    if _is_stream(data):
+        data = list(data)
     if len(data) == 1:
         return data[0]
     template_type, template = _create_template("REDUCE", logo, [data, data], template)
-    scope_stack = logo.scope_stack
     accumulator = data[0]
-    data = data[1:]
-    for item in data:
-        logo.push_placeholders((item, accumulator))
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, [item, accumulator]))
-                scope_stack.append(scope)
-                try:
-                    accumulator = _process_run_like("REDUCE", logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                accumulator = _process_run_like("FILTER", logo, template)
-            elif template_type == "named-procedure":
-                accumulator = logo.execute_procedure(template, [item, accumulator])
-            elif template_type == "procedure-text":
-                accumulator = logo.execute_procedure(template, [item, accumulator])
-        finally:
-            logo.pop_placeholders()
+    with TemplateRunner("REDUCE", logo, template_type, template) as run:
+        for n, item in enumerate(data[1:], 1):
+            accumulator = run(n, (item, accumulator))
     return accumulator
 
 
@@ -2317,8 +2765,7 @@ def process_repeat(logo, num, instructionlist):
             )
         for i in range(num):
             logo.set_repcount(i + 1)
-            script = _list_contents_repr(instructionlist, include_braces=False)
-            logo.process_instructionlist(script)
+            logo.run_instructionlist(instructionlist)
     finally:
         logo.destroy_repcount_scope()
 
@@ -2326,26 +2773,49 @@ def process_repeat(logo, num, instructionlist):
 def process_remdup(logo, lst):
     """
     The REMDUP command.
+    Keeps the last of each set of equal members.
     """
-    lst = collections.deque([])
-    s = set([])
-    for x in reversed(lst):
-        if x not in s:
-            lst.appendleft(x)
-            s.add(x)
     dtype = _datatypename(lst)
-    if dtype == "list":
-        return list(lst)
-    elif dtype == "word":
-        return "".join(lst)
+    if dtype == "word":
+        members = str(lst)
+    elif dtype == "list":
+        members = lst
     else:
         raise errors.LogoError("REMDUP cannot be used on a {}.".format(dtype))
+    result = collections.deque([])
+    seen = set([])
+    for x in reversed(members):
+        key = datatypes.freeze(x)
+        if key not in seen:
+            result.appendleft(x)
+            seen.add(key)
+    if dtype == "word":
+        return "".join(result)
+    return list(result)
+
+
+def process_remprop(logo, plistname, propname):
+    """
+    The REMPROP command.
+    """
+    plistname = _plist_key("REMPROP", plistname)
+    propname = _plist_key("REMPROP", propname)
+    plist = logo.property_lists.get(plistname)
+    if plist is None:
+        return
+    plist.pop(propname, None)
+    if len(plist) == 0:
+        del logo.property_lists[plistname]
 
 
 def process_reverse(logo, lst):
     """
     The REVERSE command.
     """
+    if isinstance(lst, datatypes.ConsList):
+        return list(reversed(lst))
+    if isinstance(lst, list):
+        return datatypes.persistent(lst)[::-1]
     r = list(lst)
     r.reverse()
     return r
@@ -2378,15 +2848,16 @@ def process_rseq(logo, frm, to, count):
     def pos_fn(frm, to, count, i):
         return (to * i + frm * (count - i - 1)) / (count - 1)
 
-    p = functools.partial(pos_fn, frm, to, count)
-    try:
-        return list(map(p, range(count)))
-    except TypeError:
+    if not (_is_number(frm) and _is_number(to) and isinstance(count, int)):
         raise errors.LogoError(
             "RSEQ expected numbers, but got `{}`, `{}`, `{}` instead.".format(
                 frm, to, count
             )
         )
+    if count == 1:
+        return [frm]
+    p = functools.partial(pos_fn, frm, to, count)
+    return datatypes.RangeList(range(max(count, 0)), p)
 
 
 def process_run(logo, instructionlist):
@@ -2410,8 +2881,7 @@ def process_runresult(logo, instructionlist):
 def _process_run_like(cmd, logo, instructionlist):
     dtype = _datatypename(instructionlist)
     if dtype == "list":
-        script = _list_contents_repr(instructionlist, include_braces=False)
-        return logo.process_instructionlist(script)
+        return logo.run_instructionlist(instructionlist)
     elif dtype == "word":
         return logo.process_instructionlist(str(instructionlist))
     else:
@@ -2437,12 +2907,21 @@ def process_save(logo, filename):
             print("end", file=f)
             print("", file=f)
         print("; VARIABLES", file=f)
-        global_scope = logo.scope_stack[0]
-        variables = list(global_scope.items())
+        variables = list(logo.global_variables().items())
         variables.sort()
         for name, value in variables:
-            valuestr = _list_contents_repr([value], include_braces=False)
-            print("""make "{} {}""".format(name, valuestr), file=f)
+            print("""make "{} {}""".format(name, _save_value_repr(value)), file=f)
+        print("; PROPERTY LISTS", file=f)
+        for plistname, plist in sorted(logo.property_lists.items()):
+            for propname, value in plist.items():
+                print(
+                    """pprop "{} "{} {}""".format(
+                        _escape_word_chars(plistname),
+                        _escape_word_chars(propname),
+                        _save_value_repr(value),
+                    ),
+                    file=f,
+                )
 
 
 def process_sentence(logo, *args):
@@ -2476,6 +2955,22 @@ def process_setheading(logo, angle):
     logo.turtle.setheading(angle)
 
 
+def process_setitem(logo, index, array, value):
+    """
+    The SETITEM command.
+    """
+    if not _is_array(array):
+        raise errors.LogoError(
+            "SETITEM doesn't like `{}` as input.".format(_input_repr(array))
+        )
+    if _contains_array(value, array):
+        raise errors.LogoError("SETITEM can't put an array inside itself.")
+    try:
+        array.set(index, value)
+    except (IndexError, TypeError):
+        raise errors.LogoError("SETITEM index {} out of range.".format(index))
+
+
 def process_setpencolor(logo, color):
     """
     The SETPENCOLOR command.
@@ -2528,7 +3023,7 @@ def process_show(logo, *args):
     reps = []
     for arg in args:
         dtype = _datatypename(arg)
-        if dtype == "list":
+        if dtype in ("list", "array", "stream"):
             reps.append(_list_contents_repr(arg, escape_delimiters=False))
         elif dtype == "word":
             reps.append(str(arg))
@@ -2591,6 +3086,37 @@ def process_stop(logo):
     raise errors.StopSignal()
 
 
+def process_stream_butfirst(logo, stream):
+    """
+    The STREAM-BUTFIRST command.
+    """
+    if not _is_stream(stream):
+        raise errors.LogoError(
+            "STREAM-BUTFIRST doesn't like `{}` as input.".format(_input_repr(stream))
+        )
+    return stream.rest()
+
+
+def process_stream_first(logo, stream):
+    """
+    The STREAM-FIRST command.
+    """
+    if not _is_stream(stream):
+        raise errors.LogoError(
+            "STREAM-FIRST doesn't like `{}` as input.".format(_input_repr(stream))
+        )
+    return stream.first
+
+
+def process_streamp(logo, thing):
+    """
+    The STREAMP command.
+    """
+    if _is_stream(thing):
+        return "true"
+    return "false"
+
+
 def process_substringp(logo, thing1, thing2):
     """
     The SUBSTRINGP command.
@@ -2619,6 +3145,29 @@ def process_sum(logo, *args):
     return sum(args)
 
 
+def process_throw(logo, tag, value=None):
+    """
+    The THROW command.
+    `throw "error` signals an error, with `value` as its message if given.
+    """
+    if not _is_word(tag):
+        raise errors.LogoError(
+            "THROW doesn't like `{}` as input.".format(_input_repr(tag))
+        )
+    key = str(tag).lower()
+    if key == "error":
+        if value is None:
+            message = 'Throw "Error'
+        else:
+            message = _list_contents_repr(
+                value, include_braces=False, escape_delimiters=False
+            )
+        raise errors.ThrownError(message)
+    if key not in logo.catch_tags:
+        raise errors.LogoError("Can't find catch tag for `{}`.".format(tag))
+    raise errors.ThrowSignal(key, value)
+
+
 def process_thing(logo, varname):
     """
     The THING command.
@@ -2630,9 +3179,7 @@ def process_to(logo, tokens):
     """
     Process the TO command.
     """
-    scope_stack = logo.scope_stack
-    scope = {}
-    scope_stack.append(scope)
+    logo.create_scope()
     try:
         try:
             procedure_name = tokens.popleft()
@@ -2645,7 +3192,7 @@ def process_to(logo, tokens):
                 if _is_dots_name(peek):
                     param_name = tokens.popleft()[1:]
                     required_inputs.append(param_name)
-                    scope[param_name] = ":" + param_name
+                    logo.bind_variable(param_name, ":" + param_name)
                     continue
             break
         optional_inputs = []
@@ -2660,7 +3207,7 @@ def process_to(logo, tokens):
                         value = logo.evaluate_token_list(value)
                         param_name = opt_name[1:]
                         optional_inputs.append((param_name, value))
-                        scope[param_name] = ":" + param_name
+                        logo.bind_variable(param_name, ":" + param_name)
                         continue
             break
         rest_input = None
@@ -2702,9 +3249,16 @@ def process_to(logo, tokens):
             default_arity=default_arity,
             tokens=procedure_tokens,
         )
+        old_procedure = logo.procedures.get(procedure_name.lower())
+        if old_procedure is not None and old_procedure.memo is not None:
+            # A redefined procedure stays memoized, but its old results
+            # are dropped.
+            procedure.memo = old_procedure.memo
+            procedure.memo.clear()
         logo.procedures[procedure_name.lower()] = procedure
+        logo.procedure_generation += 1
     finally:
-        scope_stack.pop()
+        logo.destroy_scope()
 
 
 def process_towards(logo, pos):
@@ -2731,6 +3285,8 @@ def process_type(logo, *args):
             reps.append(_list_contents_repr(arg, include_braces=False))
         elif _datatypename(arg) == "word":
             reps.append(str(arg))
+        elif _datatypename(arg) in ("array", "stream"):
+            reps.append(_list_contents_repr(arg))
     print(" ".join(reps), end="", file=logo.stdout)
 
 
@@ -2859,9 +3415,98 @@ def _datatypename(o):
         return "word"
     if isinstance(o, list):
         return "list"
+    if isinstance(o, datatypes.LogoArray):
+        return "array"
+    if isinstance(o, datatypes.Stream):
+        return "stream"
     return "unknown"
 
 
+def _plist_key(name, word):
+    """
+    Return the key for a property list name or property name, `word`.
+    Numbers are keyed by their printed form, so `1` and `"1` are the same
+    property.
+    """
+    if not _is_word(word):
+        raise errors.LogoError(
+            "{} doesn't like `{}` as input.".format(name, _input_repr(word))
+        )
+    return str(word)
+
+
+def _member_position(logo, thing, lst):
+    """
+    Return the position of the first member of `lst` equal to `thing`, or
+    -1 if there is none.
+
+    The first search of a long list is a linear scan.  Searching it again
+    builds an index of its members' frozen keys, kept in
+    `logo.member_index_cache`, so repeated searches take constant time.
+    A `DequeList` is replaced by every PUSH, POP, QUEUE and DEQUEUE, so
+    it is never indexed, and a `RangeList` is searched without one.
+    """
+    if len(lst) < MEMBER_INDEX_MIN_LENGTH or isinstance(
+        lst, (datatypes.DequeList, datatypes.RangeList)
+    ):
+        return _linear_position(thing, lst)
+    cache = logo.member_index_cache
+    # The cache holds a reference to the list, so its id isn't reused
+    # while it is cached.
+    key = id(lst)
+    entry = cache.get(key)
+    if entry is None:
+        cache[key] = [lst, None]
+        if len(cache) > logo.member_index_cache_size:
+            cache.popitem(last=False)
+        return _linear_position(thing, lst)
+    cache.move_to_end(key)
+    index = entry[1]
+    if index is None:
+        index = entry[1] = {}
+        for position, member in enumerate(lst):
+            index.setdefault(datatypes.freeze(member), position)
+    return index.get(datatypes.freeze(thing), -1)
+
+
+def _linear_position(thing, lst):
+    try:
+        return lst.index(thing)
+    except ValueError:
+        return -1
+
+
+def _get_user_procedure(name, logo, procname):
+    """
+    Return the user defined procedure named `procname`.
+    """
+    if not _is_word(procname):
+        raise errors.LogoError(
+            "{} doesn't like `{}` as input.".format(name, _input_repr(procname))
+        )
+    proc = logo.procedures.get(str(procname).lower())
+    if proc is None:
+        if str(procname).lower() in logo.primitives:
+            raise errors.LogoError(
+                "{} can't be used with the primitive `{}`.".format(name, procname)
+            )
+        raise errors.LogoError("I don't know how to `{}`.".format(procname))
+    return proc
+
+
+def _get_deque_list(logo, varname):
+    """
+    Return the value of a variable used as a stack or queue.
+    Other lists are copied into a `DequeList`, so changes at either end
+    take constant time.  Other values are returned unchanged.  The caller
+    rebinds the variable to the changed list.
+    """
+    value = logo.get_variable_value(varname)
+    if isinstance(value, list) and not isinstance(value, datatypes.DequeList):
+        value = datatypes.DequeList(value)
+    return value
+
+
 def _is_list(o):
     """
     Returns True if `o` is a Logo list.
@@ -2869,6 +3514,69 @@ def _is_list(o):
     return _datatypename(o) == "list"
 
 
+def _is_array(o):
+    """
+    Returns True if `o` is a Logo array.
+    """
+    return isinstance(o, datatypes.LogoArray)
+
+
+def _is_stream(o):
+    """
+    Returns True if `o` is a Logo stream.
+    """
+    return isinstance(o, datatypes.Stream)
+
+
+def _same_lengths(data_lists):
+    """
+    Returns True if the data lists for a template command are all the same
+    length.  Streams may be unbounded, so they are left out; iteration stops
+    at the end of the shortest input.
+    """
+    return len(set([len(x) for x in data_lists if not _is_stream(x)])) <= 1
+
+
+def _referenced_varnames(instructionlist):
+    """
+    Returns the names of the variables referred to as `:name` anywhere in
+    `instructionlist`.
+    """
+    varnames = []
+    for item in instructionlist:
+        if isinstance(item, str) and item.startswith(":") and len(item) > 1:
+            if item[1:] not in varnames:
+                varnames.append(item[1:])
+        elif isinstance(item, (list, tuple)):
+            for varname in _referenced_varnames(item):
+                if varname not in varnames:
+                    varnames.append(varname)
+    return varnames
+
+
+def _contains_array(thing, array):
+    """
+    Returns True if `thing` is `array` or has it as a member at any depth.
+    """
+    if thing is array:
+        return True
+    if isinstance(thing, (list, datatypes.LogoArray)):
+        return any(_contains_array(member, array) for member in thing)
+    return False
+
+
+def _integer_input(name, value):
+    """
+    Returns `value` as an int, or raises a LogoError for the primitive,
+    `name`, if it isn't an integer.
+    """
+    if isinstance(value, numbers.Number) and int(value) == value:
+        return int(value)
+    raise errors.LogoError(
+        "{} doesn't like `{}` as input.".format(name, _input_repr(value))
+    )
+
+
 def _is_word(o):
     """
     Returns True if `o` is a Logo word.
@@ -2892,6 +3600,16 @@ def _is_expr_or_special_form(o):
     return False
 
 
+def _input_repr(thing):
+    """
+    Return `thing` for an error message.  Arrays and streams are shown as
+    PRINT shows them.
+    """
+    if _datatypename(thing) in ("array", "stream"):
+        return _list_contents_repr(thing, escape_delimiters=False)
+    return thing
+
+
 def _list_contents_repr(o, include_braces=True, escape_delimiters=True):
     dtype = _datatypename(o)
     if dtype == "list":
@@ -2901,6 +3619,32 @@ def _list_contents_repr(o, include_braces=True, escape_delimiters=True):
         if include_braces:
             rep = "[{}]".format(rep)
         return rep
+    elif dtype == "array":
+        rep = " ".join(
+            [_list_contents_repr(x, escape_delimiters=escape_delimiters) for x in o]
+        )
+        rep = "{{{}}}".format(rep)
+        if o.origin != 1:
+            rep = "{}@{}".format(rep, o.origin)
+        return rep
+    elif dtype == "stream":
+        # Only show the members that have been computed.
+        reps = []
+        node = o
+        while _is_stream(node):
+            reps.append(
+                _list_contents_repr(node.first, escape_delimiters=escape_delimiters)
+            )
+            if not node.is_forced():
+                reps.append("...")
+                break
+            node = node.rest()
+        else:
+            reps.extend(
+                _list_contents_repr(x, escape_delimiters=escape_delimiters)
+                for x in node
+            )
+        return "[{}]".format(" ".join(reps))
     elif dtype == "word":
         if escape_delimiters:
             return _escape_word_chars(str(o))
@@ -2913,6 +3657,16 @@ def _list_contents_repr(o, include_braces=True, escape_delimiters=True):
         raise errors.LogoError("Unknown data type for `{}`.".format(o))
 
 
+def _save_value_repr(value):
+    """
+    Return the Logo source SAVE writes for `value`.
+    Words other than numbers are quoted.
+    """
+    if isinstance(value, str):
+        return '"{}'.format(_escape_word_chars(value))
+    return _list_contents_repr([value], include_braces=False)
+
+
 def _escape_word_chars(word):
     chars = []
     for c in word:
@@ -2922,6 +3676,28 @@ def _escape_word_chars(word):
     return "".join(chars)
 
 
+def logical_input(cmd, logo, tf):
+    """
+    Return the truth value of an input to AND or OR.  If the input is an
+    instruction list, it is run and its output is used instead.
+    """
+    if isinstance(tf, list):
+        tf = logo.run_instructionlist(tf)
+    return truth_value(cmd, tf)
+
+
+def truth_value(cmd, tf):
+    """
+    Return True or False for the word TRUE or FALSE in any case.
+    """
+    try:
+        return TRUTH_VALUES[tf.lower()]
+    except (AttributeError, KeyError):
+        raise errors.LogoError(
+            "{} expects true/false values but received `{}` instead.".format(cmd, tf)
+        )
+
+
 def _is_true(tf):
     return tf.lower() == "true"
 
@@ -0,0 +1,157 @@
+"""
+Profiler for Logo primitives and user defined procedures.
+
+`LogoInterpreter.execute_procedure()` calls `enter()` and `exit()` around
+every call while `logo.profiler` is set.  When it isn't set, the cost is a
+single attribute check per call.
+
+Stats are kept in the same layout as `cProfile`, so they can be saved with
+`dump_stats()` and loaded with `pstats.Stats`, or viewed with tools such as
+snakeviz or gprof2dot.
+"""
+
+import collections
+import marshal
+import sys
+import time
+
+
+class Profiler:
+    """
+    Collects call counts, self time and cumulative time.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        # Maps a key to `[primitive_calls, calls, self_time, cumulative_time,
+        # callers]`.  `callers` maps a caller's key to the same four stats for
+        # calls from that caller.  Primitive calls are calls that aren't
+        # recursive, and only they add to the cumulative time.
+        self.stats = {}
+        # Running calls as `[key, start_time, time_in_callees]`.
+        self.stack = []
+        self.active = collections.Counter()
+
+    def enter(self, proc):
+        """
+        Record the start of a call to `proc`.
+        """
+        key = make_key(proc)
+        self.active[key] += 1
+        self.stack.append([key, self.clock(), 0.0])
+
+    def exit(self):
+        """
+        Record the end of the innermost running call.
+        """
+        now = self.clock()
+        key, start, callee_time = self.stack.pop()
+        active = self.active
+        active[key] -= 1
+        elapsed = now - start
+        self_time = elapsed - callee_time
+        is_primitive_call = active[key] == 0
+        stats = self.stats
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = [0, 0, 0.0, 0.0, {}]
+        _add_call(entry, is_primitive_call, self_time, elapsed)
+        if self.stack:
+            caller_frame = self.stack[-1]
+            caller_frame[2] += elapsed
+            callers = entry[4]
+            caller_entry = callers.get(caller_frame[0])
+            if caller_entry is None:
+                caller_entry = callers[caller_frame[0]] = [0, 0, 0.0, 0.0]
+            _add_call(caller_entry, is_primitive_call, self_time, elapsed)
+
+    def tail_call(self, proc):
+        """
+        Record a tail call to `proc`.  The callee replaces the running call.
+        """
+        self.exit()
+        self.enter(proc)
+
+    def print_report(self, file=None, sort="self", limit=None):
+        """
+        Print the stats sorted by `self`, `cumulative` or `calls`.
+        """
+        if file is None:
+            file = sys.stderr
+        sort_index = dict(self=2, cumulative=3, calls=1)[sort]
+        rows = sorted(
+            self.stats.items(), key=lambda item: item[1][sort_index], reverse=True
+        )
+        if limit is not None:
+            rows = rows[:limit]
+        total = sum(entry[2] for entry in self.stats.values())
+        print("", file=file)
+        print("Profile of {:.3f} seconds:".format(total), file=file)
+        print(
+            "{:>12} {:>12} {:>12} {:>12}  {}".format(
+                "calls", "self (s)", "per call", "cumulative", "name"
+            ),
+            file=file,
+        )
+        for key, entry in rows:
+            primitive_calls, calls, self_time, cumulative_time, callers = entry
+            if calls == primitive_calls:
+                call_count = str(calls)
+            else:
+                call_count = "{}/{}".format(calls, primitive_calls)
+            print(
+                "{:>12} {:>12.6f} {:>12.6f} {:>12.6f}  {}".format(
+                    call_count,
+                    self_time,
+                    self_time / calls,
+                    cumulative_time,
+                    format_key(key),
+                ),
+                file=file,
+            )
+
+    def dump_stats(self, filename):
+        """
+        Save the stats in the format `pstats.Stats` loads.
+        """
+        stats = {}
+        for key, entry in self.stats.items():
+            primitive_calls, calls, self_time, cumulative_time, callers = entry
+            # `pstats` expects the call counts of callers the other way
+            # around.
+            caller_stats = {}
+            for caller, (cc, nc, tt, ct) in callers.items():
+                caller_stats[caller] = (nc, cc, tt, ct)
+            stats[key] = (
+                primitive_calls,
+                calls,
+                self_time,
+                cumulative_time,
+                caller_stats,
+            )
+        with open(filename, "wb") as f:
+            marshal.dump(stats, f)
+
+
+def make_key(proc):
+    """
+    Return the key for a procedure in the `pstats` format.
+    """
+    if proc.primitive_func:
+        return ("<primitive>", 0, proc.name)
+    return ("<procedure>", 0, proc.name)
+
+
+def format_key(key):
+    filename, lineno, name = key
+    if filename == "<primitive>":
+        return name.upper()
+    return name
+
+
+def _add_call(entry, is_primitive_call, self_time, elapsed):
+    if is_primitive_call:
+        entry[0] += 1
+        entry[3] += elapsed
+    entry[1] += 1
+    entry[2] += self_time
@@ -0,0 +1,106 @@
+"""
+On-disk cache of tokenized Logo scripts.
+
+Tokenizing a large library script takes much longer than reading it.  The
+tokens for `dir/script.lg` are stored in `dir/__logocache__/script.lg.tokens`,
+much like Python stores bytecode in `__pycache__`.  Tokens are plain lists,
+tuples, strings and numbers, so they are stored with `marshal`.
+
+Each entry records the name of the tokenizer that produced it, and is only
+used by the same tokenizer.  A cache entry is used if the script's
+modification time and size are unchanged.  Otherwise the script is read
+and its hash is compared with the one in the cache entry, so a script
+that was touched but not changed is not tokenized again.
+"""
+
+import hashlib
+import marshal
+import os
+
+CACHE_FOLDER = "__logocache__"
+
+# Incremented whenever the format of the cache entry changes, or whenever a
+# change to a tokenizer changes the tokens it produces, like the magic number
+# of `__pycache__` files.
+FORMAT_VERSION = 2
+
+
+def cache_path(pth):
+    """
+    Return the path of the cache entry for the script at `pth`.
+    """
+    folder, name = os.path.split(os.path.abspath(pth))
+    return os.path.join(folder, CACHE_FOLDER, name + ".tokens")
+
+
+def load_tokens(pth, tokenize, tokenizer_name):
+    """
+    Return the tokens for the script at `pth`.
+    Tokens are read from the cache if possible.  Otherwise the script is
+    tokenized with `tokenize` and the cache is updated.  `tokenizer_name`
+    identifies `tokenize`, so entries written by another tokenizer are not
+    used.
+    """
+    st = os.stat(pth)
+    entry_pth = cache_path(pth)
+    entry = _read_entry(entry_pth)
+    if entry is not None and entry.get("tokenizer") != tokenizer_name:
+        entry = None
+    if (
+        entry is not None
+        and entry["mtime"] == st.st_mtime_ns
+        and entry["size"] == st.st_size
+    ):
+        return entry["tokens"]
+    with open(pth, "r") as f:
+        script = f.read()
+    digest = hashlib.sha256(script.encode()).hexdigest()
+    if entry is not None and entry["hash"] == digest:
+        tokens = entry["tokens"]
+    else:
+        tokens = tokenize(script)
+    _write_entry(
+        entry_pth,
+        dict(
+            version=FORMAT_VERSION,
+            tokenizer=tokenizer_name,
+            mtime=st.st_mtime_ns,
+            size=st.st_size,
+            hash=digest,
+            tokens=tokens,
+        ),
+    )
+    return tokens
+
+
+def _read_entry(entry_pth):
+    """
+    Return the cache entry at `entry_pth`, or None if it is missing, stale or
+    unreadable.
+    """
+    try:
+        with open(entry_pth, "rb") as f:
+            entry = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != FORMAT_VERSION:
+        return None
+    return entry
+
+
+def _write_entry(entry_pth, entry):
+    """
+    Write a cache entry.  Like `__pycache__`, failures are ignored, e.g. if
+    the script folder is read only.
+    """
+    tmp_pth = "{}.{}.tmp".format(entry_pth, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(entry_pth), exist_ok=True)
+        with open(tmp_pth, "wb") as f:
+            marshal.dump(entry, f)
+        os.replace(tmp_pth, entry_pth)
+    except OSError:
+        try:
+            os.remove(tmp_pth)
+        except OSError:
+            pass
@@ -0,0 +1,358 @@
+"""
+Single pass tokenizer for Logo scripts.
+
+This is a hand-written equivalent of the parsley grammar created by
+`make_token_grammar()` followed by `transform_tokens()`.  It produces the same
+token shapes:
+
+* Bracketed lists become Python lists.
+* Parenthesized forms become tuples.
+* Comments are removed.
+
+It differs from the grammar in one way.  Infix `+`, `*`, and `/` are left in
+infix order.  The grammar folds them when both sides are numbers and
+otherwise rewrites them into prefix SUM, PRODUCT, and QUOTIENT calls, which
+groups mixed operators wrongly, e.g. `:x * 2 - 1 + :x / 4` becomes
+`product :x 2 - sum 1 quotient :x 4`.  The compiler gives infix operators
+their precedence and folds constants instead.
+"""
+
+from logopy import errors
+
+PUNCTUATION = frozenset("+-*/!'#$%&\\,.:<=>?@^_`;\"")
+
+_COMMENT = object()
+
+
+class _Infix:
+    """
+    The tokens of an infix expression, in order.
+    """
+
+    __slots__ = ("tokens",)
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+
+def tokenize(script):
+    """
+    Tokenize a Logo script.
+    Return a list of tokens.
+    """
+    n = len(script)
+    if _skip_ws(script, 0, n) == n:
+        return []
+    result = _itemlist(script, 0, n)
+    pos = 0 if result is None else result[1]
+    if pos != n:
+        line = script.count("\n", 0, pos) + 1
+        column = pos - (script.rfind("\n", 0, pos) + 1) + 1
+        raise errors.LogoError(
+            "Could not parse the script at line {}, column {}.".format(line, column)
+        )
+    return result[0]
+
+
+def transform_qmark(command):
+    """
+    If command is a `?` followed by a number, transform it to the
+    special form `(?, NUMBER)`.  Otherwise, return command unaltered.
+    """
+    if not hasattr(command, "startswith"):
+        return command
+    if not command.startswith("?"):
+        return command
+    try:
+        pos = int(command[1:])
+    except ValueError:
+        return command
+    return ("?", pos)
+
+
+def is_special_form(token):
+    if not isinstance(token, tuple):
+        return False
+    first = token[0]
+    if is_command(first):
+        return True
+    return False
+
+
+def is_paren_expr(token):
+    if not isinstance(token, tuple):
+        return False
+    first = token[0]
+    if is_command(first):
+        return False
+    return True
+
+
+def is_command(token):
+    if not isinstance(token, str):
+        return False
+    if token.startswith(":"):
+        return False
+    if token.startswith('"'):
+        return False
+    return True
+
+
+def is_list(token):
+    return isinstance(token, list)
+
+
+def _append(items, value):
+    """
+    Append a parsed item to `items`, dropping comments and splicing in the
+    tokens of infix expressions.
+    """
+    if value is _COMMENT:
+        return
+    if isinstance(value, _Infix):
+        items.extend(value.tokens)
+    else:
+        items.append(value)
+
+
+def _infix(tokens):
+    """
+    Return the single value in `tokens`, or an `_Infix` if it holds an
+    expression.
+    """
+    if len(tokens) == 1:
+        return tokens[0]
+    return _Infix(tokens)
+
+
+def _skip_ws(s, i, n):
+    while i < n and s[i].isspace():
+        i += 1
+    return i
+
+
+def _skip_comments(s, i, n):
+    """
+    Skip any comments (and the whitespace before them) following an item.
+    Whitespace that is not followed by a comment is left in place.
+    """
+    while True:
+        j = _skip_ws(s, i, n)
+        if j < n and s[j] == ";":
+            k = s.find("\n", j)
+            i = n if k == -1 else k
+        else:
+            return i
+
+
+def _infix_rel_operator(s, i, n):
+    if i >= n:
+        return None
+    c = s[i]
+    if c == "=":
+        return "=", i + 1
+    if i + 1 < n:
+        pair = s[i : i + 2]
+        if pair == "<>" or pair == ">=" or pair == "<=":
+            return pair, i + 2
+    return None
+
+
+def _number(s, i, n):
+    j = i
+    if j < n and s[j] == "-":
+        j += 1
+    k = j
+    while k < n and s[k].isdigit():
+        k += 1
+    if k < n and s[k] == ".":
+        m = k + 1
+        while m < n and s[m].isdigit():
+            m += 1
+        if m > k + 1:
+            return float(s[i:m]), m
+    if k > j:
+        return int(s[i:k]), k
+    return None
+
+
+def _word(s, i, n):
+    j = i
+    escaped = False
+    while j < n:
+        c = s[j]
+        if c == "\\" and j + 1 < n:
+            escaped = True
+            j += 2
+        elif c.isalnum() or (c in PUNCTUATION and c != ";"):
+            j += 1
+        else:
+            break
+    if j == i:
+        return None
+    if not escaped:
+        return s[i:j], j
+    chars = []
+    k = i
+    while k < j:
+        c = s[k]
+        if c == "\\" and k + 1 < n:
+            chars.append(s[k + 1])
+            k += 2
+        else:
+            chars.append(c)
+            k += 1
+    return "".join(chars), j
+
+
+def _parens(s, i, n):
+    if i >= n or s[i] != "(":
+        return None
+    result = _expr(s, _skip_ws(s, i + 1, n), n)
+    if result is None:
+        return None
+    j = _skip_ws(s, result[1], n)
+    if j < n and s[j] == ")":
+        value = result[0]
+        if isinstance(value, _Infix):
+            value = tuple(value.tokens)
+        return value, j + 1
+    return None
+
+
+def _factor(s, i, n):
+    result = _number(s, i, n)
+    if result is None:
+        result = _parens(s, i, n)
+    if result is None:
+        result = _word(s, i, n)
+    return result
+
+
+def _expr2(s, i, n):
+    result = _factor(s, i, n)
+    if result is None:
+        return None
+    tokens = [result[0]]
+    i = result[1]
+    while True:
+        j = _skip_ws(s, i, n)
+        if j < n and (s[j] == "*" or s[j] == "/"):
+            result = _factor(s, _skip_ws(s, j + 1, n), n)
+            if result is not None:
+                tokens.append(s[j])
+                tokens.append(result[0])
+                i = result[1]
+                continue
+        return tokens, i
+
+
+def _expr(s, i, n):
+    result = _expr2(s, i, n)
+    if result is None:
+        return None
+    tokens, i = result
+    while True:
+        j = _skip_ws(s, i, n)
+        if j < n and s[j] == "+":
+            result = _expr2(s, _skip_ws(s, j + 1, n), n)
+            if result is not None:
+                tokens.append("+")
+                tokens.extend(result[0])
+                i = result[1]
+                continue
+        return _infix(tokens), i
+
+
+def _bracketed_list(s, i, n):
+    """
+    Parse a `[ ... ]` list starting at `s[i]`.
+    """
+    j = _skip_ws(s, i + 1, n)
+    result = _quoted_itemlist(s, j, n)
+    if result is not None:
+        k = _skip_ws(s, result[1], n)
+        if k < n and s[k] == "]":
+            return result[0], k + 1
+    if j < n and s[j] == "]":
+        return [], j + 1
+    return None
+
+
+def _item(s, i, n):
+    result = _infix_rel_operator(s, i, n)
+    if result is not None:
+        return result
+    result = _expr(s, i, n)
+    if result is not None:
+        return result[0], _skip_comments(s, result[1], n)
+    if i >= n:
+        return None
+    c = s[i]
+    if c == "[":
+        return _bracketed_list(s, i, n)
+    if c == "(":
+        result = _itemlist(s, i + 1, n)
+        if result is not None:
+            j = result[1]
+            if j < n and s[j] == ")":
+                return tuple(result[0]), j + 1
+        return None
+    j = _skip_ws(s, i, n)
+    if j < n and s[j] == ";":
+        k = s.find("\n", j)
+        return _COMMENT, n if k == -1 else k
+    return None
+
+
+def _itemlist(s, i, n):
+    i = _skip_ws(s, i, n)
+    result = _item(s, i, n)
+    if result is None:
+        return None
+    items = []
+    _append(items, result[0])
+    i = result[1]
+    while True:
+        result = _item(s, _skip_ws(s, i, n), n)
+        if result is None:
+            break
+        _append(items, result[0])
+        i = result[1]
+    return items, _skip_ws(s, i, n)
+
+
+def _quoted_item(s, i, n):
+    result = _infix_rel_operator(s, i, n)
+    if result is not None:
+        return result
+    result = _number(s, i, n)
+    if result is None:
+        result = _word(s, i, n)
+    if result is None:
+        j = i
+        while j < n and s[j] not in " []":
+            j += 1
+        if j > i:
+            result = s[i:j], j
+    if result is not None:
+        return result[0], _skip_comments(s, result[1], n)
+    if i < n and s[i] == "[":
+        return _bracketed_list(s, i, n)
+    return None
+
+
+def _quoted_itemlist(s, i, n):
+    i = _skip_ws(s, i, n)
+    result = _quoted_item(s, i, n)
+    if result is None:
+        return None
+    items = [result[0]]
+    i = result[1]
+    while True:
+        result = _quoted_item(s, _skip_ws(s, i, n), n)
+        if result is None:
+            break
+        items.append(result[0])
+        i = result[1]
+    return items, _skip_ws(s, i, n)
@@ -9,7 +9,7 @@ from setuptools import find_packages, setup
 
 setup_args = dict(
     name="logopy",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     version="0.0.4",
     description=(
         """LogoPy: An implementation of the Logo programming """
@@ -0,0 +1,66 @@
+"""
+Shared fixtures for the tests.
+"""
+
+import importlib.util
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The backends that run user defined procedures.
+BACKENDS = ("tree", "closure", "stack")
+
+
+def _load_cli():
+    spec = importlib.util.spec_from_file_location(
+        "logopycli", os.path.join(ROOT, "bin", "logopycli.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def cli():
+    """
+    Return the `bin/logopycli.py` module.
+    """
+    return _load_cli()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def make_logo(cli):
+    """
+    Return a function that creates an interpreter with the given backend.
+    """
+
+    def make_logo(backend="tree"):
+        logo = cli.LogoInterpreter.create_interpreter()
+        logo.backend = backend
+        return logo
+
+    return make_logo
+
+
+@pytest.fixture
+def run(cli, make_logo, capsys):
+    """
+    Return a function that runs a Logo script, in a new interpreter with
+    the given backend unless `logo` is given, and returns what it printed.
+    """
+
+    def run(script, backend="tree", logo=None):
+        if logo is None:
+            logo = make_logo(backend)
+        tokens = cli.parse_tokens(logo.tokenize, script)
+        assert logo.process_commands(tokens) is None
+        return capsys.readouterr().out
+
+    return run
@@ -0,0 +1,130 @@
+"""
+Tests for infix arithmetic, comparisons and constant folding.
+"""
+
+import pytest
+
+from logopy import compiler, errors
+
+PROGRAMS = [
+    (
+        "precedence in procedure",
+        """
+to f :x
+output :x * 2 - 1 + :x / 4 * 3
+end
+show f 7
+""",
+        "18.25\n",
+    ),
+    (
+        "precedence at top level",
+        'make "x 7 show :x * 2 - 1 + :x / 4 * 3',
+        "18.25\n",
+    ),
+    ("unary minus", 'make "x 7 show -:x + 2 show 3 - -2', "-5\n5\n"),
+    (
+        "constants",
+        """
+show 2 + 3 * 4
+show (2 + 3) * 4
+show 10 - 4 - 3
+show 12 / 2 / 3
+show 2 * 3 + 4 * 5 - 6 / 2
+""",
+        "14\n20\n3\n2.0\n23.0\n",
+    ),
+    (
+        "folded constants with a variable",
+        """
+to g :n
+output 1 + 2 * 3 + :n
+end
+show g 1
+""",
+        "8\n",
+    ),
+    (
+        "comparisons",
+        """
+make "x 2
+show 1 + 2 < 2 * 2
+show 1 < :x * 2
+show 5 = :x + 3
+show :x + 3 = 5
+show (:x * 3) < 7
+show "a = "a
+show [1 2] <> [1]
+""",
+        "true\ntrue\ntrue\ntrue\ntrue\ntrue\ntrue\n",
+    ),
+    (
+        "comparisons in procedure",
+        """
+to f :x
+output :x * 3 >= :x + 4
+end
+show f 2
+show f 1
+if 1 + 1 = 2 [print "yes]
+""",
+        "true\nfalse\nyes\n",
+    ),
+    ("prefix input", "show sum 1 2 * 3", "7\n"),
+    ("list is not evaluated", "show [1 + 2]", "[1 + 2]\n"),
+]
+
+
+@pytest.mark.parametrize(
+    "script, expected",
+    [program[1:] for program in PROGRAMS],
+    ids=[program[0] for program in PROGRAMS],
+)
+def test_program(run, backend, script, expected):
+    assert run(script, backend) == expected
+
+
+ERRORS = [
+    ('show "a + 1', "+"),
+    ('show 1 + "a', "+"),
+    ('show 2 * "a', "*"),
+    ('show 1 + "a * 2', "+"),
+    ('show "a < 1', "<"),
+    ('show ("a + 1)', "+"),
+    ('to f :w output 1 - 2 * :w end show f "a', "*"),
+    ('to f :w output :w + 1 end show f "a', "+"),
+    ('to f :w output 1 + :w * 2 end show f "a', "+"),
+    ('to f :w output (:w + 1) * 2 end show f "a', "+"),
+]
+
+
+@pytest.mark.parametrize("script, op", ERRORS)
+def test_operands_must_be_numbers(run, backend, script, op):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script, backend)
+    assert str(excinfo.value) == (
+        "Infix `{}` expects a number but received `a` instead.".format(op)
+    )
+
+
+def _compile(cli, logo, script):
+    tokens = cli.parse_tokens(logo.tokenize, script)
+    return compiler.compile_tokens(logo, tokens, expressions=True).nodes[0]
+
+
+def test_constants_are_folded(cli, make_logo):
+    logo = make_logo()
+    node = _compile(cli, logo, "2 * 3 + 4 / 8")
+    assert isinstance(node, compiler.LiteralNode)
+    assert node.value == 6.5
+    node = _compile(cli, logo, ":x + 2 * 3")
+    assert isinstance(node, compiler.ArithmeticNode)
+    assert isinstance(node.right, compiler.LiteralNode)
+    assert node.right.value == 6
+    assert node.check_left == "+"
+    assert not node.check_right
+
+
+def test_division_by_zero_is_not_folded(cli, make_logo):
+    node = _compile(cli, make_logo(), "1 / 0")
+    assert isinstance(node, compiler.ArithmeticNode)
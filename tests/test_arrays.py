@@ -0,0 +1,87 @@
+"""
+Tests for arrays.
+"""
+
+import array
+
+import pytest
+
+from logopy import datatypes, errors
+
+
+def test_array_primitives(run, backend):
+    script = """
+make "a (array 3 0)
+show :a
+setitem 0 :a 5
+setitem 2 :a "x
+show :a
+show item 0 :a
+show first :a
+show count :a
+show arrayp :a
+show arraytolist listtoarray [1 2 3]
+show (listtoarray [a b] 5)
+make "m mdarray [2 2]
+mdsetitem [1 2] :m 7
+show :m
+show mditem [1 2] :m
+"""
+    assert run(script, backend) == (
+        "{[] [] []}@0\n{5 [] x}@0\n5\n0\n3\ntrue\n[1 2 3]\n{a b}@5\n"
+        "{{[] 7} {[] []}}\n7\n"
+    )
+
+
+def test_typed_storage():
+    ints = datatypes.LogoArray([1, 2, 3])
+    assert isinstance(ints._items, array.array)
+    assert ints._items.typecode == "q"
+    ints.set(2, 20)
+    assert isinstance(ints._items, array.array)
+    ints.set(3, 1.5)
+    assert not isinstance(ints._items, array.array)
+    assert ints.to_list() == [1, 20, 1.5]
+    floats = datatypes.LogoArray([1.0, 2.5])
+    assert floats._items.typecode == "d"
+    huge = datatypes.LogoArray([1, 2**70])
+    assert huge.to_list() == [1, 2**70]
+    mixed = datatypes.LogoArray([1, True])
+    assert not isinstance(mixed._items, array.array)
+
+
+def test_typed_storage_overflow():
+    ints = datatypes.LogoArray([1, 2])
+    ints.set(1, 2**70)
+    assert ints.to_list() == [2**70, 2]
+
+
+def test_index_out_of_range():
+    arr = datatypes.LogoArray([1, 2], origin=0)
+    assert arr.get(1) == 2
+    with pytest.raises(IndexError):
+        arr.get(2)
+    with pytest.raises(IndexError):
+        arr.set(-1, 0)
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        ("show last listtoarray [3 4]", "LAST doesn't like `{3 4}` as input."),
+        ("show butlast listtoarray [3 4]", "BUTLAST doesn't like `{3 4}` as input."),
+        (
+            "show butfirst (listtoarray [3 4] 0)",
+            "BUTFIRST doesn't like `{3 4}@0` as input.",
+        ),
+        ("show item 3 listtoarray [3 4]", "ITEM index 3 out of range."),
+        (
+            'make "a array 1 setitem 1 :a :a',
+            "SETITEM can't put an array inside itself.",
+        ),
+    ],
+)
+def test_array_errors(run, script, message):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script)
+    assert str(excinfo.value) == message
@@ -0,0 +1,231 @@
+"""
+Differential tests for the backends that run user defined procedures.
+
+Every program must print the same thing on the tree, closure and stack
+backends.
+"""
+
+import pytest
+
+PROGRAMS = [
+    (
+        "inputs",
+        """
+to opt :a [:b 2] [:rest]
+show (list :a :b :rest)
+end
+opt 1
+(opt 1 3 4 5)
+""",
+        "[1 2 []]\n[1 3 [4 5]]\n",
+    ),
+    (
+        "nested calls",
+        """
+to square :x
+output :x * :x
+end
+to hyp :a :b
+output sqrt sum square :a square :b
+end
+print hyp 3 4
+print (hyp 5 12) + 1
+""",
+        "5.0\n14.0\n",
+    ),
+    (
+        "literal list output",
+        """
+to pair
+output [1 2]
+end
+make "x pair
+push "x 0
+show :x
+show pair
+""",
+        "[0 1 2]\n[1 2]\n",
+    ),
+    (
+        "procedure text template",
+        """
+to doubled :lst
+output map [[x] [make "y :x + 1] [output :y * 2]] :lst
+end
+show doubled [1 2]
+show doubled [1 2]
+""",
+        "[4 6]\n[4 6]\n",
+    ),
+    (
+        "words and lists",
+        """
+to initials :names
+if emptyp :names [output "]
+output word first first :names initials butfirst :names
+end
+print initials [ada grace alan]
+show sentence [a b] "c
+""",
+        "aga\n[a b c]\n",
+    ),
+    (
+        "variable arity call",
+        """
+to total
+output (sum 1 2 3 4)
+end
+print total
+(print "a "b [c d])
+""",
+        "10\na b c d\n",
+    ),
+    (
+        "primitive arities",
+        """
+to calls :x
+repeat 2 [print repcount]
+print int :x / 4
+print item 2 (list :x 7)
+print (sum :x 1 2)
+print :x + 1
+print :x * 2 + 1
+end
+calls -10
+""",
+        "1\n2\n-2\n7\n-7\n-9\n-19\n",
+    ),
+    (
+        "deep tail calls",
+        """
+to total :n :acc
+if :n = 0 [output :acc]
+output total :n - 1 :acc + :n
+end
+print total 20000 0
+to down :n
+if :n = 0 [print "bottom stop]
+down :n - 1
+end
+down 20000
+to evenp :n
+if :n = 0 [output "true]
+output oddp :n - 1
+end
+to oddp :n
+if :n = 0 [output "false]
+output evenp :n - 1
+end
+print evenp 20001
+""",
+        "200010000\nbottom\nfalse\n",
+    ),
+    (
+        "tail call sees caller's variables",
+        """
+to outer :x
+inner
+end
+to inner
+print :x
+end
+outer "seen
+""",
+        "seen\n",
+    ),
+    (
+        "if and ifelse lists",
+        """
+to f :n
+ifelse :n = 0 [output 0] [output 1 + f :n - 1]
+end
+print f 40
+to g :n
+if :n = 0 [output 0]
+output 1 + g :n - 1
+end
+print g 40
+to h :n
+output ifelse :n = 0 [0] [1 + h :n - 1]
+end
+print h 40
+to k :n
+if :n > 0 [if :n > 1 [make "z :n] output 1 + k :n - 1]
+output 0
+end
+print k 40
+to w :n
+(if :n > 2 [print "big] [print "small])
+print (if :n > 2 [1] [2])
+if :n = 1 [stop]
+print "after
+end
+w 3
+w 1
+to m :n
+ifelse :n = 0 [print "zero] [print :n m :n - 1]
+end
+m 2
+""",
+        "40\n40\n40\n40\nbig\n1\nafter\nsmall\n2\n2\n1\nzero\n",
+    ),
+    (
+        "procedure redefined while running an if list",
+        """
+to q
+print "old
+output 1
+end
+to p
+if "true [ignore q ext.memoize "q ignore q print "x]
+print q
+end
+p
+to r :n
+output (ifelse :n > 0 [ext.unmemoize "q q] [0]) + 1
+end
+print r 1
+""",
+        "old\nold\nx\n1\nold\n2\n",
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "script, expected",
+    [program[1:] for program in PROGRAMS],
+    ids=[program[0] for program in PROGRAMS],
+)
+def test_program(run, backend, script, expected):
+    assert run(script, backend) == expected
+
+
+def test_switching_backend_recompiles(run, make_logo):
+    logo = make_logo("tree")
+    run("to twice :x\noutput :x * 2\nend\nprint twice 2", logo=logo)
+    proc = logo.procedures["twice"]
+    assert not proc.compiled_body.closures
+    logo.backend = "closure"
+    assert run("print twice 3", logo=logo) == "6\n"
+    assert proc.compiled_body.closures
+
+
+def test_closures_are_not_used_when_tracing(make_logo):
+    logo = make_logo("closure")
+    assert logo.use_closures()
+    logo.debug_procs = True
+    assert not logo.use_closures()
+
+
+@pytest.mark.parametrize(
+    "definition",
+    [
+        "to f :n\nifelse :n = 0 [output 0] [output 1 + f :n - 1]\nend",
+        "to f :n\nif :n = 0 [output 0]\noutput 1 + f :n - 1\nend",
+        "to f :n\noutput ifelse :n = 0 [0] [1 + f :n - 1]\nend",
+        'to f :n\nif :n > 0 [if :n > 1 [make "z :n] output 1 + f :n - 1]\n'
+        "output 0\nend",
+    ],
+)
+def test_stack_backend_deep_recursion(run, definition):
+    assert run(definition + "\nprint f 5000", "stack") == "5000\n"
@@ -0,0 +1,55 @@
+"""
+Tests for the benchmark runner.
+"""
+
+import pytest
+
+from benchmarks import runner, workloads
+
+SMALL = [
+    workloads.Workload("tiny.run", "tiny", "repeat 10 [ignore sum 1 2]"),
+    workloads.Workload("tiny.parse", "tiny", "print 1 + 2", kind="tokenize"),
+    workloads.Workload(
+        "tiny.turtle", "tiny", "repeat 4 [forward 10 right 90]", turtle=True
+    ),
+]
+
+
+def test_workload_names_are_unique():
+    names = [w.name for w in workloads.WORKLOADS]
+    assert len(names) == len(set(names))
+
+
+def test_select_workloads():
+    selected = runner.select_workloads(["recursion."])
+    assert selected
+    assert all(w.name.startswith("recursion.") for w in selected)
+    assert runner.select_workloads(None) == list(workloads.WORKLOADS)
+
+
+@pytest.mark.parametrize("backend", ["tree", "closure", "stack"])
+def test_run_benchmarks(cli, backend):
+    results = runner.run_benchmarks(
+        cli.LogoInterpreter, SMALL, backend=backend, repeat=1
+    )
+    assert results["backend"] == backend
+    run, parse, turtle = results["results"]
+    assert run["name"] == "tiny.run"
+    # REPEAT, IGNORE and SUM ten times each.
+    assert run["commands"] == 21
+    assert parse["tokens"] == 4
+    assert turtle["commands"] == 9
+    for result in results["results"]:
+        assert result["wall_time"] > 0
+        assert runner.format_result(result).startswith(result["name"])
+
+
+def test_compare_results(capsys):
+    baseline = dict(results=[dict(name="a", wall_time=1.0)])
+    faster = dict(results=[dict(name="a", wall_time=0.9), dict(name="b")])
+    slower = dict(results=[dict(name="a", wall_time=1.2)])
+    assert runner.compare_results(baseline, faster, 0.1)
+    assert not runner.compare_results(baseline, slower, 0.1)
+    output = capsys.readouterr().out
+    assert "b                            new" in output
+    assert "REGRESSION" in output
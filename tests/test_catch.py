@@ -0,0 +1,81 @@
+"""
+Tests for CATCH, THROW and ERROR.
+"""
+
+import pytest
+
+from logopy import errors
+
+
+def test_throw_to_catch(run, backend):
+    script = """
+to search :n
+if :n = 0 [(throw "found "bottom)]
+search :n - 1
+print "never
+end
+to inner
+output catch "a [(throw "b 2)]
+end
+show catch "found [search 100]
+show catch "FOUND [search 3]
+catch "found [search 5]
+print "after
+show catch "x [3]
+show catch "outer [show catch "inner [(throw "outer 1)] print "no]
+show catch "b [inner]
+make "n 0
+repeat 3 [catch "skip [make "n :n + 1 if :n = 2 [throw "skip] print :n]]
+"""
+    assert run(script, backend) == "bottom\nbottom\nafter\n3\n1\n2\n1\n3\n"
+
+
+def test_throw_from_deep_recursion(run, backend):
+    script = """
+to deep :n
+if :n = 0 [(throw "bottom :n)]
+output deep :n - 1
+end
+show catch "bottom [deep 2000]
+"""
+    assert run(script, backend) == "0\n"
+
+
+def test_catch_error(run, backend):
+    script = """
+catch "error [1 / 0]
+show error
+show error
+catch "error [(throw "error [my message])]
+show error
+catch "error [foo]
+show error
+"""
+    assert run(script, backend) == (
+        "[0 division by zero [] []]\n[]\n[35 my message [] []]\n"
+        "[0 I don't know how to `foo`. [] []]\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        ('throw "nope', "Can't find catch tag for `nope`."),
+        ('catch "a [throw "b]', "Can't find catch tag for `b`."),
+    ],
+)
+def test_throw_without_catch(run, backend, script, message):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script, backend)
+    assert str(excinfo.value) == message
+
+
+def test_output_from_catch(run, backend):
+    script = """
+to f
+catch "a [output 1]
+output 2
+end
+show f
+"""
+    assert run(script, backend) == "1\n"
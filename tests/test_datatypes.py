@@ -0,0 +1,119 @@
+"""
+Tests for `logopy.datatypes`.
+"""
+
+import pytest
+
+from logopy import datatypes
+
+
+def test_deque_list_reads_like_a_list():
+    lst = datatypes.DequeList([1, 2, 3])
+    assert lst == [1, 2, 3]
+    assert [1, 2, 3] == lst
+    assert len(lst) == 3
+    assert lst[0] == 1 and lst[-1] == 3
+    assert lst[1:] == [2, 3]
+    assert list(reversed(lst)) == [3, 2, 1]
+    assert 2 in lst and 4 not in lst
+    assert lst + [4] == [1, 2, 3, 4]
+    assert [0] + lst == [0, 1, 2, 3]
+
+
+def test_deque_list_is_immutable():
+    lst = datatypes.DequeList([1, 2])
+    with pytest.raises(TypeError):
+        lst.append(3)
+    with pytest.raises(TypeError):
+        lst[0] = 5
+    assert lst == [1, 2]
+
+
+def test_deque_list_changes_make_new_lists():
+    a = datatypes.DequeList([1, 2])
+    b = a.push_left(0)
+    item, c = b.pop_right()
+    assert item == 2
+    item, d = c.pop_left()
+    assert item == 0
+    assert d == [1]
+    assert c == [0, 1]
+    assert b == [0, 1, 2]
+    assert a == [1, 2]
+    # Reading an old list again doesn't change the newer ones.
+    assert d == [1]
+    e = a.push_left(9)
+    assert e == [9, 1, 2]
+    assert b == [0, 1, 2]
+
+
+def test_deque_list_pop_empty():
+    with pytest.raises(IndexError):
+        datatypes.DequeList().pop_left()
+    with pytest.raises(IndexError):
+        datatypes.DequeList().pop_right()
+
+
+def test_persistent_keeps_deque_list():
+    lst = datatypes.DequeList([1])
+    assert datatypes.persistent(lst) is lst
+
+
+def test_list_view():
+    base = [1, 2, 3, 4]
+    view = datatypes.ListView(base)
+    assert view == base
+    tail = view[1:]
+    assert isinstance(tail, datatypes.ListView)
+    assert tail == [2, 3, 4]
+    assert tail[::-1] == [4, 3, 2]
+    assert tail[-1] == 4
+    with pytest.raises(TypeError):
+        tail.append(5)
+
+
+def test_cons_list():
+    lst = datatypes.ConsList(0, datatypes.ConsList(1, [2, 3]))
+    assert lst == [0, 1, 2, 3]
+    assert len(lst) == 4
+    assert lst[1] == 1 and lst[3] == 3 and lst[-1] == 3
+    assert isinstance(lst[1:], datatypes.ConsList)
+    assert lst[2:] == [2, 3]
+    assert lst[1:3] == [1, 2]
+    assert repr(lst) == "[0, 1, 2, 3]"
+
+
+def test_list_proxy_default_item():
+    class Letters(datatypes.ListProxy):
+        __slots__ = ()
+
+        def __len__(self):
+            return 3
+
+        def __iter__(self):
+            return iter("abc")
+
+    letters = Letters()
+    assert letters[0] == "a"
+    assert letters[2] == "c"
+    assert letters[-1] == "c"
+    with pytest.raises(IndexError):
+        letters[3]
+
+
+def test_range_list():
+    lst = datatypes.RangeList(range(1, 1000001))
+    assert len(lst) == 1000000
+    assert lst[0] == 1 and lst[-1] == 1000000
+    assert isinstance(lst[10:20], datatypes.RangeList)
+    assert lst[10:13] == [11, 12, 13]
+    assert lst.index(500000) == 499999
+    assert 7.0 in lst
+    assert 7.5 not in lst
+    assert float("inf") not in lst
+    assert float("nan") not in lst
+    assert "7" not in lst
+    halves = datatypes.RangeList(range(3), lambda i: i / 2)
+    assert halves == [0.0, 0.5, 1.0]
+    assert halves.index(0.5) == 1
+    assert list(reversed(halves)) == [1.0, 0.5, 0.0]
@@ -0,0 +1,47 @@
+"""
+Tests for resolving command tokens to procedures.
+"""
+
+
+def test_resolve_primitive(make_logo):
+    logo = make_logo()
+    command, proc, is_primitive = logo.resolve_command("PRINT")
+    assert command == "print"
+    assert proc is logo.primitives["print"]
+    assert is_primitive
+
+
+def test_resolve_unknown(make_logo):
+    logo = make_logo()
+    assert logo.resolve_command("nosuchcommand") is None
+    assert logo.resolve_command(":x") is None
+    assert logo.resolve_command(["print", 1]) is None
+
+
+def test_redefinition_clears_cache(run, make_logo):
+    logo = make_logo()
+    run("to f\nprint 1\nend", logo=logo)
+    first = logo.resolve_command("f")[1]
+    assert logo.resolve_command("f")[1] is first
+    run("to f\nprint 2\nend", logo=logo)
+    second = logo.resolve_command("f")[1]
+    assert second is not first
+    assert second is logo.procedures["f"]
+
+
+def test_procedure_defined_after_failed_call(run, backend):
+    script = """
+catch "error [later]
+print item 2 error
+to later
+print "defined
+end
+later
+to later
+print "redefined
+end
+later
+"""
+    assert run(script, backend) == (
+        "I don't know how to `later`.\ndefined\nredefined\n"
+    )
@@ -0,0 +1,53 @@
+"""
+Tests for running instruction lists with REPEAT, RUN and friends.
+"""
+
+
+def test_loop_list_is_tokenized_once(run, make_logo):
+    logo = make_logo()
+    tokenize = logo.tokenize
+    scripts = []
+
+    def counting_tokenize(script):
+        scripts.append(script)
+        return tokenize(script)
+
+    logo.tokenize = counting_tokenize
+    output = run('make "n 0 repeat 50 [make "n :n + 1] print :n', logo=logo)
+    assert output == "50\n"
+    assert scripts.count('make "n :n + 1') == 1
+
+
+def test_numbers_of_different_types_are_different_instructions(run, backend):
+    assert run("run [print 1] run [print 1.0]", backend) == "1\n1.0\n"
+
+
+def test_lists_built_at_run_time(run, backend):
+    script = """
+make "i 0
+repeat 3 [make "i :i + 1 run (list "print :i * 10)]
+"""
+    assert run(script, backend) == "10\n20\n30\n"
+
+
+def test_cache_is_bounded(run, make_logo):
+    logo = make_logo()
+    logo.instructionlist_cache_size = 2
+    output = run('for [i 1 5] [run (list "print :i)]', logo=logo)
+    assert output == "1\n2\n3\n4\n5\n"
+    assert len(logo.instructionlist_cache) <= 2
+    assert len(logo.compiled_instructionlist_cache) <= 2
+
+
+def test_redefined_procedure_in_cached_list(run, backend):
+    script = """
+to greet
+print "hello
+end
+repeat 2 [greet]
+to greet
+print "goodbye
+end
+repeat 2 [greet]
+"""
+    assert run(script, backend) == "hello\nhello\ngoodbye\ngoodbye\n"
@@ -0,0 +1,156 @@
+"""
+Tests for list primitives.
+"""
+
+import pytest
+
+from logopy import errors
+
+
+def test_push_pop_queue_dequeue(run, backend):
+    script = """
+make "s []
+push "s 1 push "s 2 push "s 3
+show :s
+show pop "s
+show :s
+queue "s 0
+show :s
+show dequeue "s
+show dequeue "s
+show :s
+"""
+    assert run(script, backend) == "[3 2 1]\n3\n[2 1]\n[0 2 1]\n1\n2\n[0]\n"
+
+
+def test_push_does_not_change_shared_lists(run, backend):
+    script = """
+make "a []
+push "a 1
+make "b :a
+push "a 2
+show :b
+make "c :a
+show pop "a
+show :a show :b show :c
+queue "a 5
+make "d :a
+show dequeue "a
+show :a show :d show :c show :b
+make "q [1 2 3]
+make "r :q
+push "q 0
+show :r show :q
+"""
+    assert run(script, backend) == (
+        "[1]\n2\n[1]\n[1]\n[2 1]\n1\n[5]\n[5 1]\n[2 1]\n[1]\n[1 2 3]\n[0 1 2 3]\n"
+    )
+
+
+def test_long_stack(run, backend):
+    script = """
+make "s []
+repeat 20000 [push "s repcount]
+make "snapshot :s
+repeat 19999 [ignore pop "s]
+show :s
+show count :snapshot
+show first :snapshot
+"""
+    assert run(script, backend) == "[1]\n20000\n20000\n"
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        ('make "w "abc push "w 1', "Tried to PUSH to `w`, but is not a list."),
+        ('make "e [] ignore pop "e', "Tried to POP from empty stack, `e`."),
+        (
+            'make "e [] ignore dequeue "e',
+            "Tried to DEQUEUE from an empty list, `e`.",
+        ),
+    ],
+)
+def test_stack_errors(run, script, message):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script)
+    assert str(excinfo.value) == message
+
+
+def test_fput_and_butfirst_share_structure(run, backend):
+    script = """
+to build :n :lst
+if :n = 0 [output :lst]
+output build :n - 1 fput :n :lst
+end
+to size :lst :n
+if emptyp :lst [output :n]
+output size butfirst :lst :n + 1
+end
+make "big build 20000 []
+print size :big 0
+show butfirst butfirst [a b c]
+show butlast [a b c]
+show reverse butfirst [a b c]
+show fput 0 [1 2]
+show butfirsts [[a b] [c d]]
+"""
+    assert run(script, backend) == "20000\n[c]\n[a b]\n[c b]\n[0 1 2]\n[[b] [d]]\n"
+
+
+def test_member_primitives(run, backend):
+    script = """
+show memberp [1 [2]] [a [1 [2]] b]
+show memberp 1 [1.0]
+show member "c [a b c d]
+show remdup [one 3 two two 3]
+show remove "b [a b c b]
+show memberp "b "abc
+"""
+    assert run(script, backend) == ("true\ntrue\n[c d]\n[one two 3]\n[a c]\ntrue\n")
+
+
+def test_repeated_member_searches_use_index(run, make_logo):
+    logo = make_logo()
+    script = """
+make "big arraytolist listtoarray iseq 1 100
+show memberp 50 :big
+show memberp 50 :big
+show memberp [50] :big
+show member 99 :big
+"""
+    assert run(script, logo=logo) == "true\ntrue\nfalse\n[99 100]\n"
+    [(lst, index)] = logo.member_index_cache.values()
+    assert len(lst) == 100
+    assert index is not None
+
+
+def test_member_of_range(run, backend):
+    script = """
+make "inf 10.0
+repeat 400 [make "inf :inf * 10]
+show memberp :inf iseq 1 10
+show memberp :inf - :inf iseq 1 10
+show memberp 3.0 iseq 1 10
+show memberp 3.5 iseq 1 10
+show member 9 iseq 1 10
+"""
+    assert run(script, backend) == "false\nfalse\ntrue\nfalse\n[9 10]\n"
+
+
+def test_ranges(run, backend):
+    script = """
+show iseq 1 5
+show rseq 0 1 5
+show iseq 5 1
+show count iseq 1 1000000
+show item 500000 iseq 1 1000000
+show butfirst iseq 1 4
+show reverse iseq 1 4
+show last rseq 0 10 3
+show map [? * 2] iseq 1 3
+"""
+    assert run(script, backend) == (
+        "[1 2 3 4 5]\n[0.0 0.25 0.5 0.75 1.0]\n[5 4 3 2 1]\n1000000\n500000\n"
+        "[2 3 4]\n[4 3 2 1]\n10.0\n[2 4 6]\n"
+    )
@@ -0,0 +1,77 @@
+"""
+Tests for the short-circuit AND and OR primitives.
+"""
+
+import pytest
+
+from logopy import errors
+
+NOISY = """
+to noisy :x
+print :x
+output "true
+end
+"""
+
+
+def test_word_inputs(run, backend):
+    script = """
+show and "true "false
+show (and "true "true "true)
+show or "false "true
+show (or "false "false)
+"""
+    assert run(script, backend) == "false\ntrue\ntrue\nfalse\n"
+
+
+def test_lists_run_only_until_decided(run, backend):
+    script = NOISY + """
+show and "false [noisy 1]
+show and "true [noisy 2]
+show or "true [noisy 3]
+show or "false [noisy 4]
+show (or [noisy 5] [noisy 6])
+show (and "true [noisy 7] ["false] [noisy 8])
+"""
+    assert run(script, backend) == (
+        "false\n2\ntrue\ntrue\n4\ntrue\n5\ntrue\n7\nfalse\n"
+    )
+
+
+def test_guard_in_procedure(run, backend):
+    script = NOISY + """
+to guard :n
+output and :n > 0 [noisy :n]
+end
+show guard 0
+show guard 9
+"""
+    assert run(script, backend) == "false\n9\ntrue\n"
+
+
+def test_list_from_variable(run, backend):
+    script = NOISY + """
+make "l [noisy 10]
+show and "false :l
+show and "true :l
+"""
+    assert run(script, backend) == "false\n10\ntrue\n"
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        (
+            'show and "maybe "true',
+            "AND expects true/false values but received `maybe` instead.",
+        ),
+        (
+            'show or "false [print 1]',
+            "OR expects true/false values but received `None` instead.",
+        ),
+    ],
+)
+def test_inputs_must_be_true_or_false(run, script, message):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script)
+    assert str(excinfo.value) == message
@@ -0,0 +1,72 @@
+"""
+Tests for EXT.MEMOIZE and friends.
+"""
+
+import pytest
+
+from logopy import errors
+
+FIB = """
+to fib :n
+if :n < 2 [output :n]
+output (fib :n - 1) + (fib :n - 2)
+end
+ext.memoize "fib
+"""
+
+
+def test_memoized_results(run, backend):
+    script = FIB + 'print fib 30 show ext.memostats "fib'
+    assert run(script, backend) == (
+        "832040\n[hits 28 misses 31 size 31 maxsize 1024]\n"
+    )
+
+
+def test_unmemoize(run, backend):
+    script = FIB + 'print fib 10 ext.unmemoize "fib print fib 10'
+    assert run(script, backend) == "55\n55\n"
+
+
+def test_maxsize_evicts_least_recently_used(run, backend):
+    script = FIB.replace('ext.memoize "fib', '(ext.memoize "fib 5)')
+    script += 'print fib 20 show ext.memostats "fib'
+    assert run(script, backend) == "6765\n[hits 18 misses 21 size 5 maxsize 5]\n"
+
+
+def test_push_does_not_change_cached_list(run, backend):
+    script = """
+to digits :n
+output fput :n [1 2]
+end
+ext.memoize "digits
+make "x digits 0
+push "x 9
+queue "x 8
+show :x
+show digits 0
+make "y digits 0
+ignore pop "y
+show digits 0
+"""
+    assert run(script, backend) == "[8 9 0 1 2]\n[0 1 2]\n[0 1 2]\n"
+
+
+def test_setitem_does_not_change_cached_array(run, backend):
+    script = """
+to squares :n
+output listtoarray (list :n :n * :n)
+end
+ext.memoize "squares
+setitem 1 squares 3 "x
+show squares 3
+make "a squares 3
+setitem 2 :a "y
+show :a
+show squares 3
+"""
+    assert run(script, backend) == "{3 9}\n{3 y}\n{3 9}\n"
+
+
+def test_memoize_primitive(run):
+    with pytest.raises(errors.LogoError, match="primitive `sum`"):
+        run('ext.memoize "sum')
@@ -0,0 +1,57 @@
+"""
+Tests for EXT.PMAP and EXT.PFILTER.
+"""
+
+import pytest
+
+from logopy import errors
+
+
+@pytest.fixture
+def logo(make_logo):
+    logo = make_logo()
+    logo.parallel_workers = 2
+    return logo
+
+
+def test_pmap_and_pfilter(run, logo):
+    script = """
+to square :x
+output :x * :x
+end
+make "offset 100
+pprop "sizes "big 10
+show ext.pmap "square [1 2 3 4 5]
+show ext.pmap [? + :offset] [1 2]
+show (ext.pmap [?1 * ?2] [1 2 3] [4 5 6])
+show ext.pmap [# * 10] [a b c]
+show ext.pfilter [? > gprop "sizes "big] [5 10 15 20]
+show ext.pmap [?] []
+"""
+    assert run(script, logo=logo) == (
+        "[1 4 9 16 25]\n[101 102]\n[4 10 18]\n[10 20 30]\n[15 20]\n[]\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        (
+            "show ext.pfilter [true] cons-stream 1 []",
+            "EXT.PFILTER doesn't like a stream as input.",
+        ),
+        (
+            "show (ext.pmap [?1] [1 2] [3])",
+            "EXT.PMAP expects data lists of equal size.",
+        ),
+        (
+            "show ext.pfilter [?] [true 1]",
+            "EXT.PFILTER template must return either true or false.",
+        ),
+        ("show ext.pmap [fd 10] [1]", "Turtle graphics can't be used"),
+    ],
+)
+def test_parallel_errors(run, logo, script, message):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script, logo=logo)
+    assert str(excinfo.value).startswith(message)
@@ -0,0 +1,100 @@
+"""
+Tests for `logopy.profiler`.
+"""
+
+import io
+import pstats
+
+import pytest
+
+from logopy import profiler
+
+
+class FakeProc:
+    def __init__(self, name, primitive_func=None):
+        self.name = name
+        self.primitive_func = primitive_func
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_self_and_cumulative_time(clock):
+    prof = profiler.Profiler(clock=clock)
+    outer = FakeProc("outer")
+    inner = FakeProc("sum", primitive_func=sum)
+    prof.enter(outer)
+    clock.now = 1.0
+    prof.enter(inner)
+    clock.now = 3.0
+    prof.exit()
+    clock.now = 4.0
+    prof.exit()
+    outer_key = ("<procedure>", 0, "outer")
+    inner_key = ("<primitive>", 0, "sum")
+    assert prof.stats[outer_key][:4] == [1, 1, 2.0, 4.0]
+    assert prof.stats[inner_key][:4] == [1, 1, 2.0, 2.0]
+    assert prof.stats[inner_key][4] == {outer_key: [1, 1, 2.0, 2.0]}
+
+
+def test_recursive_calls_are_not_primitive_calls(clock):
+    prof = profiler.Profiler(clock=clock)
+    proc = FakeProc("f")
+    prof.enter(proc)
+    clock.now = 1.0
+    prof.enter(proc)
+    clock.now = 2.0
+    prof.exit()
+    clock.now = 3.0
+    prof.exit()
+    primitive_calls, calls, self_time, cumulative_time, callers = prof.stats[
+        ("<procedure>", 0, "f")
+    ]
+    assert (primitive_calls, calls, self_time, cumulative_time) == (1, 2, 3.0, 3.0)
+
+
+def test_tail_call_replaces_running_call(clock):
+    prof = profiler.Profiler(clock=clock)
+    prof.enter(FakeProc("a"))
+    clock.now = 1.0
+    prof.tail_call(FakeProc("b"))
+    clock.now = 3.0
+    prof.exit()
+    assert prof.stack == []
+    assert prof.stats[("<procedure>", 0, "a")][2] == 1.0
+    assert prof.stats[("<procedure>", 0, "b")][2] == 2.0
+
+
+def test_report_and_dump_stats(run, make_logo, backend, tmp_path):
+    logo = make_logo(backend)
+    logo.profiler = profiler.Profiler()
+    script = """
+to fib :n
+if :n < 2 [output :n]
+output sum fib :n - 1 fib :n - 2
+end
+print fib 10
+"""
+    assert run(script, logo=logo) == "55\n"
+    stats = logo.profiler.stats
+    assert stats[("<procedure>", 0, "fib")][:2] == [1, 177]
+    assert stats[("<primitive>", 0, "sum")][:2] == [88, 88]
+    report = io.StringIO()
+    logo.profiler.print_report(file=report, sort="calls")
+    rows = [line.split() for line in report.getvalue().splitlines()[3:]]
+    assert ["177/1", "fib"] in [[row[0], row[-1]] for row in rows]
+    assert ["88", "SUM"] in [[row[0], row[-1]] for row in rows]
+    pth = str(tmp_path / "logo.prof")
+    logo.profiler.dump_stats(pth)
+    loaded = pstats.Stats(pth).stats
+    assert loaded[("<primitive>", 0, "sum")][1] == 88
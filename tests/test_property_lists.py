@@ -0,0 +1,45 @@
+"""
+Tests for property lists.
+"""
+
+import pytest
+
+from logopy import errors
+
+
+def test_property_lists(run, backend):
+    script = """
+pprop "dog "legs 4
+pprop "dog "sound "woof
+show gprop "dog "legs
+show plist "dog
+remprop "dog "legs
+show plist "dog
+show gprop "dog "legs
+pprop 1 "x 2
+show gprop "1 "x
+show plistp "dog
+show plistp "cat
+remprop "dog "sound
+show plistp "dog
+"""
+    assert run(script, backend) == (
+        "4\n[legs 4 sound woof]\n[sound woof]\n[]\n2\ntrue\nfalse\nfalse\n"
+    )
+
+
+def test_property_list_in_procedure(run, backend):
+    script = """
+to tally :word
+pprop "counts :word 1 + gprop "counts :word
+end
+pprop "counts "a 0
+foreach [a a a] [tally ?]
+show gprop "counts "a
+"""
+    assert run(script, backend) == "3\n"
+
+
+def test_property_list_name_must_be_a_word(run):
+    with pytest.raises(errors.LogoError, match="PPROP doesn't like"):
+        run('pprop [a] "b 1')
@@ -0,0 +1,96 @@
+"""
+Tests for STOP and OUTPUT.
+"""
+
+import pytest
+
+from logopy import errors
+
+PROCEDURES = """
+to early :n
+if :n > 2 [output "big]
+output "small
+end
+to find.first :lst
+foreach :lst [if ? > 2 [output ?]]
+output "none
+end
+to count.down :n
+repeat 10 [if :n = 0 [stop] print :n make "n :n - 1]
+print "never
+end
+to in.run
+run [output 5]
+end
+to nested :n
+ifelse :n > 0 [if :n > 1 [output "two] output "one] [output "zero]
+end
+to stops
+stop
+print "never
+end
+to fact :n
+if :n = 0 [output 1]
+output :n * fact :n - 1
+end
+"""
+
+
+def test_stop_and_output(run, backend):
+    script = PROCEDURES + """
+show early 1
+show early 5
+show find.first [1 2 3 4]
+show find.first [1]
+count.down 3
+show in.run
+show nested 2
+show nested 1
+show nested 0
+stops
+show fact 10
+show map [early ?] [1 3]
+"""
+    assert run(script, backend) == (
+        "small\nbig\n3\nnone\n3\n2\n1\n5\ntwo\none\nzero\n3628800\n[small big]\n"
+    )
+
+
+def _no_signal(self, *args):
+    raise AssertionError("A signal was raised for STOP or OUTPUT.")
+
+
+def test_returns_do_not_raise(run, backend, monkeypatch):
+    # STOP and OUTPUT in a REPEAT, RUN or template list still raise.
+    monkeypatch.setattr(errors.StopSignal, "__init__", _no_signal)
+    monkeypatch.setattr(errors.OutputSignal, "__init__", _no_signal)
+    script = PROCEDURES + """
+show early 1
+show early 5
+show nested 2
+stops
+show fact 5
+"""
+    assert run(script, backend) == "small\nbig\ntwo\n120\n"
+
+
+def test_output_needs_a_value(run, backend):
+    script = """
+to side
+print "side
+end
+to f
+output side
+end
+show f
+"""
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(script, backend)
+    assert str(excinfo.value) == (
+        "Primitive `OUTPUT` received a null value for argument 1."
+    )
+
+
+def test_stopped_procedure_has_no_output(run, backend):
+    with pytest.raises(errors.LogoError, match="null value"):
+        run("to f\nstop\nend\nshow f", backend)
@@ -0,0 +1,77 @@
+"""
+Tests for `logopy.scriptcache`.
+"""
+
+import os
+
+import pytest
+
+from logopy import scriptcache, tokenizer
+
+
+class CountingTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, script):
+        self.calls += 1
+        return tokenizer.tokenize(script)
+
+
+@pytest.fixture
+def script(tmp_path):
+    pth = tmp_path / "script.lg"
+    pth.write_text("print 1 + 2\n")
+    return str(pth)
+
+
+def test_cache_is_written_and_used(script):
+    tokenize = CountingTokenizer()
+    tokens = scriptcache.load_tokens(script, tokenize, "fast")
+    assert tokens == ["print", 1, "+", 2]
+    assert os.path.isfile(scriptcache.cache_path(script))
+    assert scriptcache.load_tokens(script, tokenize, "fast") == tokens
+    assert tokenize.calls == 1
+
+
+def test_changed_script_is_tokenized_again(script):
+    tokenize = CountingTokenizer()
+    scriptcache.load_tokens(script, tokenize, "fast")
+    with open(script, "w") as f:
+        f.write("print 10 * 20\n")
+    assert scriptcache.load_tokens(script, tokenize, "fast") == ["print", 10, "*", 20]
+    assert tokenize.calls == 2
+
+
+def test_touched_script_is_not_tokenized_again(script):
+    tokenize = CountingTokenizer()
+    scriptcache.load_tokens(script, tokenize, "fast")
+    st = os.stat(script)
+    os.utime(script, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert scriptcache.load_tokens(script, tokenize, "fast") == ["print", 1, "+", 2]
+    assert tokenize.calls == 1
+
+
+def test_entry_of_another_tokenizer_is_not_used(script):
+    tokenize = CountingTokenizer()
+    scriptcache.load_tokens(script, tokenize, "fast")
+    scriptcache.load_tokens(script, tokenize, "parsley")
+    assert tokenize.calls == 2
+
+
+def test_corrupt_entry_is_ignored(script):
+    tokenize = CountingTokenizer()
+    scriptcache.load_tokens(script, tokenize, "fast")
+    with open(scriptcache.cache_path(script), "wb") as f:
+        f.write(b"not marshal data")
+    assert scriptcache.load_tokens(script, tokenize, "fast") == ["print", 1, "+", 2]
+    assert tokenize.calls == 2
+
+
+def test_load_uses_cache(run, make_logo, tmp_path):
+    (tmp_path / "lib.lg").write_text("to double :x\noutput :x * 2\nend\n")
+    logo = make_logo()
+    logo.script_cache = True
+    logo.script_folders = [str(tmp_path)]
+    assert run('load "lib.lg print double 21', logo=logo) == "42\n"
+    assert os.path.isfile(scriptcache.cache_path(str(tmp_path / "lib.lg")))
@@ -0,0 +1,81 @@
+"""
+Tests for streams.
+"""
+
+import pytest
+
+from logopy import errors
+
+INTS = """
+to ints :n
+output cons-stream :n [ints :n + 1]
+end
+make "s ints 1
+"""
+
+UPTO = """
+to upto :n :max
+if :n > :max [output []]
+output cons-stream :n [print "computing upto :n + 1 :max]
+end
+make "s upto 1 3
+"""
+
+
+def test_promises_run_once(run, backend):
+    script = UPTO + """
+show :s
+show stream-first stream-butfirst :s
+show stream-first stream-butfirst :s
+show :s
+show streamp :s
+show streamp [1]
+show emptyp :s
+"""
+    assert run(script, backend) == (
+        "[1 ...]\ncomputing\n2\n2\n[1 2 ...]\ntrue\nfalse\nfalse\n"
+    )
+
+
+def test_foreach_and_map(run, backend):
+    script = UPTO + "foreach :s [print ?]\nshow map [? * 10] :s\n"
+    assert (
+        run(script, backend) == "1\ncomputing\n2\ncomputing\n3\ncomputing\n[10 20 30]\n"
+    )
+
+
+def test_first_and_butfirst_of_infinite_stream(run, backend):
+    script = INTS + """
+show first :s
+show first butfirst butfirst :s
+show :s
+"""
+    assert run(script, backend) == "1\n3\n[1 2 3 ...]\n"
+
+
+@pytest.mark.parametrize("command", ["last", "butlast", "count"])
+def test_stream_rejected(run, command):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(INTS + "show {} :s".format(command))
+    assert str(excinfo.value) == (
+        "{} doesn't like a stream as input.".format(command.upper())
+    )
+
+
+@pytest.mark.parametrize(
+    "script, command",
+    [("show memberp 0 :s", "MEMBERP"), ("show item 2 :s", "ITEM")],
+)
+def test_stream_rejected_by_search(run, script, command):
+    with pytest.raises(errors.LogoError) as excinfo:
+        run(INTS + script)
+    assert str(excinfo.value) == "{} doesn't like a stream as input.".format(command)
+
+
+def test_count_of_words(run):
+    assert run('show count 123 show count 5.5 show count "abc') == "3\n3\n3\n"
+
+
+def test_rest_must_be_stream_or_list(run):
+    with pytest.raises(errors.LogoError, match="CONS-STREAM expected a stream"):
+        run("show stream-butfirst cons-stream 1 [2]")
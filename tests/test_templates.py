@@ -0,0 +1,60 @@
+"""
+Tests for MAP, FILTER, REDUCE, FOREACH and FIND templates.
+"""
+
+DOUBLE = """
+to double :x
+output :x * 2
+end
+"""
+
+
+def test_template_forms(run, backend):
+    script = DOUBLE + """
+show map "double [1 2 3]
+show map [? * 2] [1 2 3]
+show map [[x] :x * 3] [1 2]
+show (map [?1 + ?2] [1 2] [10 20])
+show filter [? > 1] [0 1 2 3]
+show filter [[x] :x < 2] [0 1 2 3]
+show reduce [?1 + ?2] [1 2 3 4]
+show reduce "sum [1 2 3]
+show find [? > 2] [1 2 3 4]
+show find [? > 9] [1 2 3 4]
+"""
+    assert run(script, backend) == (
+        "[2 4 6]\n[2 4 6]\n[3 6]\n[11 22]\n[2 3]\n[0 1]\n10\n6\n3\n[]\n"
+    )
+
+
+def test_foreach(run, backend):
+    script = """
+foreach [a b] [print ?]
+foreach [a b] [print #]
+make "total 0
+foreach [1 2 3] [[x] make "total :total + :x]
+print :total
+"""
+    assert run(script, backend) == "a\nb\n1\n2\n6\n"
+
+
+def test_nested_templates(run, backend):
+    assert run("show map [map [? * 10] ?] [[1 2] [3]]", backend) == "[[10 20] [30]]\n"
+
+
+def test_procedure_redefined_while_mapping(run, backend):
+    script = DOUBLE + """
+show map [[x] [if :x = 2 [ext.memoize "double]] [output double :x]] [1 2 3]
+show ext.memostats "double
+"""
+    assert run(script, backend) == ("[2 4 6]\n[hits 0 misses 2 size 2 maxsize 1024]\n")
+
+
+def test_template_sees_caller_variables(run, backend):
+    script = """
+to scale :lst :factor
+output map [? * :factor] :lst
+end
+show scale [1 2] 5
+"""
+    assert run(script, backend) == "[5 10]\n"
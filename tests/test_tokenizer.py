@@ -0,0 +1,139 @@
+"""
+Differential tests for `logopy.tokenizer`.
+
+The hand-written tokenizer must produce the same tokens as the parsley
+reference grammar in `bin/logopycli.py`, except that it leaves infix
+arithmetic in infix order.  The reference used here is the same grammar
+with its `calculate` action replaced by one that keeps infix order.
+"""
+
+import glob
+import os
+
+import pytest
+from ometa.runtime import EOFError as GrammarEOFError
+
+from logopy import tokenizer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = sorted(glob.glob(os.path.join(ROOT, "example_scripts", "*.lg")))
+
+
+class _Infix:
+    """
+    The tokens of an infix expression parsed by the reference grammar.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+
+def _splice(value):
+    if isinstance(value, _Infix):
+        return value.tokens
+    return [value]
+
+
+def _calculate(start, pairs):
+    if not pairs:
+        return start
+    tokens = _splice(start)
+    for op, value in pairs:
+        tokens.append(op)
+        tokens.extend(_splice(value))
+    return _Infix(tokens)
+
+
+def _group(value):
+    if isinstance(value, _Infix):
+        return tuple(value.tokens)
+    return value
+
+
+def _transform(cli, items):
+    tokens = []
+    for item in items:
+        if isinstance(item, _Infix):
+            tokens.extend(item.tokens)
+        elif isinstance(item, cli.Comment):
+            continue
+        elif isinstance(item, list):
+            tokens.append(_transform(cli, item))
+        elif isinstance(item, tuple):
+            tokens.append(tuple(_transform(cli, item)))
+        else:
+            tokens.append(item)
+    return tokens
+
+
+@pytest.fixture(scope="module")
+def reference(cli):
+    """
+    Return the reference tokenizer.
+    """
+    parens = "parens = '(' ws expr:e ws ')' -> e"
+    assert parens in cli.TOKEN_GRAMMAR
+    grammar = cli.parsley.makeGrammar(
+        cli.TOKEN_GRAMMAR.replace(parens, parens[:-1] + "group(e)"),
+        {"calculate": _calculate, "group": _group, "Comment": cli.Comment},
+    )
+
+    def tokenize(script):
+        return _transform(cli, grammar(script).itemlist())
+
+    return tokenize
+
+
+def _tokens_or_failure(tokenize, script):
+    try:
+        return tokenize(script)
+    except Exception:
+        return "failed"
+
+
+@pytest.mark.parametrize("pth", SCRIPTS, ids=os.path.basename)
+def test_example_script(reference, pth):
+    with open(pth, "r") as f:
+        script = f.read()
+    assert tokenizer.tokenize(script) == reference(script)
+
+
+@pytest.mark.parametrize("pth", SCRIPTS, ids=os.path.basename)
+def test_example_script_lines(reference, pth):
+    with open(pth, "r") as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    for line in lines:
+        expected = _tokens_or_failure(reference, line)
+        assert _tokens_or_failure(tokenizer.tokenize, line) == expected, line
+
+
+@pytest.mark.parametrize(
+    "script, expected",
+    [
+        ("(x)", ["x"]),
+        ("print (x) + 1", ["print", "x", "+", 1]),
+        ("print (1 + 2)", ["print", (1, "+", 2)]),
+        (
+            "output :x * 2 - 1 + :x / 4 * 3",
+            ["output", ":x", "*", 2, "-", 1, "+", ":x", "/", 4, "*", 3],
+        ),
+        ("[;a]", [[";a"]]),
+        ("[ ;a b]", [[";a", "b"]]),
+    ],
+)
+def test_quirks(reference, script, expected):
+    assert tokenizer.tokenize(script) == expected
+    assert reference(script) == expected
+
+
+@pytest.mark.parametrize("script", ["", "  \n\t"])
+def test_empty_script(reference, script):
+    assert tokenizer.tokenize(script) == []
+    with pytest.raises(GrammarEOFError):
+        reference(script)
+
+
+def test_parsley_tokenizer_uses_prefix_arithmetic(cli):
+    grammar = cli.make_token_grammar()
+    tokens = cli.parsley_tokenize(grammar, "print :x * 2 + 360 / 5")
+    assert tokens == ["print", "sum", "product", ":x", 2, 72.0]
@@ -0,0 +1,87 @@
+"""
+Tests for dynamically scoped Logo variables.
+"""
+
+import pytest
+
+from logopy import errors
+
+
+def test_dynamic_scope(run, backend):
+    script = """
+make "x "global
+to outer :x
+inner
+print :x
+end
+to inner
+print :x
+make "x "changed
+end
+outer "outer
+print :x
+"""
+    assert run(script, backend) == "outer\nchanged\nglobal\n"
+
+
+def test_local(run, backend):
+    script = """
+make "y 1
+to f
+local "y
+make "y 2
+g
+end
+to g
+print :y
+end
+f
+print :y
+"""
+    assert run(script, backend) == "2\n1\n"
+
+
+def test_make_creates_global(run, backend):
+    script = """
+to f
+make "new 5
+end
+f
+print :new
+"""
+    assert run(script, backend) == "5\n"
+
+
+def test_scope_is_restored_after_error(run, make_logo, backend):
+    logo = make_logo(backend)
+    script = """
+make "x 1
+to f :x
+g :x - 1
+end
+to g :n
+if :n = 0 [print "done throw "error]
+g :n - 1
+end
+catch "error [f 10]
+print :x
+"""
+    assert run(script, logo=logo) == "done\n1\n"
+    assert logo.binding_stack == []
+
+
+def test_for_restores_scope_on_error(make_logo, run, backend):
+    logo = make_logo(backend)
+    with pytest.raises(errors.LogoError):
+        run("for [i 1 3] [print :i print :nosuchvariable]", logo=logo)
+    assert logo.binding_stack == []
+    assert "i" not in logo.variables
+
+
+def test_global_variables(make_logo, run):
+    logo = make_logo()
+    run('make "a 1 make "b 2', logo=logo)
+    logo.create_scope([("a", 10), ("c", 3)])
+    assert logo.global_variables() == {"a": 1, "b": 2}
+    logo.destroy_scope()
+    assert logo.variables == {"a": 1, "b": 2}